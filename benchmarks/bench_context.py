@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: per-turn cost of ContextManager.add_context as a session grows.
+
+The previous implementation re-stringified every stored turn on each append
+(O(N) per turn). With running totals and bounded deques the cost per turn
+should stay flat regardless of session length.
+
+Usage: python -m benchmarks.bench_context
+"""
+
+import time
+from src.core.context import ContextManager, InMemoryContextStore
+
+SESSION_LENGTHS = [100, 1000, 5000, 20000]
+SAMPLE_TURNS = 200
+
+def _turn(i: int) -> dict:
+    return {
+        "input": {"session_id": "bench", "message": f"Pertanyaan nomor {i} tentang pengalaman kerja Anda"},
+        "response": "Saya telah bekerja sebagai software engineer selama 5 tahun. " * 3,
+        "prompt_type": "question"
+    }
+
+def _legacy_check(turns: list) -> int:
+    return sum(len(str(ctx)) for ctx in turns)
+
+def bench(length: int) -> tuple:
+    manager = ContextManager(store=InMemoryContextStore())
+    manager.max_length = max(SESSION_LENGTHS) * 2
+    legacy_turns = []
+    for i in range(length):
+        manager.add_context("bench", _turn(i))
+        legacy_turns.append(_turn(i))
+
+    start = time.perf_counter()
+    for i in range(SAMPLE_TURNS):
+        manager.add_context("bench", _turn(length + i))
+    incremental = (time.perf_counter() - start) / SAMPLE_TURNS
+
+    start = time.perf_counter()
+    for i in range(SAMPLE_TURNS):
+        legacy_turns.append(_turn(length + i))
+        _legacy_check(legacy_turns)
+    legacy = (time.perf_counter() - start) / SAMPLE_TURNS
+    return incremental, legacy
+
+if __name__ == "__main__":
+    print(f"{'turns':>8} {'incremental us/turn':>22} {'legacy us/turn':>16}")
+    for length in SESSION_LENGTHS:
+        incremental, legacy = bench(length)
+        print(f"{length:>8} {incremental * 1e6:>22.1f} {legacy * 1e6:>16.1f}")
@@ -0,0 +1,110 @@
+"""
+Benchmark: memory per 10k entries and store/retrieve latency (full entries and
+a single field) of src.context.ContextManager versus the previous latin1-string zlib scheme.
+
+Usage: python -m benchmarks.bench_context_compression
+"""
+
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+import zlib
+from src.context.context_manager import ContextManager
+
+ENTRIES = 10_000
+WORDS = (
+    "saya telah bekerja sebagai software engineer selama tahun tim proyek "
+    "tantangan terbesar adalah mengelola komunikasi terbuka konflik zona waktu"
+).split()
+
+class LegacyContextManager:
+    """The previous scheme: JSON + zlib above 500 bytes, stored as latin1 str"""
+
+    def __init__(self, max_size: int = ENTRIES):
+        self.context = {}
+        self.max_size = max_size
+
+    def store(self, key, data):
+        self.context.setdefault(key, [])
+        serialized = json.dumps(data)
+        if len(serialized) > 500:
+            data = {
+                'compressed': True,
+                'data': zlib.compress(serialized.encode()).decode('latin1'),
+                'timestamp': data['timestamp']
+            }
+        self.context[key].append(data)
+
+    def retrieve(self, key, limit=None):
+        result = []
+        for item in self.context[key][-limit:] if limit else self.context[key]:
+            if item.get('compressed', False):
+                data = json.loads(zlib.decompress(item['data'].encode('latin1')))
+                data['timestamp'] = item['timestamp']
+                result.append(data)
+            else:
+                result.append(item)
+        return result
+
+def _payload(rng: random.Random) -> dict:
+    return {
+        "input": {
+            "session_id": f"session-{rng.randint(0, 99)}",
+            "message": " ".join(rng.choices(WORDS, k=rng.randint(5, 15))),
+            "topic": "pengalaman kerja"
+        },
+        "response": " ".join(rng.choices(WORDS, k=rng.randint(10, 120))),
+        "prompt_type": rng.choice(["greeting", "question", "follow_up"]),
+        "timestamp": "2024-05-01T10:00:00.000000"
+    }
+
+def _measure(store, payloads):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for payload in payloads:
+        store(dict(payload))
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed
+
+async def main():
+    rng = random.Random(0)
+    payloads = [_payload(rng) for _ in range(ENTRIES)]
+
+    legacy = LegacyContextManager()
+    legacy_mem, legacy_store = _measure(lambda p: legacy.store("bench", p), payloads)
+
+    manager = ContextManager(max_size=ENTRIES)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for payload in payloads:
+        await manager.store_context("bench", dict(payload))
+    new_store = time.perf_counter() - start
+    new_mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        legacy.retrieve("bench", limit=20)
+    legacy_retrieve = (time.perf_counter() - start) / 100
+
+    start = time.perf_counter()
+    for _ in range(100):
+        await manager.retrieve_context("bench", limit=20)
+    new_retrieve = (time.perf_counter() - start) / 100
+
+    start = time.perf_counter()
+    for _ in range(100):
+        await manager.retrieve_field("bench", "response", limit=20)
+    field_retrieve = (time.perf_counter() - start) / 100
+
+    print(f"{'scheme':<10} {'MB / 10k':>10} {'store us':>10} {'retrieve(20) us':>16}")
+    print(f"{'legacy':<10} {legacy_mem / 2**20:>10.2f} {legacy_store / ENTRIES * 1e6:>10.1f} {legacy_retrieve * 1e6:>16.1f}")
+    print(f"{'zdict':<10} {new_mem / 2**20:>10.2f} {new_store / ENTRIES * 1e6:>10.1f} {new_retrieve * 1e6:>16.1f}")
+    print(f"{'zdict field':<10} {'':>10} {'':>10} {field_retrieve * 1e6:>16.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Benchmark: characters/sec of InterviewTransformer generation with the previous
+loop (a full forward pass over the whole input for every character) versus
+causal decoding with a per-layer key/value cache, at several output lengths.
+
+Usage: python -m benchmarks.bench_generation
+"""
+
+import time
+import torch
+from src.agents.model4 import InterviewTransformer
+
+VOCAB_SIZE = 33
+PROMPT_LENGTH = 50
+LENGTHS = (50, 100, 200, 400)
+
+def legacy_generate(model, input_ids, max_length):
+    """The previous gpt_inference4 loop, re-running the encoder over the whole input per character"""
+    input_tensor = torch.tensor([input_ids])
+    for _ in range(max_length):
+        with torch.no_grad():
+            output = model(input_tensor)
+        input_ids.append(torch.argmax(output[:, -1, :], dim=-1).item())
+        input_tensor = torch.tensor([input_ids])
+    return input_ids
+
+def _chars_per_second(fn, length):
+    start = time.perf_counter()
+    fn()
+    return length / (time.perf_counter() - start)
+
+def main():
+    torch.manual_seed(0)
+    model = InterviewTransformer(VOCAB_SIZE).eval()
+    prompt = torch.randint(1, VOCAB_SIZE, (PROMPT_LENGTH,)).tolist()
+    model.generate(prompt, 10)  # warm up
+
+    print(f"{'chars':>6} {'full pass c/s':>14} {'kv cache c/s':>13} {'speedup':>8}")
+    for length in LENGTHS:
+        legacy = _chars_per_second(lambda: legacy_generate(model, list(prompt), length), length)
+        cached = _chars_per_second(lambda: model.generate(prompt, length), length)
+        print(f"{length:>6} {legacy:>14.0f} {cached:>13.0f} {cached / legacy:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: throughput and p50/p99 latency of the local InterviewTransformer
+under synthetic concurrent load, decoding one request at a time versus the
+continuous-batching InferenceScheduler at several maximum batch sizes.
+
+Usage: python -m benchmarks.bench_inference_server
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from src.agents.model4 import InterviewTransformer
+from src.core.inference import InferenceScheduler
+
+VOCAB_SIZE = 33
+REQUESTS = 64
+ARRIVAL_RATE = 200.0  # requests per second, Poisson arrivals
+BATCH_SIZES = (1, 4, 16, 32)
+
+def _workload(rng: random.Random):
+    return [
+        (
+            rng.expovariate(ARRIVAL_RATE),
+            [rng.randint(1, VOCAB_SIZE - 1) for _ in range(rng.randint(20, 80))],
+            rng.randint(20, 120)
+        )
+        for _ in range(REQUESTS)
+    ]
+
+async def _run(scheduler: InferenceScheduler, workload):
+    latencies = []
+
+    async def one(prompt, max_new):
+        start = time.perf_counter()
+        ids = await scheduler.submit(prompt, max_new)
+        latencies.append(time.perf_counter() - start)
+        return len(ids)
+
+    start = time.perf_counter()
+    tasks = []
+    for gap, prompt, max_new in workload:
+        await asyncio.sleep(gap)
+        tasks.append(asyncio.ensure_future(one(prompt, max_new)))
+    chars = sum(await asyncio.gather(*tasks))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return chars / elapsed, latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+
+async def main():
+    torch.manual_seed(0)
+    model = InterviewTransformer(VOCAB_SIZE).eval()
+    workload = _workload(random.Random(0))
+
+    print(f"{'max batch':>9} {'chars/s':>9} {'p50 s':>7} {'p99 s':>7}")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for batch_size in BATCH_SIZES:
+            scheduler = InferenceScheduler(model, executor, max_batch_size=batch_size)
+            throughput, p50, p99 = await _run(scheduler, workload)
+            print(f"{batch_size:>9} {throughput:>9.0f} {p50:>7.2f} {p99:>7.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Benchmark: encoding and decoding a batch of interview samples with the previous
+per-character dict lookups versus CharTokenizer's vectorized lookup table.
+
+Usage: python -m benchmarks.bench_tokenizer
+"""
+
+import random
+import time
+from src.agents.tokenizer import CharTokenizer
+
+SAMPLES = 20_000
+MAX_LENGTH = 128
+WORDS = (
+    "saya telah bekerja sebagai software engineer selama tahun tim proyek "
+    "tantangan terbesar adalah mengelola komunikasi terbuka konflik zona waktu"
+).split()
+
+def _timed(fn, repeats: int = 3):
+    """Result and best wall time of repeats runs"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    rng = random.Random(0)
+    texts = [
+        f"Q: {' '.join(rng.choices(WORDS, k=rng.randint(3, 10)))}? A: {' '.join(rng.choices(WORDS, k=rng.randint(5, 30)))}."
+        for _ in range(SAMPLES)
+    ]
+    tokenizer = CharTokenizer.from_texts(texts)
+    char_to_idx = tokenizer.char_to_idx
+    idx_to_char = {idx: char for char, idx in char_to_idx.items()}
+
+    legacy_ids, legacy_encode = _timed(lambda: [
+        [char_to_idx.get(char, 0) for char in text[:MAX_LENGTH]] + [0] * (MAX_LENGTH - len(text[:MAX_LENGTH]))
+        for text in texts
+    ])
+    ids, encode = _timed(lambda: tokenizer.encode_batch(texts, max_length=MAX_LENGTH))
+    assert ids.tolist() == legacy_ids
+    _, legacy_decode = _timed(lambda: ["".join(idx_to_char[i] for i in row if i) for row in legacy_ids])
+    _, decode = _timed(lambda: tokenizer.decode_batch(ids))
+
+    print(f"{SAMPLES} samples, {MAX_LENGTH} chars")
+    print(f"{'':<10} {'encode ms':>10} {'decode ms':>10}")
+    print(f"{'dict':<10} {legacy_encode * 1000:>10.1f} {legacy_decode * 1000:>10.1f}")
+    print(f"{'lut':<10} {encode * 1000:>10.1f} {decode * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from ..core.config import settings
 from ..core.logging import logger
-from ..core.errors import AGNOError
+from ..core.errors import AGNOError, DeadlineExceededError, OverloadedError
 from ..core.context import context_manager
-from ..core.providers import provider_factory
+from ..core.providers import LLMProvider, provider_factory
+from ..core.packing import context_packer
+from ..core.search import semantic_response_cache
+from ..core.tokens import count_tokens
 from ..prompts import prompt_manager
 from datetime import datetime
 
@@ -21,65 +25,42 @@ class BaseAgent(ABC):
 
     async def get_context(self, session_id: str) -> List[Dict]:
         """Get context for a session"""
-        return self.context.get_context(session_id)
+        return await self.context.get_context_async(session_id)
 
     async def add_context(self, session_id: str, context: Dict) -> None:
         """Add context to a session"""
-        self.context.add_context(session_id, context)
+        await self.context.atomic_append(session_id, context)
 
     async def clear_context(self, session_id: str) -> None:
         """Clear context for a session"""
-        self.context.clear_context(session_id)
+        await self.context.clear_context_async(session_id)
+        context_packer.forget(session_id)
 
 class InterviewerAgent(BaseAgent):
     def __init__(self):
         super().__init__("interviewer")
-        self.model_path = "src/models/interviewer_transformer.pth"
-        self.vocab_path = "src/models/vocab.json"
+        self.greeting_provider = self._get_greeting_provider()
+        self.semantic_cache = semantic_response_cache if settings.SEMANTIC_CACHE_ENABLED else None
         logger.info("Initialized InterviewerAgent")
 
     async def process(self, input_data: Dict) -> Dict:
         """Process interview input and generate response"""
         try:
-            # Validate input
-            if not input_data.get("session_id"):
-                raise AGNOError("session_id is required")
-            if not input_data.get("message"):
-                raise AGNOError("message is required")
-            
-            logger.info(f"Processing interview request: {input_data}")
-            
-            # Get session context
-            session_id = input_data.get("session_id")
-            context = await self.get_context(session_id)
-            logger.info(f"Retrieved context for session {session_id}: {context}")
-            
-            # Determine prompt type based on context
-            prompt_type = self._determine_prompt_type(input_data, context)
-            logger.info(f"Determined prompt type: {prompt_type}")
-            
-            # Build system message
-            system_message = self._build_system_message(prompt_type)
-            
-            # Build user message
-            user_message = self._build_user_message(prompt_type, input_data, context)
-            
-            logger.info(f"System message: {system_message}")
-            logger.info(f"User message: {user_message}")
-            
-            # Generate response using LLM with system message
-            response = await self.provider.generate(user_message, system_message=system_message)
-            logger.info(f"Generated response: {response}")
-            
-            # Update context
-            context_update = {
-                "input": input_data,
-                "response": response,
-                "prompt_type": prompt_type,
-                "timestamp": str(datetime.now())
-            }
-            await self.add_context(session_id, context_update)
-            logger.info(f"Updated context with: {context_update}")
+            # Read history, generate and record under the session's own turn lock, so concurrent
+            # turns of one session see each other while other sessions proceed in parallel
+            async with self.context.turn_lock(self._session_id(input_data)):
+                session_id, context, prompt_type, system_message, user_message = await self._prepare_turn(input_data)
+                
+                response = await self._cached_response(prompt_type, user_message)
+                if response is None:
+                    # Generate response using LLM with system message
+                    response = await self._provider_for(prompt_type).generate(
+                        user_message, system_message=system_message, **self._generation_options(prompt_type)
+                    )
+                    await self._remember_response(prompt_type, user_message, response)
+                logger.info(f"Generated response: {response}")
+                
+                await self._record_turn(session_id, input_data, response, prompt_type)
             
             return {
                 "response": response,
@@ -87,10 +68,144 @@ class InterviewerAgent(BaseAgent):
                 "prompt_type": prompt_type
             }
             
+        except (OverloadedError, DeadlineExceededError):
+            raise
         except Exception as e:
             logger.error(f"Interviewer agent error: {str(e)}")
             raise AGNOError(f"Interview processing failed: {str(e)}")
 
+    async def process_stream(self, input_data: Dict) -> AsyncIterator[Dict]:
+        """Process interview input and stream start/token/done events, recording the full response"""
+        try:
+            # No lock is held while yielding to a possibly slow client: the turn lock only waits out
+            # an in-flight turn before reading the history, and is taken again to record this one
+            async with self.context.turn_lock(self._session_id(input_data)):
+                session_id, context, prompt_type, system_message, user_message = await self._prepare_turn(input_data)
+            yield {"event": "start", "prompt_type": prompt_type}
+            
+            response = await self._cached_response(prompt_type, user_message)
+            if response is not None:
+                yield {"event": "token", "token": response}
+            else:
+                chunks = []
+                async for chunk in self._provider_for(prompt_type).generate_stream(
+                    user_message, system_message=system_message, **self._generation_options(prompt_type)
+                ):
+                    chunks.append(chunk)
+                    yield {"event": "token", "token": chunk}
+                
+                response = "".join(chunks)
+                await self._remember_response(prompt_type, user_message, response)
+            logger.info(f"Generated streamed response: {response}")
+            async with self.context.turn_lock(session_id):
+                await self._record_turn(session_id, input_data, response, prompt_type)
+            
+            yield {"event": "done", "response": response, "prompt_type": prompt_type}
+            
+        except (OverloadedError, DeadlineExceededError):
+            raise
+        except Exception as e:
+            logger.error(f"Interviewer agent streaming error: {str(e)}")
+            raise AGNOError(f"Interview processing failed: {str(e)}")
+
+    def _session_id(self, input_data: Dict) -> str:
+        """Validate input and return its session id"""
+        if not input_data.get("session_id"):
+            raise AGNOError("session_id is required")
+        if not input_data.get("message"):
+            raise AGNOError("message is required")
+        return input_data["session_id"]
+
+    async def _prepare_turn(self, input_data: Dict) -> Tuple[str, List[Dict], str, str, str]:
+        """Validate input and build the prompts for the next interview turn"""
+        session_id = self._session_id(input_data)
+        logger.info(f"Processing interview request: {input_data}")
+        
+        # Get session context
+        context = await self.get_context(session_id)
+        logger.info(f"Retrieved context for session {session_id}: {context}")
+        
+        # Determine prompt type based on context
+        prompt_type = self._determine_prompt_type(input_data, context)
+        logger.info(f"Determined prompt type: {prompt_type}")
+        
+        # Build system message
+        system_message = self._build_system_message(prompt_type)
+        
+        # Build user message
+        user_message = self._build_user_message(prompt_type, input_data, context)
+        
+        logger.info(f"System message: {system_message}")
+        logger.info(f"User message: {user_message}")
+        return session_id, context, prompt_type, system_message, user_message
+
+    async def _record_turn(self, session_id: str, input_data: Dict, response: str, prompt_type: str) -> None:
+        """Write a completed turn into the session context; the caller holds the session's turn lock"""
+        context_update = {
+            "input": input_data,
+            "response": response,
+            "prompt_type": prompt_type,
+            "timestamp": str(datetime.now())
+        }
+        await self.add_context(session_id, context_update)
+        logger.info(f"Updated context with: {context_update}")
+
+    def _semantic_partition(self, prompt_type: str) -> Optional[str]:
+        """Semantic cache partition for a prompt type, or None when its answers must not be shared.
+
+        Question and follow-up prompts embed the session history, so a similar
+        prompt from another session could be answered with this candidate's
+        history; only history-free greetings are shared, per provider and model.
+        """
+        if self.semantic_cache is None or prompt_type != "greeting":
+            return None
+        provider = self._provider_for(prompt_type)
+        return f"{prompt_type}:{getattr(provider, 'name', type(provider).__name__)}:{getattr(provider, 'model', '')}"
+
+    async def _cached_response(self, prompt_type: str, user_message: str) -> Optional[str]:
+        """Answer of a semantically similar earlier greeting, when the semantic cache is enabled"""
+        partition = self._semantic_partition(prompt_type)
+        if partition is None:
+            return None
+        try:
+            response = await self.semantic_cache.lookup(user_message, partition)
+        except Exception as e:
+            # The cache is an optimization; embedding failures fall through to the LLM
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+            return None
+        if response is not None:
+            logger.info(f"Semantic cache hit for prompt type {prompt_type}")
+        return response
+
+    async def _remember_response(self, prompt_type: str, user_message: str, response: str) -> None:
+        partition = self._semantic_partition(prompt_type)
+        if partition is None:
+            return
+        try:
+            await self.semantic_cache.store(user_message, partition, response)
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed: {str(e)}")
+
+    def _get_greeting_provider(self) -> Optional[LLMProvider]:
+        """Dedicated provider for greetings, which need no session history, if one is configured"""
+        if not settings.GREETING_PROVIDER:
+            return None
+        try:
+            return provider_factory.get_provider(settings.GREETING_PROVIDER)
+        except AGNOError as e:
+            logger.warning(f"Greeting provider {settings.GREETING_PROVIDER} unavailable, using the default: {str(e)}")
+            return None
+
+    def _provider_for(self, prompt_type: str) -> LLMProvider:
+        if prompt_type == "greeting" and self.greeting_provider is not None:
+            return self.greeting_provider
+        return self.provider
+
+    def _generation_options(self, prompt_type: str) -> Dict:
+        """Extra provider options per prompt type"""
+        # Greetings do not depend on session history, so identical ones can be served from cache
+        return {"cache": True} if prompt_type == "greeting" else {}
+
     def _determine_prompt_type(self, input_data: Dict, context: List[Dict]) -> str:
         """Determine appropriate prompt type based on context"""
         if not context:
@@ -121,17 +236,19 @@ class InterviewerAgent(BaseAgent):
                 return f"Halo! Saya akan mewawancarai Anda tentang {input_data.get('topic', 'pengalaman Anda')}. {input_data.get('message', '')}"
             
             elif prompt_type == "question":
-                context_str = ""
-                if context:
-                    last_response = context[-1].get("response", "")
-                    context_str = f"\nSebelumnya Anda menyebutkan: {last_response}\n"
+                message = f"Mengenai {input_data.get('topic', 'pengalaman Anda')}, {input_data.get('message', '')}"
+                history = self._pack_history(input_data, context, message)
+                context_str = f"\n{history}\n" if history else ""
                 
-                return f"{context_str}Mengenai {input_data.get('topic', 'pengalaman Anda')}, {input_data.get('message', '')}"
+                return f"{context_str}{message}"
             
             elif prompt_type == "follow_up":
                 last_response = context[-1].get("response", "") if context else ""
                 point = input_data.get("point", "hal tersebut")
-                return f"Berdasarkan jawaban Anda: '{last_response}'\nBisa dijelaskan lebih detail tentang {point}?"
+                message = f"Berdasarkan jawaban Anda: '{last_response}'\nBisa dijelaskan lebih detail tentang {point}?"
+                # The last turn is quoted explicitly, so only earlier turns are packed
+                history = self._pack_history(input_data, context[:-1], message)
+                return f"{history}\n\n{message}" if history else message
             
             else:
                 return input_data.get("message", "")
@@ -140,6 +257,16 @@ class InterviewerAgent(BaseAgent):
             logger.error(f"Error building user message: {str(e)}")
             raise AGNOError(f"Failed to build user message: {str(e)}")
 
+    def _pack_history(self, input_data: Dict, context: List[Dict], message: str) -> str:
+        """Pack session history into the token budget left next to message"""
+        model = getattr(self.provider, "model", None)
+        return context_packer.pack(
+            input_data.get("session_id", ""),
+            context,
+            reserved_tokens=count_tokens(message, model),
+            model=model
+        )
+
 class AgentFactory:
     _agents: Dict[str, BaseAgent] = {}
 
@@ -0,0 +1,115 @@
+from typing import TYPE_CHECKING, Dict, Iterator, List, Sequence, Tuple
+import json
+import random
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+if TYPE_CHECKING:
+    from .tokenizer import CharTokenizer
+
+# Upper bounds of the window length buckets, as fractions of the window
+BUCKET_FRACTIONS = (0.25, 0.5, 0.75, 1.0)
+
+def format_sample(data: Dict) -> str:
+    return f"Q: {data['question']} A: {data['answer']}"
+
+def iter_texts(shards: Sequence[str], worker: int = 0, num_workers: int = 1) -> Iterator[str]:
+    """Stream samples from JSONL shards, this worker's share only.
+
+    With at least as many shards as workers each worker reads whole shards;
+    otherwise every worker reads all shards and keeps every num_workers-th line.
+    """
+    by_shard = len(shards) >= num_workers
+    for shard_index, shard in enumerate(shards):
+        if by_shard and shard_index % num_workers != worker:
+            continue
+        with open(shard, "r", encoding="utf-8") as f:
+            for line_index, line in enumerate(f):
+                if not by_shard and line_index % num_workers != worker:
+                    continue
+                if line.strip():
+                    yield format_sample(json.loads(line))
+
+class InterviewShardDataset(IterableDataset):
+    """Length-bucketed (inputs, targets) batches streamed from JSONL shards.
+
+    Each sample is tokenized in the worker reading it and cut into windows
+    of window + 1 ids overlapping by one, so inputs are window[:-1] and
+    targets window[1:] of the same text. Windows go to the bucket for their
+    length and a bucket is emitted once it holds batch_size windows, padded
+    (on the right, with the tokenizer's padding id, which the loss ignores)
+    only to its longest window. Use with DataLoader(batch_size=None).
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[str],
+        tokenizer: "CharTokenizer",
+        window: int = 128,
+        batch_size: int = 8,
+        shuffle_buffer: int = 0,
+        seed: int = 0
+    ):
+        if not shards:
+            raise ValueError("No dataset shards given")
+        self.shards = list(shards)
+        self.tokenizer = tokenizer
+        self.window = window
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+        self.bounds = sorted({max(1, int(window * fraction)) for fraction in BUCKET_FRACTIONS})
+
+    def set_epoch(self, epoch: int) -> None:
+        """Reshuffle shard order and the shuffle buffer differently each epoch"""
+        self.epoch = epoch
+
+    def _windows(self, texts: Iterator[str]) -> Iterator[np.ndarray]:
+        for text in texts:
+            ids = self.tokenizer.encode(text)
+            for start in range(0, max(len(ids) - 1, 0), self.window):
+                yield ids[start:start + self.window + 1]
+
+    def _shuffled(self, windows: Iterator[np.ndarray], rng: random.Random) -> Iterator[np.ndarray]:
+        if self.shuffle_buffer <= 1:
+            yield from windows
+            return
+        buffer: List[np.ndarray] = []
+        for window in windows:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(window)
+                continue
+            index = rng.randrange(len(buffer))
+            yield buffer[index]
+            buffer[index] = window
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def _batch(self, windows: List[np.ndarray]) -> Tuple[torch.Tensor, torch.Tensor]:
+        length = max(len(window) for window in windows)
+        padded = np.full((len(windows), length), self.tokenizer.pad_id, dtype=np.int64)
+        for row, window in enumerate(windows):
+            padded[row, :len(window)] = window
+        return torch.from_numpy(padded[:, :-1].copy()), torch.from_numpy(padded[:, 1:].copy())
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        info = get_worker_info()
+        worker, num_workers = (info.id, info.num_workers) if info else (0, 1)
+        rng = random.Random(hash((self.seed, self.epoch, worker)))
+        shards = list(self.shards)
+        if self.shuffle_buffer > 1:
+            random.Random(hash((self.seed, self.epoch))).shuffle(shards)
+
+        buckets: Dict[int, List[np.ndarray]] = {bound: [] for bound in self.bounds}
+        for window in self._shuffled(self._windows(iter_texts(shards, worker, num_workers)), rng):
+            # Inputs are one shorter than the window
+            bucket = buckets[next(bound for bound in self.bounds if len(window) - 1 <= bound)]
+            bucket.append(window)
+            if len(bucket) == self.batch_size:
+                yield self._batch(bucket)
+                bucket.clear()
+        for bucket in buckets.values():
+            if bucket:
+                yield self._batch(bucket)
@@ -0,0 +1,149 @@
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+import hashlib
+import json
+import time
+import torch
+import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic
+from ..core.config import settings
+from ..core.logging import logger
+from ..core.local_provider import MODEL_FILE, VOCAB_FILE
+from .model4 import CachedDecoder, InterviewTransformer
+from .tokenizer import CharTokenizer
+
+MANIFEST_FILE = "interviewer_transformer.export.json"
+# Variant name -> artifact file next to the fp32 weights
+VARIANT_FILES = {
+    "fp32": MODEL_FILE,
+    "fp32_script": "interviewer_transformer.fp32.pt",
+    "int8_script": "interviewer_transformer.int8.pt"
+}
+
+def load_fp32(model_dir: Path = settings.MODEL_DIR) -> InterviewTransformer:
+    """The eager fp32 model from its state dict"""
+    model = InterviewTransformer(CharTokenizer.load(Path(model_dir) / VOCAB_FILE).vocab_size)
+    model.load_state_dict(torch.load(Path(model_dir) / MODEL_FILE, map_location="cpu"))
+    return model.eval()
+
+def weights_digest(model_dir: Path = settings.MODEL_DIR) -> str:
+    """Content hash of the fp32 weights the exported variants were built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(Path(model_dir) / MODEL_FILE, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_texts(path: Path = settings.DATA_DIR / "interview_data.jsonl") -> List[str]:
+    """Interview samples framed as in training"""
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                texts.append(f"Q: {data['question']} A: {data['answer']}")
+    return texts
+
+@torch.inference_mode()
+def next_char_agreement(reference, candidate, texts: Sequence[str], tokenizer: CharTokenizer) -> float:
+    """Fraction of positions where candidate predicts the same next character as reference"""
+    agree = total = 0
+    for text in texts:
+        ids = torch.from_numpy(tokenizer.encode(text))[None]
+        expected = reference.decode(ids)[0].argmax(dim=-1)
+        actual = candidate.decode(ids)[0].argmax(dim=-1)
+        agree += int((expected == actual).sum())
+        total += expected.numel()
+    return agree / total if total else 1.0
+
+@torch.inference_mode()
+def ms_per_token(decoder, prompt: Sequence[int], steps: int = 64, repeats: int = 3) -> float:
+    """Best-of-repeats greedy decoding time per generated token"""
+    best = float("inf")
+    for _ in range(repeats + 1):  # the first round warms up
+        start = time.perf_counter()
+        logits, cache = decoder.decode(torch.tensor([list(prompt)]))
+        for _ in range(steps):
+            next_id = logits[:, -1].argmax(dim=-1, keepdim=True)
+            logits, cache = decoder.decode(next_id, cache)
+        best = min(best, (time.perf_counter() - start) / steps)
+    return best * 1000
+
+def _script(model: InterviewTransformer, quantize: bool) -> torch.jit.ScriptModule:
+    decoder: nn.Module = CachedDecoder(model).eval()
+    if quantize:
+        # Weights stored int8, activations quantized on the fly per call
+        decoder = quantize_dynamic(decoder, {nn.Linear}, dtype=torch.qint8)
+    return torch.jit.script(decoder)
+
+def export(model_dir: Path = settings.MODEL_DIR, texts: Sequence[str] = ()) -> Dict[str, Dict]:
+    """Write the scripted fp32 and int8 artifacts and a manifest of their speed and agreement.
+
+    Agreement is next-character agreement with the eager fp32 model on the
+    interview data (or texts), so the loader can refuse variants that have
+    drifted too far.
+    """
+    model_dir = Path(model_dir)
+    tokenizer = CharTokenizer.load(model_dir / VOCAB_FILE)
+    model = load_fp32(model_dir)
+    texts = list(texts) or load_texts()
+    builders: Dict[str, Callable[[], nn.Module]] = {
+        "fp32_script": lambda: _script(model, quantize=False),
+        "int8_script": lambda: _script(model, quantize=True)
+    }
+
+    reference = model.decoder()
+    prompt = tokenizer.encode(texts[0])[:64].tolist()
+    variants = {"fp32": {"file": MODEL_FILE, "ms_per_token": ms_per_token(reference, prompt), "agreement": 1.0}}
+    for name, build in builders.items():
+        torch.jit.save(build(), str(model_dir / VARIANT_FILES[name]))
+        start = time.perf_counter()
+        decoder = torch.jit.load(str(model_dir / VARIANT_FILES[name]))
+        variants[name] = {
+            "file": VARIANT_FILES[name],
+            "ms_per_token": ms_per_token(decoder, prompt),
+            "agreement": next_char_agreement(reference, decoder, texts, tokenizer),
+            "load_seconds": time.perf_counter() - start
+        }
+        logger.info(f"Exported {name}: {variants[name]}")
+
+    manifest = {"vocab_size": tokenizer.vocab_size, "weights_digest": weights_digest(model_dir), "variants": variants}
+    with open(model_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return variants
+
+def _manifest_is_current(manifest: Dict, model_dir: Path) -> bool:
+    """Whether the exported variants were built from the current weights and vocabulary"""
+    vocab_size = CharTokenizer.load(model_dir / VOCAB_FILE).vocab_size
+    if manifest.get("vocab_size") != vocab_size:
+        logger.warning(f"Exported variants are stale: vocab size {manifest.get('vocab_size')} != {vocab_size}, using fp32")
+        return False
+    if manifest.get("weights_digest") != weights_digest(model_dir):
+        logger.warning(f"Exported variants are stale: {MODEL_FILE} changed since export, using fp32")
+        return False
+    return True
+
+def load_decoder(model_dir: Path = settings.MODEL_DIR, min_agreement: float = settings.LOCAL_MIN_AGREEMENT) -> Tuple[str, nn.Module]:
+    """The fastest exported variant that agrees well enough with fp32, else the eager fp32 model"""
+    model_dir = Path(model_dir)
+    manifest_path = model_dir / MANIFEST_FILE
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        variants = manifest["variants"] if _manifest_is_current(manifest, model_dir) else {}
+        for name, info in sorted(variants.items(), key=lambda item: item[1]["ms_per_token"]):
+            if name == "fp32":
+                break
+            if info["agreement"] < min_agreement:
+                logger.warning(f"Skipping {name}: next-char agreement {info['agreement']:.3f} < {min_agreement}")
+                continue
+            try:
+                return name, torch.jit.load(str(model_dir / info["file"]), map_location="cpu")
+            except Exception as e:
+                logger.warning(f"Could not load {name}, trying the next variant: {str(e)}")
+    return "fp32", load_fp32(model_dir)
+
+if __name__ == "__main__":
+    # python -m src.agents.export
+    for name, info in export().items():
+        print(f"{name:<12} {info['ms_per_token']:>8.3f} ms/token  agreement {info['agreement']:.4f}")
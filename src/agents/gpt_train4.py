@@ -1,71 +1,62 @@
+import glob
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader, TensorDataset
-import json
+from torch.utils.data import DataLoader
 from model4 import InterviewTransformer
-
-# === Load Dataset ===
-dataset = []
-with open("interview_data.jsonl", "r", encoding="utf-8") as f:
-    for line in f:
-        data = json.loads(line)
-        text = f"Q: {data['question']} A: {data['answer']}"
-        dataset.append(text)
-
-# === Tokenisasi Manual ===
-char_vocab = sorted(set("".join(dataset)))  # Pastikan urutan tetap konsisten
-char_vocab.insert(0, "<PAD>")  # Tambahkan token padding di indeks 0
-char_to_idx = {char: idx for idx, char in enumerate(char_vocab)}
-idx_to_char = {idx: char for char, idx in char_to_idx.items()}
-vocab_size = len(char_vocab)
-
-# Simpan vocab agar konsisten dengan inference
-with open("vocab.json", "w", encoding="utf-8") as f:
-    json.dump({"char_to_idx": char_to_idx, "idx_to_char": idx_to_char}, f)
-
-# Tokenisasi dataset ke indeks
-max_length = 128
-# Gunakan karakter padding unik, misalnya " " (spasi)
-PAD_CHAR = " "
-char_vocab.insert(0, PAD_CHAR)  # Tambahkan karakter padding di indeks 0
-char_to_idx = {char: idx for idx, char in enumerate(char_vocab)}
-idx_to_char = {idx: char for char, idx in char_to_idx.items()}
-
-# Tokenisasi dataset dengan padding karakter " "
-tokenized_data = [
-    [char_to_idx[char] for char in text[:max_length].ljust(max_length, PAD_CHAR)]
-    for text in dataset
-]
-tokenized_data = torch.tensor(tokenized_data)
-
-# === Model ===
-model = InterviewTransformer(vocab_size)
-optimizer = optim.AdamW(model.parameters(), lr=1e-3)
-#loss_fn = nn.CrossEntropyLoss(ignore_index=char_to_idx["<PAD>"])  # Abaikan padding
-loss_fn = nn.CrossEntropyLoss(ignore_index=char_to_idx[" "])  # Abaikan padding saat training
-
-
-# === DataLoader ===
-batch_size = 8
-dataset = TensorDataset(tokenized_data[:-1], tokenized_data[1:])
-dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-
-# === Training ===
-num_epochs = 100
-for epoch in range(num_epochs):
-    total_loss = 0
-    for inputs, targets in dataloader:
-        optimizer.zero_grad()
-        outputs = model(inputs)
-        loss = loss_fn(outputs.view(-1, vocab_size), targets.view(-1))
-        loss.backward()
-        optimizer.step()
-        total_loss += loss.item()
-    
-    avg_loss = total_loss / len(dataloader)
-    print(f"Epoch {epoch+1}, Loss: {avg_loss:.4f}")
-
-# === Simpan Model ===
-torch.save(model.state_dict(), "interviewer_transformer.pth")
-print("Model telah disimpan!")
+from tokenizer import CharTokenizer
+from dataset import InterviewShardDataset, iter_texts
+
+def main():
+    # === Load Dataset ===
+    # Shard JSONL (interview_data*.jsonl) dibaca secara streaming, tidak dimuat ke RAM
+    shards = sorted(glob.glob("interview_data*.jsonl"))
+
+    # === Tokenisasi ===
+    # Satu sumber token spesial: <PAD> di indeks 0, dipakai juga oleh inferensi
+    # Vocab dibangun dengan satu pass streaming atas semua shard
+    tokenizer = CharTokenizer.from_texts(iter_texts(shards))
+    vocab_size = tokenizer.vocab_size
+
+    # Simpan vocab agar konsisten dengan inference
+    tokenizer.save("vocab.json")
+
+    # === Model ===
+    model = InterviewTransformer(vocab_size)
+    optimizer = optim.AdamW(model.parameters(), lr=1e-3)
+    loss_fn = nn.CrossEntropyLoss(ignore_index=tokenizer.pad_id)  # Abaikan padding saat training
+
+
+    # === DataLoader ===
+    # Input dan target adalah window yang sama digeser satu karakter, dibatch per panjang (bucket)
+    max_length = 128
+    batch_size = 8
+    num_workers = 2
+    dataset = InterviewShardDataset(shards, tokenizer, window=max_length, batch_size=batch_size, shuffle_buffer=1024)
+    dataloader = DataLoader(dataset, batch_size=None, num_workers=num_workers)
+
+    # === Training ===
+    num_epochs = 100
+    for epoch in range(num_epochs):
+        dataset.set_epoch(epoch)
+        total_loss = 0
+        num_batches = 0
+        for inputs, targets in dataloader:
+            optimizer.zero_grad()
+            outputs = model(inputs, causal=True)  # Kausal, sesuai decode bertahap saat inferensi
+            loss = loss_fn(outputs.view(-1, vocab_size), targets.view(-1))
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            num_batches += 1
+
+        avg_loss = total_loss / max(num_batches, 1)
+        print(f"Epoch {epoch+1}, Loss: {avg_loss:.4f}")
+
+    # === Simpan Model ===
+    torch.save(model.state_dict(), "interviewer_transformer.pth")
+    print("Model telah disimpan!")
+
+# Worker DataLoader meng-import ulang modul ini pada start method spawn (macOS/Windows)
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,158 @@
+from typing import List, Optional, Sequence, Tuple
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+
+# Per-layer (key, value) tensors of shape (batch, heads, positions, head_dim)
+KVCache = List[Tuple[torch.Tensor, torch.Tensor]]
 
 class InterviewTransformer(nn.Module):
     def __init__(self, vocab_size, embed_dim=128, num_heads=4, num_layers=3):
     #def __init__(self, vocab_size, embed_dim=256, num_heads=8, num_layers=6):
         super().__init__()
+        self.num_heads = num_heads
         self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)  # Tambahkan padding_idx
         encoder_layer = nn.TransformerEncoderLayer(d_model=embed_dim, nhead=num_heads, batch_first=True)
         self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
         self.fc_out = nn.Linear(embed_dim, vocab_size)
 
-    def forward(self, x):
+    def forward(self, x, causal=False, key_padding_mask=None):
+        """Logits for every position; causal=True lets each position attend only to earlier ones"""
+        mask = nn.Transformer.generate_square_subsequent_mask(x.size(1), device=x.device) if causal else None
         x = self.embedding(x)
-        x = self.transformer(x)
+        x = self.transformer(x, mask=mask, src_key_padding_mask=key_padding_mask, is_causal=causal)
         x = self.fc_out(x)
         return x
+
+    def decoder(self) -> "CachedDecoder":
+        """Incremental decoder sharing this model's weights, built on first use"""
+        decoder = self.__dict__.get("_decoder")
+        if decoder is None:
+            # Kept out of the module registry so the weights are not saved twice
+            decoder = self.__dict__["_decoder"] = CachedDecoder(self)
+        return decoder
+
+    def decode(
+        self,
+        x: torch.Tensor,
+        cache: Optional[KVCache] = None,
+        key_padding_mask: Optional[torch.Tensor] = None
+    ) -> Tuple[torch.Tensor, KVCache]:
+        """Causal logits for the new positions x given the cached state of all earlier ones (see CachedDecoder)"""
+        return self.decoder()(x, cache, key_padding_mask)
+
+    @staticmethod
+    def trim_cache(cache: KVCache, window: int) -> KVCache:
+        """Keep the last window positions, a sliding approximation once a sequence outgrows the trained length"""
+        return [(k[:, :, -window:], v[:, :, -window:]) for k, v in cache]
+
+    @torch.inference_mode()
+    def generate(
+        self,
+        ids: Sequence[int],
+        max_new_tokens: int,
+        temperature: float = 0.0,
+        stop_ids: Sequence[int] = (),
+        window: Optional[int] = None
+    ) -> List[int]:
+        """Causally decode up to max_new_tokens ids after the prompt ids, one cached step at a time"""
+        if window:
+            ids = ids[-window:]
+        logits, cache = self.decode(torch.tensor([list(ids)]))
+        generated: List[int] = []
+        for _ in range(max_new_tokens):
+            last = logits[0, -1]
+            if temperature > 0:
+                next_id = int(torch.multinomial(torch.softmax(last / temperature, dim=-1), 1))
+            else:
+                next_id = int(last.argmax())
+            if next_id in stop_ids:
+                break
+            generated.append(next_id)
+            if window and cache[0][0].size(2) >= window:
+                cache = self.trim_cache(cache, window - 1)
+            logits, cache = self.decode(torch.tensor([[next_id]]), cache)
+        return generated
+
+class _DecoderLayer(nn.Module):
+    """The weights of one post-norm encoder layer as plain modules"""
+
+    def __init__(self, layer: nn.TransformerEncoderLayer):
+        super().__init__()
+        attn = layer.self_attn
+        dim = attn.embed_dim
+        # Plain nn.Linear views of the attention projections, so dynamic quantization covers them too
+        self.in_proj = nn.Linear(dim, 3 * dim)
+        self.in_proj.weight = attn.in_proj_weight
+        self.in_proj.bias = attn.in_proj_bias
+        self.out_proj = nn.Linear(dim, dim)
+        self.out_proj.weight = attn.out_proj.weight
+        self.out_proj.bias = attn.out_proj.bias
+        self.linear1 = layer.linear1
+        self.linear2 = layer.linear2
+        self.norm1 = layer.norm1
+        self.norm2 = layer.norm2
+
+class CachedDecoder(nn.Module):
+    """Causal incremental decoding over an InterviewTransformer's weights.
+
+    forward(x, cache, key_padding_mask) returns the logits of the new
+    positions x and the extended per-layer key/value cache. It equals the
+    last x.size(1) positions of InterviewTransformer.forward(all_positions,
+    causal=True), but each layer only computes the new positions.
+    key_padding_mask (True = padding) covers cached and new positions.
+    Mirrors nn.TransformerEncoderLayer in eval mode (post-norm, ReLU) and
+    compiles with TorchScript, which is how it is exported.
+    """
+
+    def __init__(self, model: InterviewTransformer):
+        super().__init__()
+        self.num_heads = model.num_heads
+        self.embedding = model.embedding
+        self.layers = nn.ModuleList([_DecoderLayer(layer) for layer in model.transformer.layers])
+        self.fc_out = model.fc_out
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        cache: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None,
+        key_padding_mask: Optional[torch.Tensor] = None
+    ) -> Tuple[torch.Tensor, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        batch, length = x.size(0), x.size(1)
+        h = self.embedding(x)
+        dim = h.size(2)
+        head_dim = dim // self.num_heads
+        new_cache: List[Tuple[torch.Tensor, torch.Tensor]] = []
+        i = 0
+        for layer in self.layers:
+            qkv = layer.in_proj(h).view(batch, length, 3, self.num_heads, head_dim).permute(2, 0, 3, 1, 4)
+            q, k, v = qkv[0], qkv[1], qkv[2]
+            if cache is not None:
+                k = torch.cat([cache[i][0], k], dim=2)
+                v = torch.cat([cache[i][1], v], dim=2)
+            new_cache.append((k, v))
+            i += 1
+
+            total = k.size(2)
+            positions = torch.arange(total, device=h.device)
+            queries = positions[total - length:].unsqueeze(1)
+            allowed = positions.unsqueeze(0) <= queries
+            if key_padding_mask is not None:
+                # A padded query may still see itself, so no row is fully masked (which would yield NaN)
+                allowed = (allowed & ~key_padding_mask.unsqueeze(1)) | (positions.unsqueeze(0) == queries)
+                allowed = allowed.unsqueeze(1)
+
+            out = F.scaled_dot_product_attention(q, k, v, attn_mask=allowed)
+            h = layer.norm1(h + layer.out_proj(out.transpose(1, 2).reshape(batch, length, dim)))
+            h = layer.norm2(h + layer.linear2(F.relu(layer.linear1(h))))
+        return self.fc_out(h), new_cache
+
+    @torch.jit.export
+    def decode(
+        self,
+        x: torch.Tensor,
+        cache: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None,
+        key_padding_mask: Optional[torch.Tensor] = None
+    ) -> Tuple[torch.Tensor, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        """Same as forward, the name the inference scheduler calls"""
+        return self.forward(x, cache, key_padding_mask)
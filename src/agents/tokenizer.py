@@ -0,0 +1,96 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import json
+import numpy as np
+
+class CharTokenizer:
+    """Character vocabulary with vectorized encoding through a codepoint lookup table.
+
+    Id 0 is the padding token, the only special token; every other id is
+    one character. Characters outside the vocabulary encode as padding, as
+    the model has always treated them. Whole batches are encoded with one
+    UTF-32 conversion and one table lookup, and decoded with one gather.
+    The vocab.json format (char_to_idx / idx_to_char) is unchanged.
+    """
+
+    PAD_TOKEN = "<PAD>"
+    PAD_ID = 0
+
+    def __init__(self, chars: Sequence[str]):
+        chars = [char for char in chars if char != self.PAD_TOKEN]
+        if any(len(char) != 1 for char in chars) or len(set(chars)) != len(chars):
+            raise ValueError("Vocabulary must be distinct single characters")
+        self.chars = chars
+        self.char_to_idx: Dict[str, int] = {self.PAD_TOKEN: self.PAD_ID}
+        self.char_to_idx.update({char: i for i, char in enumerate(chars, start=1)})
+        codepoints = np.array([ord(char) for char in chars], dtype=np.int64)
+        # One slot past the largest codepoint catches every character outside the vocabulary
+        self._lut = np.full(int(codepoints.max(initial=0)) + 2, self.PAD_ID, dtype=np.int64)
+        self._lut[codepoints] = np.arange(1, len(chars) + 1)
+        # Padding decodes to nothing
+        self._id_to_char = np.array([""] + chars, dtype=object)
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self.chars) + 1
+
+    @property
+    def pad_id(self) -> int:
+        return self.PAD_ID
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "CharTokenizer":
+        """Vocabulary of every character in texts, in sorted (stable) order"""
+        chars = set()
+        for text in texts:
+            chars.update(text)
+        return cls(sorted(chars))
+
+    @classmethod
+    def load(cls, path) -> "CharTokenizer":
+        with open(path, "r", encoding="utf-8") as f:
+            char_to_idx = json.load(f)["char_to_idx"]
+        if char_to_idx.get(cls.PAD_TOKEN) != cls.PAD_ID:
+            raise ValueError(f"{path}: {cls.PAD_TOKEN} must have id {cls.PAD_ID}")
+        ordered = sorted(char_to_idx.items(), key=lambda item: item[1])
+        if [idx for _, idx in ordered] != list(range(len(ordered))):
+            raise ValueError(f"{path}: ids must be contiguous from {cls.PAD_ID}")
+        return cls([char for char, _ in ordered])
+
+    def save(self, path) -> None:
+        idx_to_char = {idx: char for char, idx in self.char_to_idx.items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"char_to_idx": self.char_to_idx, "idx_to_char": idx_to_char}, f)
+
+    def encode(self, text: str) -> np.ndarray:
+        codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        return self._lut[np.minimum(codepoints, len(self._lut) - 1)]
+
+    def encode_batch(self, texts: Sequence[str], max_length: Optional[int] = None, pad_left: bool = False) -> np.ndarray:
+        """(len(texts), length) ids, padded to the longest text or truncated/padded to max_length.
+
+        Truncation keeps the start of each text, or its end with pad_left
+        (the end is what a decoder continues from).
+        """
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        # Trailing padding id: positions past a text's end gather from here
+        flat = np.append(self.encode("".join(texts)), self.PAD_ID)
+        width = int(lengths.max(initial=0)) if max_length is None else max_length
+        starts = np.cumsum(lengths) - lengths
+        kept = np.minimum(lengths, width)
+        columns = np.arange(width)
+        if pad_left:
+            # Row i takes its last kept[i] characters into the last kept[i] columns
+            inside = columns >= (width - kept)[:, None]
+            source = (starts + lengths - width)[:, None] + columns
+        else:
+            inside = columns < kept[:, None]
+            source = starts[:, None] + columns
+        return flat[np.where(inside, source, len(flat) - 1)]
+
+    def decode(self, ids: Union[Sequence[int], np.ndarray]) -> str:
+        return "".join(self._id_to_char[np.asarray(ids, dtype=np.int64)].tolist())
+
+    def decode_batch(self, ids: Union[Sequence[Sequence[int]], np.ndarray]) -> List[str]:
+        """Decode rows of ids, dropping padding"""
+        chars = self._id_to_char[np.asarray(ids, dtype=np.int64)]
+        return ["".join(row) for row in chars.tolist()]
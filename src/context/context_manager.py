@@ -1,40 +1,227 @@
-from typing import Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, Union
+from collections import Counter, OrderedDict, deque
+from collections.abc import Sequence
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+import asyncio
 import json
+import re
 import zlib
 import logging
 from datetime import datetime
+from ..core.locks import StripedLock
+
+# Entry tags: first byte of every stored entry
+_RAW = 0
+_ZDICT = 1
+
+_DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "interview_data.jsonl"
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]+|\s+")
+
+# Structural fragments every context payload shares
+_SEED_PAYLOADS = [
+    {"conversation": [{"role": "user", "content": ""}, {"role": "assistant", "content": ""}],
+     "metadata": {"session_id": ""}, "timestamp": "2024-01-01T00:00:00.000000"},
+    {"input": {"session_id": "", "message": "", "topic": None, "question": None, "point": None},
+     "response": "", "prompt_type": "question", "timestamp": "2024-01-01T00:00:00.000000"},
+    {"last_result": "", "timestamp": "2024-01-01T00:00:00.000000"},
+]
+
+def train_dictionary(samples: Iterable[str], size: int = 8192, max_ngram: int = 6) -> bytes:
+    """Build a zlib preset dictionary from the most valuable repeated fragments in samples.
+
+    Fragments are n-grams of word/punctuation tokens scored by frequency times
+    length. The best fragments are placed last, since zlib matches closer
+    dictionary bytes with shorter distances.
+    """
+    counts: Counter = Counter()
+    for sample in samples:
+        tokens = _TOKEN_RE.findall(sample)
+        for n in range(1, max_ngram + 1):
+            for i in range(len(tokens) - n + 1):
+                counts["".join(tokens[i:i + n])] += 1
+
+    scored = sorted(
+        (count * len(fragment.encode("utf-8")), fragment)
+        for fragment, count in counts.items()
+        if count > 1 and len(fragment) > 2
+    )
+    chosen: List[str] = []
+    used = 0
+    for _, fragment in reversed(scored):
+        encoded_len = len(fragment.encode("utf-8"))
+        if used + encoded_len > size:
+            continue
+        if any(fragment in other for other in chosen):
+            continue
+        chosen.append(fragment)
+        used += encoded_len
+    return "".join(reversed(chosen)).encode("utf-8")
+
+def _serialize(data: Dict) -> bytes:
+    """One ``"field":value`` JSON pair per line.
+
+    json.dumps escapes newlines inside values, so lines split cleanly and a
+    single field can be decoded without parsing the rest of the entry. Field
+    names are stringified as JSON objects would, and values JSON cannot
+    represent (e.g. datetime) are stored as their str().
+    """
+    return "\n".join(
+        f"{json.dumps(str(name))}:{json.dumps(value, separators=(',', ':'), default=str)}"
+        for name, value in data.items()
+    ).encode("utf-8")
+
+def _deserialize(body: bytes) -> Dict:
+    return json.loads(b"{" + body.replace(b"\n", b",") + b"}") if body else {}
+
+def _deserialize_field(body: bytes, field: str, default: Any = None) -> Any:
+    prefix = f"{json.dumps(field)}:".encode("utf-8")
+    for line in body.split(b"\n"):
+        if line.startswith(prefix):
+            return json.loads(line[len(prefix):])
+    return default
+
+class ContextView(Sequence):
+    """Lazily decoded window over a session's stored entries.
+
+    Entries are decoded on access and memoized by the owning manager. Returned dicts are shallow copies; nested values are shared
+    with the memo and must not be mutated.
+    """
+
+    def __init__(self, manager: "ContextManager", key: str, entries: List[bytes]):
+        self._manager = manager
+        self._key = key
+        self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            return [self._manager._decode_cached(self._key, entry) for entry in self._entries[index]]
+        return self._manager._decode_cached(self._key, self._entries[index])
+
+    def field(self, name: str, default: Any = None) -> List[Any]:
+        """Values of one top-level field for every entry, without building full dicts"""
+        return [self._manager._decode_field(self._key, entry, name, default) for entry in self._entries]
+
+    def get_field(self, index: int, name: str, default: Any = None) -> Any:
+        """Value of one top-level field of a single entry"""
+        return self._manager._decode_field(self._key, self._entries[index], name, default)
+
+@lru_cache(maxsize=1)
+def default_dictionary() -> bytes:
+    """Dictionary trained on the bundled interview payloads"""
+    samples = [_serialize(payload).decode("utf-8") for payload in _SEED_PAYLOADS]
+    if _DATA_FILE.exists():
+        with open(_DATA_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    samples.append(_serialize({
+                        "input": {"message": record.get("question", "")},
+                        "response": record.get("answer", ""),
+                        "prompt_type": "question"
+                    }).decode("utf-8"))
+    # Count every sample twice so fragments seen once in this small corpus still qualify
+    return train_dictionary(samples * 2)
 
 class ContextManager:
-    def __init__(self, max_size: int = 1000):
-        self.context: Dict[str, List[Dict]] = {}
+    def __init__(
+        self,
+        max_size: int = 1000,
+        dictionary: Optional[bytes] = None,
+        compression_threshold: int = 64,
+        compression_level: int = 6,
+        memo_size: int = 256
+    ):
+        self.context: Dict[str, Deque[bytes]] = {}
         self.max_size = max_size
-        self.compression_threshold = 500  # Threshold for compression in bytes
+        self.compression_threshold = compression_threshold  # Entries smaller than this are stored raw
+        self.compression_level = compression_level
+        self.memo_size = memo_size
+        # LRU of recently decoded entries across all keys, keyed by (key, id() of the stored bytes).
+        # The memo holds a reference to those bytes, so an id cannot be reused while it is cached.
+        self._memo: "OrderedDict[Tuple[str, int], Tuple[bytes, Dict]]" = OrderedDict()
+        self._locks = StripedLock()
+        self.dictionary = default_dictionary() if dictionary is None else dictionary
+        # Raw deflate streams (no zlib header/checksum) from primed (de)compressors that are
+        # copied per entry instead of re-loading the dictionary every time
+        self._compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.dictionary)
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.dictionary)
+
+    def _encode(self, data: Dict) -> bytes:
+        """Serialize an entry to bytes, compressing with the shared dictionary when it helps."""
+        raw = _serialize(data)
+        if len(raw) >= self.compression_threshold:
+            compressor = self._compressor.copy()
+            compressed = compressor.compress(raw) + compressor.flush()
+            if len(compressed) < len(raw):
+                return bytes((_ZDICT,)) + compressed
+        return bytes((_RAW,)) + raw
+
+    def _body(self, entry: bytes) -> bytes:
+        if entry[0] == _ZDICT:
+            decompressor = self._decompressor.copy()
+            return decompressor.decompress(entry[1:]) + decompressor.flush()
+        return entry[1:]
+
+    def _decode(self, entry: bytes) -> Dict:
+        """Inverse of _encode."""
+        return _deserialize(self._body(entry))
+
+    def _decode_cached(self, key: str, entry: bytes) -> Dict:
+        memo_key = (key, id(entry))
+        cached = self._memo.get(memo_key)
+        if cached is not None and cached[0] is entry:
+            self._memo.move_to_end(memo_key)
+            return dict(cached[1])
+        decoded = self._decode(entry)
+        self._memo[memo_key] = (entry, decoded)
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return dict(decoded)
+
+    def _decode_field(self, key: str, entry: bytes, field: str, default: Any = None) -> Any:
+        cached = self._memo.get((key, id(entry)))
+        if cached is not None and cached[0] is entry:
+            return cached[1].get(field, default)
+        return _deserialize_field(self._body(entry), field, default)
+
+    def _forget(self, key: str, entry: Optional[bytes] = None) -> None:
+        """Drop the memoized decode of one entry, or of every entry of key"""
+        if entry is not None:
+            self._memo.pop((key, id(entry)), None)
+            return
+        for memo_key in [memo_key for memo_key in self._memo if memo_key[0] == key]:
+            del self._memo[memo_key]
+
+    def _append(self, key: str, data: Dict) -> None:
+        if key not in self.context:
+            self.context[key] = deque(maxlen=self.max_size)
+
+        # Add timestamp
+        data['timestamp'] = datetime.now().isoformat()
+
+        # The bounded deque drops the oldest entry once max_size is reached
+        entries = self.context[key]
+        if len(entries) == entries.maxlen:
+            self._forget(key, entries[0])
+        entries.append(self._encode(data))
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Per-key lock for callers that read and write a key across awaits.
+
+        store_context and update_context never await, so each is atomic on
+        the event loop by itself and may be called while holding this lock.
+        """
+        return self._locks(key)
 
     async def store_context(self, key: str, data: Dict) -> None:
         """Store context data with compression if needed."""
         try:
-            if key not in self.context:
-                self.context[key] = []
-            
-            # Add timestamp
-            data['timestamp'] = datetime.now().isoformat()
-            
-            # Check if compression is needed
-            serialized = json.dumps(data)
-            if len(serialized) > self.compression_threshold:
-                compressed = zlib.compress(serialized.encode())
-                data = {
-                    'compressed': True,
-                    'data': compressed.decode('latin1'),
-                    'timestamp': data['timestamp']
-                }
-            
-            self.context[key].append(data)
-            
-            # Maintain max size
-            if len(self.context[key]) > self.max_size:
-                self.context[key] = self.context[key][-self.max_size:]
-                
+            self._append(key, data)
         except Exception as e:
             logging.error(f"Failed to store context: {str(e)}")
             raise
@@ -42,37 +229,40 @@ class ContextManager:
     async def retrieve_context(self, key: str, limit: Optional[int] = None) -> List[Dict]:
         """Retrieve and decompress context data if needed."""
         try:
-            if key not in self.context:
-                return []
-            
-            context_data = self.context[key]
-            if limit:
-                context_data = context_data[-limit:]
-            
-            result = []
-            for item in context_data:
-                if item.get('compressed', False):
-                    decompressed = zlib.decompress(item['data'].encode('latin1'))
-                    data = json.loads(decompressed)
-                    data['timestamp'] = item['timestamp']
-                    result.append(data)
-                else:
-                    result.append(item)
-            
-            return result
+            return list(await self.view_context(key, limit))
         except Exception as e:
             logging.error(f"Failed to retrieve context: {str(e)}")
             raise
 
+    async def view_context(self, key: str, limit: Optional[int] = None) -> ContextView:
+        """Lazily decoded view of the most recent entries."""
+        context_data = self.context.get(key)
+        if not context_data:
+            return ContextView(self, key, [])
+
+        start = max(0, len(context_data) - limit) if limit else 0
+        return ContextView(self, key, list(islice(context_data, start, None)))
+
+    async def retrieve_field(self, key: str, field: str, limit: Optional[int] = None) -> List[Any]:
+        """Retrieve one top-level field (e.g. ``response``) of the most recent entries."""
+        try:
+            return (await self.view_context(key, limit)).field(field)
+        except Exception as e:
+            logging.error(f"Failed to retrieve context field: {str(e)}")
+            raise
+
     async def update_context(self, key: str, data: Dict) -> None:
         """Update the most recent context entry."""
         try:
             if key not in self.context or not self.context[key]:
-                await self.store_context(key, data)
+                self._append(key, data)
                 return
-            
+
             # Update the most recent entry
-            self.context[key][-1].update(data)
+            entry = self._decode(self.context[key][-1])
+            entry.update(data)
+            self._forget(key, self.context[key][-1])
+            self.context[key][-1] = self._encode(entry)
         except Exception as e:
             logging.error(f"Failed to update context: {str(e)}")
             raise
@@ -83,8 +273,10 @@ class ContextManager:
             if key:
                 if key in self.context:
                     del self.context[key]
+                self._forget(key)
             else:
                 self.context.clear()
+                self._memo.clear()
         except Exception as e:
             logging.error(f"Failed to clear context: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
@@ -0,0 +1,304 @@
+from typing import AsyncIterator, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import time
+import numpy as np
+from .config import settings
+from .logging import logger
+from .errors import AGNOError
+from .providers import LLMProvider, ProviderWrapper
+
+# Approximate per-entry bookkeeping cost (key bytes, ndarray header, dict slot)
+_ENTRY_OVERHEAD_BYTES = 200
+
+def embedding_cache_key(provider: str, model: str, text: str) -> bytes:
+    """Compact 16-byte key for an embedding of text by provider/model"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (provider, model, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.digest()
+
+class EmbeddingCache:
+    """Byte-bounded LRU cache of embeddings with optional TTL expiry"""
+
+    def __init__(
+        self,
+        max_bytes: int = settings.EMBEDDING_CACHE_MAX_BYTES,
+        ttl_seconds: float = settings.EMBEDDING_CACHE_TTL_SECONDS,
+        dtype: str = settings.EMBEDDING_CACHE_DTYPE
+    ):
+        if dtype not in ("float32", "float16"):
+            raise AGNOError(f"Unsupported embedding cache dtype: {dtype}")
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.dtype = np.dtype(dtype)
+        self._entries: "OrderedDict[bytes, Tuple[np.ndarray, float]]" = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: bytes) -> bool:
+        return self._live_entry(key) is not None
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Get a cached embedding, refreshing its LRU position"""
+        entry = self._live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: bytes, embedding) -> np.ndarray:
+        """Store an embedding in the cache dtype and evict until within budget"""
+        array = np.array(embedding, dtype=self.dtype)
+        array.flags.writeable = False
+        if key in self._entries:
+            self._remove(key)
+        size = array.nbytes + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return array
+        self._entries[key] = (array, time.monotonic())
+        self.bytes_used += size
+        while self.bytes_used > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return array
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters"""
+        self._entries.clear()
+        self.bytes_used = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters and memory usage"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _live_entry(self, key: bytes) -> Optional[Tuple[np.ndarray, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.monotonic() - entry[1] > self.ttl_seconds:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: bytes) -> None:
+        array, _ = self._entries.pop(key)
+        self.bytes_used -= array.nbytes + _ENTRY_OVERHEAD_BYTES
+
+def response_cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    system_message: Optional[str],
+    prompt: str,
+    max_tokens: Optional[int] = None
+) -> str:
+    """Hex digest identifying a generation request"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (provider, model, repr(temperature), system_message or "", prompt, repr(max_tokens)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class ResponseCache:
+    """Two-tier cache of generated responses: process-local LRU plus optional shared Redis"""
+
+    def __init__(
+        self,
+        max_entries: int = settings.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.RESPONSE_CACHE_TTL_SECONDS,
+        redis_client=None,
+        prefix: str = "agno:response"
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.prefix = prefix
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key from the local tier, then Redis"""
+        response = self._get_local(key)
+        if response is None and self.redis is not None:
+            response = self._remember_redis(key, self._get_redis(key))
+        if response is None:
+            self.misses += 1
+        return response
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """get with the Redis round trip run in a worker thread instead of on the event loop"""
+        response = self._get_local(key)
+        if response is None and self.redis is not None:
+            raw = await asyncio.get_running_loop().run_in_executor(None, self._get_redis, key)
+            response = self._remember_redis(key, raw)
+        if response is None:
+            self.misses += 1
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response in both tiers"""
+        self._put_local(key, response)
+        if self.redis is not None:
+            self._put_redis(key, response)
+
+    async def put_async(self, key: str, response: str) -> None:
+        """put with the Redis round trip run in a worker thread instead of on the event loop"""
+        self._put_local(key, response)
+        if self.redis is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._put_redis, key, response)
+
+    def clear(self) -> None:
+        """Drop all local entries, keeping the counters"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters per tier"""
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not self.ttl_seconds or time.monotonic() - entry[1] <= self.ttl_seconds:
+            self.local_hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        del self._entries[key]
+        self.expirations += 1
+        return None
+
+    def _get_redis(self, key: str):
+        """Raw Redis value; touches no local state, so it can run in a worker thread"""
+        try:
+            return self.redis.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            logger.warning(f"Response cache Redis read failed: {str(e)}")
+            return None
+
+    def _remember_redis(self, key: str, raw) -> Optional[str]:
+        if raw is None:
+            return None
+        response = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        self.redis_hits += 1
+        self._put_local(key, response)
+        return response
+
+    def _put_redis(self, key: str, response: str) -> None:
+        try:
+            # Redis applies the same TTL, so entries expire together across workers
+            self.redis.set(f"{self.prefix}:{key}", response, ex=int(self.ttl_seconds) or None)
+        except Exception as e:
+            logger.warning(f"Response cache Redis write failed: {str(e)}")
+
+    def _put_local(self, key: str, response: str) -> None:
+        self._entries[key] = (response, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+class CachingProvider(ProviderWrapper):
+    """Serve repeated generations from a ResponseCache.
+
+    Only deterministic calls (temperature 0) are cached, unless the caller
+    opts in or out explicitly with ``cache=True`` / ``cache=False``.
+    """
+
+    def __init__(self, inner: LLMProvider, cache: ResponseCache):
+        super().__init__(inner)
+        self.cache = cache
+
+    def _cache_key(self, prompt: str, kwargs: Dict) -> Optional[str]:
+        opt_in = kwargs.pop("cache", None)
+        temperature = kwargs.get("temperature", getattr(self.inner, "temperature", None))
+        if opt_in is False or (opt_in is None and temperature != 0):
+            return None
+        return response_cache_key(
+            getattr(self.inner, "name", type(self.inner).__name__),
+            getattr(self.inner, "model", ""),
+            temperature,
+            kwargs.get("system_message"),
+            prompt,
+            kwargs.get("max_tokens", getattr(self.inner, "max_tokens", None))
+        )
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        key = self._cache_key(prompt, kwargs)
+        if key is not None:
+            cached = await self.cache.get_async(key)
+            if cached is not None:
+                return cached
+        response = await self.inner.generate(prompt, **kwargs)
+        if key is not None:
+            await self.cache.put_async(key, response)
+        return response
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        key = self._cache_key(prompt, kwargs)
+        if key is not None:
+            cached = await self.cache.get_async(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        async for chunk in self.inner.generate_stream(prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Only completed streams are cached
+        if key is not None:
+            await self.cache.put_async(key, "".join(chunks))
+
+def create_response_cache(backend: str = settings.RESPONSE_CACHE_BACKEND) -> ResponseCache:
+    """Build the response cache, with a Redis tier when configured"""
+    if backend == "memory":
+        return ResponseCache()
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise AGNOError("redis package is required for the redis response cache")
+        return ResponseCache(redis_client=redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB))
+    raise AGNOError(f"Unsupported response cache backend: {backend}")
+
+response_cache = create_response_cache()
@@ -20,13 +20,86 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
     # LLM Provider Settings
-    DEFAULT_PROVIDER: str = "openai"
+    DEFAULT_PROVIDER: str = "router"  # "router" balances over ROUTER_BACKENDS, or a single provider name
     OPENAI_API_KEY: Optional[str] = None
     GROQ_API_KEY: Optional[str] = None
     
+    # HTTP Connection Pool
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP_TOTAL_TIMEOUT: float = 120.0
+    HTTP_DNS_CACHE_TTL: int = 300
+    SINGLEFLIGHT_ENABLED: bool = True  # share one upstream call among concurrent identical requests
+    
+    # Provider Rate Limiting (per provider; buckets adapt to x-ratelimit-* response headers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = 500
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = 200_000
+    RATE_LIMIT_DAILY_REQUEST_PROVIDERS: str = "groq"  # comma separated; their x-ratelimit-limit-requests is per day
+    CONCURRENCY_INITIAL: int = 16
+    CONCURRENCY_MIN: int = 1
+    CONCURRENCY_MAX: int = 128
+    QUEUE_MAX_DEPTH: int = 256
+    QUEUE_TIMEOUT_SECONDS: float = 10.0  # queued calls are shed with 503 after this
+    
+    # Deadlines, Retries and Hedging
+    REQUEST_TIMEOUT_SECONDS: float = 60.0  # per HTTP request, clients may lower it with X-Request-Timeout
+    PROVIDER_TIMEOUT_SECONDS: float = 30.0  # per upstream attempt
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY_SECONDS: float = 0.2
+    RETRY_MAX_DELAY_SECONDS: float = 5.0
+    HEDGE_ENABLED: bool = False  # duplicate slow calls after the rolling p95 latency
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_LOSER_GRACE_SECONDS: float = 2.0  # how long an outrun call may finish to measure the saving
+    
+    # Provider Routing
+    ROUTER_BACKENDS: str = "openai,groq"  # comma separated; the first one also serves embeddings
+    ROUTER_FALLBACK_BACKENDS: str = "local"  # only tried once every primary backend has failed or is open
+    ROUTER_EWMA_ALPHA: float = 0.2
+    ROUTER_ERROR_PENALTY: float = 4.0  # latency multiplier per unit of EWMA error rate
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failures that open a backend's circuit
+    CIRCUIT_RESET_TIMEOUT_SECONDS: float = 30.0  # before a half-open probe is allowed
+    
+    # Local Model (InterviewTransformer served in-process from MODEL_DIR)
+    LOCAL_INFERENCE_THREADS: int = 1
+    LOCAL_MAX_NEW_CHARS: int = 200
+    LOCAL_CONTEXT_CHARS: int = 128  # the window the model was trained on
+    LOCAL_BATCH_MAX_SIZE: int = 16  # concurrent sequences decoded together
+    LOCAL_BATCH_WAIT_MS: float = 5.0  # how long an idle model waits for more requests to batch
+    LOCAL_MIN_AGREEMENT: float = 0.98  # exported variants below this next-char agreement with fp32 are not loaded
+    GREETING_PROVIDER: Optional[str] = None  # e.g. "local" to answer greetings without a remote call
+    
+    # Embeddings
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_TTL_SECONDS: float = 0.0  # 0 disables expiry
+    EMBEDDING_CACHE_DTYPE: str = "float32"  # or "float16"
+    EMBEDDING_STORE_PATH: Optional[Path] = None  # persistent memory-mapped tier, disabled when unset
+    EMBEDDING_STORE_READONLY: bool = False
+    
+    # LLM Response Cache
+    RESPONSE_CACHE_ENABLED: bool = True  # only deterministic (temperature 0) or cache=True calls are cached
+    RESPONSE_CACHE_MAX_ENTRIES: int = 4096
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory" or "redis" (adds a shared tier)
+    SEMANTIC_CACHE_ENABLED: bool = False  # reuse answers of similar prompts; costs one embedding per turn
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # minimum cosine similarity for a hit
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2048  # per prompt type
+    
     # Context Management
     MAX_CONTEXT_LENGTH: int = 4096
     CONTEXT_COMPRESSION_THRESHOLD: int = 2048
+    CONTEXT_TOKEN_BUDGET: int = 1500  # prompt tokens available for history in user messages
+    CONTEXT_SUMMARY_TOKEN_BUDGET: int = 300
+    CONTEXT_BACKEND: str = "memory"  # "memory" or "redis"
+    CONTEXT_LOCAL_CACHE_SIZE: int = 1024
+    SESSION_TTL_SECONDS: int = 24 * 3600
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 60.0
+    CONTEXT_LOCK_STRIPES: int = 64  # per-session asyncio locks, hashed by session id
     
     # Redis Settings
     REDIS_HOST: str = "localhost"
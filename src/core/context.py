@@ -1,79 +1,519 @@
-from typing import Dict, List, Optional
+from abc import ABC, abstractmethod
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple, TypeVar
+from collections import OrderedDict, deque
+import asyncio
+import functools
+import heapq
+import json
+import threading
+import time
 from .config import settings
 from .logging import logger
+from .errors import AGNOError
+from .tokens import estimate_tokens
+from .locks import KeyedLock, StripedLock
 from datetime import datetime
 
-class ContextManager:
+T = TypeVar("T")
+
+def _entry_size(context: Dict) -> Tuple[str, int, int]:
+    """Encode a turn once and return it with its byte and token sizes"""
+    encoded = json.dumps(context, ensure_ascii=False, default=str)
+    return encoded, len(encoded.encode("utf-8")), estimate_tokens(encoded)
+
+class ContextStore(ABC):
+    """Storage backend holding session turns and session metadata"""
+
+    # Whether calls block on I/O and must be kept off the event loop
+    blocking = False
+
+    @abstractmethod
+    def append(self, session_id: str, context: Dict, max_length: int) -> Dict:
+        """Append a turn, keep at most max_length turns and return the session metadata.
+
+        The metadata carries running ``context_bytes`` and ``context_tokens``
+        totals that are updated on append and eviction, never recomputed.
+        """
+        pass
+
+    @abstractmethod
+    def update_last(self, session_id: str, updates: Dict) -> Optional[Dict]:
+        """Merge updates into the most recent turn and return the session metadata.
+
+        Returns None when the session has no turns.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[Dict]:
+        """Get all turns of a session and mark it as accessed"""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Delete a session and its metadata"""
+        pass
+
+    @abstractmethod
+    def get_metadata(self, session_id: str) -> Optional[Dict]:
+        """Get metadata for a session"""
+        pass
+
+    @abstractmethod
+    def sessions(self) -> List[str]:
+        """List active session ids"""
+        pass
+
+    def cleanup(self, max_age_seconds: float) -> List[str]:
+        """Remove sessions idle for longer than max_age_seconds, returning their ids"""
+        return []
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+class _Session:
+    __slots__ = ("turns", "sizes", "metadata", "last_access")
+
+    def __init__(self, max_length: int):
+        self.turns: deque = deque(maxlen=max_length)
+        self.sizes: deque = deque(maxlen=max_length)
+        self.last_access = time.monotonic()
+        now = datetime.now()
+        self.metadata = {
+            "created_at": now,
+            "last_accessed": now,
+            "context_count": 0,
+            "context_bytes": 0,
+            "context_tokens": 0
+        }
+
+class InMemoryContextStore(ContextStore):
+    """Process-local store; sessions are not shared between workers.
+
+    Idle sessions are found through a min-heap of (last access, session id)
+    on the monotonic clock. Touching a session pushes a fresh entry and leaves
+    the old one to be skipped when popped, so expiry costs O(expired * log n)
+    instead of a scan over every session.
+    """
+
     def __init__(self):
-        self.contexts: Dict[str, List[Dict]] = {}
+        self._sessions: Dict[str, _Session] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self.evicted_sessions = 0
+
+    def _touch(self, session_id: str, session: _Session) -> None:
+        session.last_access = time.monotonic()
+        session.metadata["last_accessed"] = datetime.now()
+        heapq.heappush(self._expiry, (session.last_access, session_id))
+        if len(self._expiry) > 2 * len(self._sessions) + 64:
+            # Drop stale entries left behind by repeated touches
+            self._expiry = [(s.last_access, sid) for sid, s in self._sessions.items()]
+            heapq.heapify(self._expiry)
+
+    def append(self, session_id: str, context: Dict, max_length: int) -> Dict:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(max_length)
+
+        _, size_bytes, size_tokens = _entry_size(context)
+        metadata = session.metadata
+        if len(session.turns) == session.turns.maxlen:
+            # The bounded deques drop the oldest turn on append; account for it first
+            evicted_bytes, evicted_tokens = session.sizes[0]
+            metadata["context_bytes"] -= evicted_bytes
+            metadata["context_tokens"] -= evicted_tokens
+        session.turns.append(context)
+        session.sizes.append((size_bytes, size_tokens))
+        metadata["context_bytes"] += size_bytes
+        metadata["context_tokens"] += size_tokens
+        metadata["context_count"] = len(session.turns)
+        self._touch(session_id, session)
+        return metadata
+
+    def update_last(self, session_id: str, updates: Dict) -> Optional[Dict]:
+        session = self._sessions.get(session_id)
+        if session is None or not session.turns:
+            return None
+
+        # Replace rather than mutate: lists handed out by get() keep their snapshot
+        turn = {**session.turns[-1], **updates}
+        _, size_bytes, size_tokens = _entry_size(turn)
+        old_bytes, old_tokens = session.sizes[-1]
+        session.turns[-1] = turn
+        session.sizes[-1] = (size_bytes, size_tokens)
+        metadata = session.metadata
+        metadata["context_bytes"] += size_bytes - old_bytes
+        metadata["context_tokens"] += size_tokens - old_tokens
+        self._touch(session_id, session)
+        return metadata
+
+    def get(self, session_id: str) -> List[Dict]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []
+        self._touch(session_id, session)
+        return list(session.turns)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def get_metadata(self, session_id: str) -> Optional[Dict]:
+        session = self._sessions.get(session_id)
+        return session.metadata if session is not None else None
+
+    def sessions(self) -> List[str]:
+        return list(self._sessions.keys())
+
+    def cleanup(self, max_age_seconds: float) -> List[str]:
+        deadline = time.monotonic() - max_age_seconds
+        expired = []
+        while self._expiry and self._expiry[0][0] < deadline:
+            last_access, session_id = heapq.heappop(self._expiry)
+            session = self._sessions.get(session_id)
+            # Entries superseded by a later touch (or a deleted session) are stale
+            if session is not None and session.last_access == last_access:
+                self.delete(session_id)
+                expired.append(session_id)
+        self.evicted_sessions += len(expired)
+        return expired
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live_sessions": len(self._sessions),
+            "evicted_sessions": self.evicted_sessions,
+            "expiry_heap_size": len(self._expiry)
+        }
+
+class RedisContextStore(ContextStore):
+    """Redis backed store shared by all workers.
+
+    Each session is a list of JSON encoded turns plus a metadata hash, both
+    expiring after ``ttl_seconds`` of inactivity instead of being scanned by
+    cleanup. Every write bumps a version counter in the hash so workers can
+    serve reads from a local copy until another worker writes. Calls are
+    blocking round trips, so ContextManager runs them in worker threads.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        client=None,
+        ttl_seconds: int = settings.SESSION_TTL_SECONDS,
+        prefix: str = "agno:session",
+        local_cache_size: int = settings.CONTEXT_LOCAL_CACHE_SIZE
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise AGNOError("redis package is required for the redis context backend")
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.local_cache_size = local_cache_size
+        self._local: "OrderedDict[str, Tuple[int, List[Dict]]]" = OrderedDict()
+        # Guards the local copy shared by the worker threads
+        self._local_lock = threading.Lock()
+        self.local_hits = 0
+        self.local_misses = 0
+
+    def _turns_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:turns"
+
+    def _meta_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:meta"
+
+    def _cache_local(self, session_id: str, version: int, turns: List[Dict]) -> None:
+        with self._local_lock:
+            self._local[session_id] = (version, turns)
+            self._local.move_to_end(session_id)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
+
+    def _drop_local(self, session_id: str) -> None:
+        with self._local_lock:
+            self._local.pop(session_id, None)
+
+    def _local_copy(self, session_id: str, version: int) -> Optional[List[Dict]]:
+        with self._local_lock:
+            cached = self._local.get(session_id)
+            if cached is None or cached[0] != version:
+                return None
+            self._local.move_to_end(session_id)
+            return cached[1]
+
+    def _sizes_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:sizes"
+
+    def append(self, session_id: str, context: Dict, max_length: int) -> Dict:
+        encoded, size_bytes, size_tokens = _entry_size(context)
+        turns_key, meta_key = self._turns_key(session_id), self._meta_key(session_id)
+        sizes_key = self._sizes_key(session_id)
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(turns_key, encoded)
+        pipe.rpush(sizes_key, f"{size_bytes}:{size_tokens}")
+        # Sizes of the turns about to be trimmed, read atomically with the trim
+        pipe.lrange(sizes_key, 0, -(max_length + 1))
+        pipe.ltrim(turns_key, -max_length, -1)
+        pipe.ltrim(sizes_key, -max_length, -1)
+        pipe.llen(turns_key)
+        pipe.hsetnx(meta_key, "created_at", time.time())
+        pipe.hget(meta_key, "created_at")
+        pipe.hincrby(meta_key, "bytes", size_bytes)
+        pipe.hincrby(meta_key, "tokens", size_tokens)
+        pipe.hincrby(meta_key, "version", 1)
+        for key in (turns_key, sizes_key, meta_key):
+            pipe.expire(key, self.ttl_seconds)
+        _, _, evicted, _, _, count, _, created_at, total_bytes, total_tokens, version, *_ = pipe.execute()
+
+        if evicted:
+            evicted_bytes = evicted_tokens = 0
+            for raw in evicted:
+                b, t = raw.decode().split(":") if isinstance(raw, bytes) else raw.split(":")
+                evicted_bytes += int(b)
+                evicted_tokens += int(t)
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hincrby(meta_key, "bytes", -evicted_bytes)
+            pipe.hincrby(meta_key, "tokens", -evicted_tokens)
+            total_bytes, total_tokens = pipe.execute()
+
+        # Extend the local copy only when no other worker wrote in between
+        cached = self._local.get(session_id)
+        if version == 1 or (cached is not None and cached[0] == version - 1):
+            turns = (cached[1] if version > 1 else []) + [json.loads(encoded)]
+            self._cache_local(session_id, version, turns[-max_length:])
+        else:
+            self._drop_local(session_id)
+        return {
+            "created_at": datetime.fromtimestamp(float(created_at)),
+            "last_accessed": datetime.now(),
+            "context_count": count,
+            "context_bytes": total_bytes,
+            "context_tokens": total_tokens
+        }
+
+    def update_last(self, session_id: str, updates: Dict) -> Optional[Dict]:
+        turns_key, meta_key = self._turns_key(session_id), self._meta_key(session_id)
+        sizes_key = self._sizes_key(session_id)
+
+        def replace_last(pipe):
+            # WATCHed read-modify-write, retried by redis-py if another worker writes the turns
+            raw = pipe.lindex(turns_key, -1)
+            if raw is None:
+                return None
+            old_size = pipe.lindex(sizes_key, -1)
+            old_bytes, old_tokens = (old_size.decode() if isinstance(old_size, bytes) else old_size).split(":")
+            encoded, size_bytes, size_tokens = _entry_size({**json.loads(raw), **updates})
+            pipe.multi()
+            pipe.lset(turns_key, -1, encoded)
+            pipe.lset(sizes_key, -1, f"{size_bytes}:{size_tokens}")
+            pipe.hincrby(meta_key, "bytes", size_bytes - int(old_bytes))
+            pipe.hincrby(meta_key, "tokens", size_tokens - int(old_tokens))
+            pipe.hincrby(meta_key, "version", 1)
+            for key in (turns_key, sizes_key, meta_key):
+                pipe.expire(key, self.ttl_seconds)
+            return True
+
+        if not self.client.transaction(replace_last, turns_key, sizes_key, value_from_callable=True):
+            return None
+        self._drop_local(session_id)
+        return self.get_metadata(session_id)
+
+    def get(self, session_id: str) -> List[Dict]:
+        turns_key, meta_key = self._turns_key(session_id), self._meta_key(session_id)
+        # Refreshing the TTL doubles as the last-access mark
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(meta_key, "version")
+        pipe.expire(turns_key, self.ttl_seconds)
+        pipe.expire(self._sizes_key(session_id), self.ttl_seconds)
+        pipe.expire(meta_key, self.ttl_seconds)
+        version, *_ = pipe.execute()
+        if version is None:
+            self._drop_local(session_id)
+            return []
+
+        cached = self._local_copy(session_id, int(version))
+        if cached is not None:
+            self.local_hits += 1
+            return list(cached)
+
+        self.local_misses += 1
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hget(meta_key, "version")
+        pipe.lrange(turns_key, 0, -1)
+        version, raw_turns = pipe.execute()
+        turns = [json.loads(raw) for raw in raw_turns]
+        if version is not None:
+            self._cache_local(session_id, int(version), turns)
+        return list(turns)
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._turns_key(session_id), self._sizes_key(session_id), self._meta_key(session_id))
+        self._drop_local(session_id)
+
+    def get_metadata(self, session_id: str) -> Optional[Dict]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(self._meta_key(session_id), "created_at", "bytes", "tokens")
+        pipe.llen(self._turns_key(session_id))
+        pipe.pttl(self._meta_key(session_id))
+        (created_at, total_bytes, total_tokens), count, pttl = pipe.execute()
+        if created_at is None:
+            return None
+        idle_seconds = max(0.0, self.ttl_seconds - pttl / 1000.0) if pttl and pttl > 0 else 0.0
+        return {
+            "created_at": datetime.fromtimestamp(float(created_at)),
+            "last_accessed": datetime.fromtimestamp(time.time() - idle_seconds),
+            "context_count": count,
+            "context_bytes": int(total_bytes or 0),
+            "context_tokens": int(total_tokens or 0)
+        }
+
+    def sessions(self) -> List[str]:
+        suffix = ":meta"
+        start = len(self.prefix) + 1
+        sessions = []
+        for key in self.client.scan_iter(match=f"{self.prefix}:*{suffix}"):
+            key = key.decode() if isinstance(key, bytes) else key
+            sessions.append(key[start:-len(suffix)])
+        return sessions
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "local_sessions": len(self._local),
+            "local_hits": self.local_hits,
+            "local_misses": self.local_misses
+        }
+
+def create_context_store(backend: str = settings.CONTEXT_BACKEND) -> ContextStore:
+    """Build the configured context storage backend"""
+    if backend == "memory":
+        return InMemoryContextStore()
+    if backend == "redis":
+        return RedisContextStore()
+    raise AGNOError(f"Unsupported context backend: {backend}")
+
+class ContextManager:
+    def __init__(self, store: Optional[ContextStore] = None):
+        self.store = store or create_context_store()
         self.max_length = settings.MAX_CONTEXT_LENGTH
         self.compression_threshold = settings.CONTEXT_COMPRESSION_THRESHOLD
-        self.metadata: Dict[str, Dict] = {}
+        self._expiry_task: Optional[asyncio.Task] = None
+        self._locks = StripedLock()
+        self._turn_locks = KeyedLock()
 
     def add_context(self, session_id: str, context: Dict) -> None:
         """Add new context to the session"""
-        if session_id not in self.contexts:
-            self.contexts[session_id] = []
-            self.metadata[session_id] = {
-                "created_at": datetime.now(),
-                "last_accessed": datetime.now(),
-                "context_count": 0
-            }
-        
         # Add timestamp to context
         context["timestamp"] = datetime.now().isoformat()
-        self.contexts[session_id].append(context)
-        self.metadata[session_id]["context_count"] += 1
-        self.metadata[session_id]["last_accessed"] = datetime.now()
-        
-        self._check_and_compress(session_id)
+        metadata = self.store.append(session_id, context, self.max_length)
+
+        self._check_and_compress(session_id, metadata)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Striped per-session lock for short read-modify-write sections.
+
+        Stripes are shared between sessions, so never hold it across slow
+        awaits such as LLM calls; use turn_lock for those.
+        """
+        return self._locks(session_id)
+
+    def turn_lock(self, session_id: str) -> AsyncContextManager[None]:
+        """Lock of this session alone, for ordering whole agent turns around slow LLM calls"""
+        return self._turn_locks(session_id)
+
+    async def _call(self, fn: Callable[..., T], *args) -> T:
+        """Run a store operation, in a worker thread when the store blocks on I/O"""
+        if not self.store.blocking:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+    async def atomic_append(self, session_id: str, context: Dict) -> None:
+        """Append a turn while holding the session lock"""
+        async with self._locks(session_id):
+            await self._call(self.add_context, session_id, context)
+
+    async def atomic_update(self, session_id: str, updates: Dict) -> None:
+        """Merge updates into the latest turn while holding the session lock, appending if there is none"""
+        async with self._locks(session_id):
+            metadata = await self._call(self.store.update_last, session_id, updates)
+            if metadata is None:
+                await self._call(self.add_context, session_id, dict(updates))
+            else:
+                self._check_and_compress(session_id, metadata)
+
+    async def get_context_async(self, session_id: str) -> List[Dict]:
+        """get_context without blocking the event loop"""
+        return await self._call(self.get_context, session_id)
+
+    async def clear_context_async(self, session_id: str) -> None:
+        """clear_context without blocking the event loop"""
+        await self._call(self.clear_context, session_id)
 
     def get_context(self, session_id: str) -> List[Dict]:
         """Get all contexts for a session"""
-        if session_id in self.metadata:
-            self.metadata[session_id]["last_accessed"] = datetime.now()
-        return self.contexts.get(session_id, [])
+        return self.store.get(session_id)
 
     def clear_context(self, session_id: str) -> None:
         """Clear all contexts for a session"""
-        if session_id in self.contexts:
-            del self.contexts[session_id]
-        if session_id in self.metadata:
-            del self.metadata[session_id]
+        self.store.delete(session_id)
 
     def get_session_metadata(self, session_id: str) -> Optional[Dict]:
         """Get metadata for a session"""
-        return self.metadata.get(session_id)
+        return self.store.get_metadata(session_id)
 
     def get_all_sessions(self) -> List[str]:
         """Get list of all active sessions"""
-        return list(self.contexts.keys())
+        return self.store.sessions()
 
     def cleanup_old_sessions(self, max_age_hours: int = 24) -> None:
         """Clean up sessions older than specified hours"""
-        now = datetime.now()
-        sessions_to_remove = []
-        
-        for session_id, metadata in self.metadata.items():
-            age = now - metadata["last_accessed"]
-            if age.total_seconds() > max_age_hours * 3600:
-                sessions_to_remove.append(session_id)
-        
-        for session_id in sessions_to_remove:
-            self.clear_context(session_id)
+        self._evict_idle(max_age_hours * 3600)
+
+    def stats(self) -> Dict[str, int]:
+        """Session counts reported by the storage backend"""
+        return self.store.stats()
+
+    def start_expiry_task(
+        self,
+        interval_seconds: float = settings.SESSION_SWEEP_INTERVAL_SECONDS,
+        max_age_seconds: float = settings.SESSION_TTL_SECONDS
+    ) -> None:
+        """Start a background task evicting idle sessions every interval_seconds"""
+        if self._expiry_task is None or self._expiry_task.done():
+            self._expiry_task = asyncio.get_running_loop().create_task(
+                self._expiry_loop(interval_seconds, max_age_seconds)
+            )
+
+    async def stop_expiry_task(self) -> None:
+        """Stop the background eviction task"""
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            try:
+                await self._expiry_task
+            except asyncio.CancelledError:
+                pass
+            self._expiry_task = None
+
+    async def _expiry_loop(self, interval_seconds: float, max_age_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self._call(self._evict_idle, max_age_seconds)
+            except Exception as e:
+                logger.error(f"Session expiry sweep failed: {str(e)}")
+
+    def _evict_idle(self, max_age_seconds: float) -> None:
+        for session_id in self.store.cleanup(max_age_seconds):
             logger.info(f"Cleaned up old session: {session_id}")
 
-    def _check_and_compress(self, session_id: str) -> None:
-        """Check context length and compress if necessary"""
-        if session_id not in self.contexts:
-            return
+    def _check_and_compress(self, session_id: str, metadata: Dict) -> None:
+        """Check context length in O(1); stores already keep at most max_length turns"""
+        current_length = metadata["context_bytes"]
 
-        current_length = sum(len(str(ctx)) for ctx in self.contexts[session_id])
-        
         if current_length > self.compression_threshold:
             logger.info(f"Compressing context for session {session_id}")
-            # Keep only the most recent contexts
-            self.contexts[session_id] = self.contexts[session_id][-self.max_length:]
-            self.metadata[session_id]["context_count"] = len(self.contexts[session_id])
 
-context_manager = ContextManager() 
\ No newline at end of file
+context_manager = ContextManager()
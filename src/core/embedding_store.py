@@ -0,0 +1,182 @@
+from typing import Dict, Optional
+from pathlib import Path
+import json
+import os
+import numpy as np
+from .logging import logger
+from .errors import AGNOError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+KEY_SIZE = 16
+
+class EmbeddingStore:
+    """Append-only, memory-mapped float32 embedding matrix persisted on local disk.
+
+    The directory holds ``meta.json`` (dimension), ``vectors.f32`` (row-major
+    float32 rows) and ``keys.bin`` (one 16-byte cache key per row). A row is
+    written before its key, so readers only ever see complete rows; a writer
+    crashing in between leaves a keyless row that the next owner truncates
+    away on open. One owning process appends; every other process opens the
+    store read-only and shares the mapped pages through the OS page cache.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = Path(path)
+        self.readonly = readonly
+        self.dim: Optional[int] = None
+        self._index: Dict[bytes, int] = {}
+        self._keys_offset = 0
+        self._matrix: Optional[np.memmap] = None
+        self._lock_file = None
+        self.hits = 0
+        self.misses = 0
+
+        if not readonly:
+            self.path.mkdir(parents=True, exist_ok=True)
+            if not self._acquire_writer_lock():
+                logger.warning(f"Embedding store {self.path} is owned by another process, opening read-only")
+                self.readonly = True
+        self._load_meta()
+        if not self.readonly:
+            self._repair()
+        self._refresh()
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.path / "meta.json"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.path / "keys.bin"
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._index or (self._refresh() and key in self._index)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Zero-copy read-only view of the stored embedding, or None"""
+        row = self._index.get(key)
+        if row is None and self._refresh():
+            row = self._index.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._rows(row + 1)[row]
+
+    def put(self, key: bytes, embedding) -> bool:
+        """Append an embedding; returns False for read-only stores and known keys"""
+        if self.readonly or key in self._index:
+            return False
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self.dim = int(vector.shape[0])
+            self._write_meta()
+        elif vector.shape[0] != self.dim:
+            raise AGNOError(f"Embedding dimension {vector.shape[0]} does not match store dimension {self.dim}")
+
+        with open(self._vectors_path, "ab") as f:
+            row = f.tell() // (self.dim * 4)
+            f.write(vector.tobytes())
+            f.flush()
+        with open(self._keys_path, "ab") as f:
+            f.write(key)
+            f.flush()
+        self._index[key] = row
+        self._keys_offset += KEY_SIZE
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rows": len(self._index),
+            "dim": self.dim or 0,
+            "readonly": self.readonly,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self) -> None:
+        self._matrix = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _acquire_writer_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        self._lock_file = open(self.path / ".writer.lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _load_meta(self) -> None:
+        if self.dim is None and self._meta_path.exists():
+            self.dim = int(json.loads(self._meta_path.read_text())["dim"])
+
+    def _write_meta(self) -> None:
+        """Replace meta.json atomically so readers never parse a half-written file"""
+        # Only the lock-holding writer gets here, so a fixed temp name cannot collide
+        tmp_path = self._meta_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"dim": self.dim, "dtype": "float32"}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path)
+
+    def _repair(self) -> None:
+        """Cut both files back to their last complete row with a key, left over from an interrupted put"""
+        if self.dim is None:
+            return
+        row_size = self.dim * 4
+        vectors_size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        keys_size = self._keys_path.stat().st_size if self._keys_path.exists() else 0
+        rows = min(vectors_size // row_size, keys_size // KEY_SIZE)
+        for path, size, expected in (
+            (self._vectors_path, vectors_size, rows * row_size),
+            (self._keys_path, keys_size, rows * KEY_SIZE)
+        ):
+            if size != expected:
+                logger.warning(f"Truncating {path} from {size} to {expected} bytes after an interrupted write")
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+
+    def _refresh(self) -> bool:
+        """Index keys appended by the owning process since the last refresh"""
+        self._load_meta()
+        if self.dim is None or not self._keys_path.exists():
+            return False
+        keys_size = self._keys_path.stat().st_size
+        complete_rows = self._vectors_path.stat().st_size // (self.dim * 4) if self._vectors_path.exists() else 0
+        keys_size = min(keys_size, complete_rows * KEY_SIZE)
+        if keys_size <= self._keys_offset:
+            return False
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read(keys_size - self._keys_offset)
+        row = self._keys_offset // KEY_SIZE
+        for start in range(0, len(data) - KEY_SIZE + 1, KEY_SIZE):
+            self._index.setdefault(data[start:start + KEY_SIZE], row)
+            row += 1
+        self._keys_offset += len(data) - len(data) % KEY_SIZE
+        return True
+
+    def _rows(self, needed: int) -> np.memmap:
+        """Memory-mapped matrix covering at least ``needed`` rows, remapped as the file grows"""
+        if self._matrix is None or self._matrix.shape[0] < needed:
+            rows = self._vectors_path.stat().st_size // (self.dim * 4)
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
@@ -1,3 +1,4 @@
+from typing import Mapping, Optional
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from .logging import logger
@@ -9,6 +10,53 @@ class AGNOError(Exception):
         self.status_code = status_code
         super().__init__(message)
 
+class UpstreamError(AGNOError):
+    """Failed call to an upstream LLM provider"""
+    def __init__(
+        self,
+        message: str,
+        upstream_status: Optional[int] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        retryable: Optional[bool] = None,
+        status_code: int = 502
+    ):
+        super().__init__(message, status_code)
+        self.upstream_status = upstream_status
+        self.headers = dict(headers or {})
+        if retryable is None:
+            retryable = upstream_status is not None and (upstream_status in (408, 409, 429) or upstream_status >= 500)
+        self.retryable = retryable
+
+    @property
+    def caller_error(self) -> bool:
+        """The upstream rejected the request itself (e.g. 400 context length, 413, 422); any backend would"""
+        return not self.retryable and self.upstream_status is not None and 400 <= self.upstream_status < 500
+
+class RateLimitError(UpstreamError):
+    """Upstream provider rejected the call with 429 Too Many Requests"""
+    def __init__(self, message: str, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(message, upstream_status=429, headers=headers, retryable=True, status_code=429)
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """Seconds to wait according to the Retry-After header, if present"""
+        value = {k.lower(): v for k, v in self.headers.items()}.get("retry-after")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+class OverloadedError(AGNOError):
+    """Local admission control shed the call instead of queueing it further"""
+    def __init__(self, message: str = "Service overloaded, try again later", retry_after: float = 1.0):
+        super().__init__(message, status_code=503)
+        self.retry_after = retry_after
+
+class DeadlineExceededError(AGNOError):
+    """The request deadline passed before the upstream call completed"""
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, status_code=504)
+
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for the application"""
     if isinstance(exc, AGNOError):
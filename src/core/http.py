@@ -0,0 +1,83 @@
+from typing import Dict, Optional
+import asyncio
+import aiohttp
+from .config import settings
+from .logging import logger
+
+class HTTPSessionPool:
+    """Shared keep-alive aiohttp session used by all HTTP based providers"""
+
+    def __init__(
+        self,
+        limit: int = settings.HTTP_POOL_LIMIT,
+        limit_per_host: int = settings.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = settings.HTTP_KEEPALIVE_TIMEOUT,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        total_timeout: float = settings.HTTP_TOTAL_TIMEOUT,
+        dns_cache_ttl: int = settings.HTTP_DNS_CACHE_TTL
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Open the pooled session if it is not open yet"""
+        async with self._lock:
+            if self.closed:
+                self._connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=self._connector,
+                    timeout=self.timeout
+                )
+                logger.info(
+                    f"Opened HTTP session pool (limit={self.limit}, limit_per_host={self.limit_per_host})"
+                )
+            return self._session
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, opening it lazily on first use"""
+        if self.closed:
+            return await self.start()
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled session and all of its connections"""
+        async with self._lock:
+            if not self.closed:
+                await self._session.close()
+                logger.info("Closed HTTP session pool")
+            self._session = None
+            self._connector = None
+
+    def stats(self) -> Dict[str, int]:
+        """Report open, idle and waiting connection counts for pool sizing"""
+        connector = self._connector
+        if connector is None or connector.closed:
+            return {"open": 0, "idle": 0, "in_use": 0, "waiting": 0, "limit": self.limit}
+
+        idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        in_use = len(getattr(connector, "_acquired", ()))
+        waiting = sum(len(waiters) for waiters in getattr(connector, "_waiters", {}).values())
+        return {
+            "open": idle + in_use,
+            "idle": idle,
+            "in_use": in_use,
+            "waiting": waiting,
+            "limit": self.limit
+        }
+
+http_pool = HTTPSessionPool()
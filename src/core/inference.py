@@ -0,0 +1,244 @@
+from concurrent.futures import Executor
+from typing import Deque, Dict, List, Optional, Sequence
+from collections import deque
+import asyncio
+import time
+from .config import settings
+from .logging import logger
+from .errors import AGNOError
+from .resilience import LatencyTracker
+
+class _Request:
+    __slots__ = ("ids", "max_new_tokens", "temperature", "stop_ids", "generated", "pending", "future", "submitted")
+
+    def __init__(self, ids: List[int], max_new_tokens: int, temperature: float, stop_ids: Sequence[int], future: asyncio.Future):
+        self.ids = ids
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.stop_ids = frozenset(stop_ids)
+        self.generated: List[int] = []
+        self.pending: Optional[int] = None  # sampled but not yet fed through the model
+        self.future = future
+        self.submitted = time.monotonic()
+
+class _Batch:
+    """Decoding state of the running sequences, left-padded to a common length"""
+
+    def __init__(self):
+        self.requests: List[_Request] = []
+        self.cache = None    # per-layer (key, value), (rows, heads, positions, head_dim)
+        self.padding = None  # (rows, positions), True where a row has no token yet
+        self.logits = None   # (rows, vocab) for each row's next token
+
+    def select(self, rows: List[int]) -> None:
+        import torch
+
+        if len(rows) == len(self.requests):
+            return
+        self.requests = [self.requests[i] for i in rows]
+        if not rows:
+            self.cache = self.padding = self.logits = None
+            return
+        index = torch.tensor(rows)
+        self.cache = [(k[index], v[index]) for k, v in self.cache]
+        self.padding = self.padding[index]
+        self.logits = self.logits[index]
+        # Columns that are padding in every remaining row only cost attention time
+        start = int((~self.padding).any(dim=0).nonzero()[0])
+        if start:
+            self.trim(self.padding.size(1) - start)
+
+    def trim(self, length: int) -> None:
+        self.cache = [(k[:, :, -length:], v[:, :, -length:]) for k, v in self.cache]
+        self.padding = self.padding[:, -length:]
+
+def _left_pad(tensor, length: int, dim: int, value):
+    import torch
+
+    missing = length - tensor.size(dim)
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([torch.full(shape, value, dtype=tensor.dtype), tensor], dim=dim)
+
+class InferenceScheduler:
+    """Continuous batching of concurrent generation requests for one local model.
+
+    Requests arriving while the model is idle are collected for up to
+    max_wait_ms (or until max_batch_size are queued) and decoded together as
+    one left-padded batch with a shared key/value cache. Between decoding
+    steps finished sequences leave the batch and queued ones join it, so a
+    long answer never holds back a short one. Steps run on the given
+    executor, one at a time; each awaiting coroutine gets its own ids back.
+    """
+
+    def __init__(
+        self,
+        model,
+        executor: Executor,
+        max_batch_size: int = settings.LOCAL_BATCH_MAX_SIZE,
+        max_wait_ms: float = settings.LOCAL_BATCH_WAIT_MS,
+        window: Optional[int] = None,
+        pad_id: int = 0
+    ):
+        self.model = model
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.window = window
+        self.pad_id = pad_id
+        self._queue: Deque[_Request] = deque()
+        self._batch = _Batch()
+        self._task: Optional[asyncio.Task] = None
+        self._filled: Optional[asyncio.Event] = None
+        self.latency = LatencyTracker()
+        self.steps = 0
+        self.step_rows = 0
+        self.completed = 0
+        self.tokens = 0
+        self._started = None
+
+    async def submit(
+        self,
+        ids: Sequence[int],
+        max_new_tokens: int,
+        temperature: float = 0.0,
+        stop_ids: Sequence[int] = ()
+    ) -> List[int]:
+        """Queue a prompt and wait for its generated ids (stop ids excluded)"""
+        if not ids:
+            raise AGNOError("Cannot generate from an empty prompt")
+        if max_new_tokens <= 0:
+            return []
+        ids = list(ids)[-self.window:] if self.window else list(ids)
+        request = _Request(ids, max_new_tokens, temperature, stop_ids, asyncio.get_running_loop().create_future())
+        self._queue.append(request)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        elif self._filled is not None and len(self._queue) >= self.max_batch_size:
+            self._filled.set()
+        # Cancelling the caller cancels the future, and the sequence is dropped at the next step
+        return await request.future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self._started = time.monotonic()
+        while self._queue or self._batch.requests:
+            if not self._batch.requests and len(self._queue) < self.max_batch_size:
+                # Idle: give concurrent requests a moment to arrive and share the first step
+                self._filled = asyncio.Event()
+                try:
+                    await asyncio.wait_for(self._filled.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+                self._filled = None
+
+            joining: List[_Request] = []
+            while self._queue and len(self._batch.requests) + len(joining) < self.max_batch_size:
+                request = self._queue.popleft()
+                if not request.future.done():
+                    joining.append(request)
+            keep = [i for i, request in enumerate(self._batch.requests) if not request.future.done()]
+
+            try:
+                finished = await loop.run_in_executor(self.executor, self._step, keep, joining)
+            except Exception as e:
+                logger.error(f"Local inference step failed: {str(e)}")
+                for request in self._batch.requests + joining:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                self._batch = _Batch()
+                continue
+
+            now = time.monotonic()
+            for request in finished:
+                self.completed += 1
+                self.latency.record(now - request.submitted)
+                if not request.future.done():
+                    request.future.set_result(request.generated)
+
+    def _step(self, keep: List[int], joining: List[_Request]) -> List[_Request]:
+        """One decoding step: advance running rows, prefill joining ones, sample and retire"""
+        import torch
+
+        batch = self._batch
+        with torch.inference_mode():
+            batch.select(keep)
+            if batch.requests:
+                tokens = torch.tensor([[request.pending] for request in batch.requests])
+                batch.padding = torch.cat([batch.padding, torch.zeros(len(batch.requests), 1, dtype=torch.bool)], dim=1)
+                logits, batch.cache = self.model.decode(tokens, batch.cache, batch.padding)
+                batch.logits = logits[:, -1]
+            if joining:
+                self._prefill(joining)
+            if not batch.requests:
+                return []
+
+            self.steps += 1
+            self.step_rows += len(batch.requests)
+            next_ids = batch.logits.argmax(dim=-1).tolist()
+            for row, request in enumerate(batch.requests):
+                if request.temperature > 0:
+                    probs = torch.softmax(batch.logits[row] / request.temperature, dim=-1)
+                    next_ids[row] = int(torch.multinomial(probs, 1))
+
+            finished, running = [], []
+            for row, (request, token) in enumerate(zip(batch.requests, next_ids)):
+                if token not in request.stop_ids:
+                    request.generated.append(token)
+                    self.tokens += 1
+                if token in request.stop_ids or len(request.generated) >= request.max_new_tokens:
+                    finished.append(request)
+                else:
+                    request.pending = token
+                    running.append(row)
+            batch.select(running)
+            if batch.requests and self.window and batch.padding.size(1) >= self.window:
+                batch.trim(self.window - 1)
+        return finished
+
+    def _prefill(self, joining: List[_Request]) -> None:
+        import torch
+
+        batch = self._batch
+        length = max(len(request.ids) for request in joining)
+        tokens = torch.tensor([[self.pad_id] * (length - len(request.ids)) + request.ids for request in joining])
+        padding = torch.tensor([[True] * (length - len(request.ids)) + [False] * len(request.ids) for request in joining])
+        logits, cache = self.model.decode(tokens, None, padding)
+        if not batch.requests:
+            batch.requests, batch.cache, batch.padding, batch.logits = list(joining), cache, padding, logits[:, -1]
+            return
+
+        total = max(length, batch.padding.size(1))
+        batch.cache = [
+            (
+                torch.cat([_left_pad(k, total, 2, 0.0), _left_pad(jk, total, 2, 0.0)]),
+                torch.cat([_left_pad(v, total, 2, 0.0), _left_pad(jv, total, 2, 0.0)])
+            )
+            for (k, v), (jk, jv) in zip(batch.cache, cache)
+        ]
+        batch.padding = torch.cat([_left_pad(batch.padding, total, 1, True), _left_pad(padding, total, 1, True)])
+        batch.logits = torch.cat([batch.logits, logits[:, -1]])
+        batch.requests.extend(joining)
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        p50, p99 = (self.latency.quantile(q) for q in (0.5, 0.99))
+        return {
+            "running": len(self._batch.requests),
+            "queued": len(self._queue),
+            "completed": self.completed,
+            "steps": self.steps,
+            "avg_batch_size": round(self.step_rows / self.steps, 2) if self.steps else 0.0,
+            "tokens_per_second": round(self.tokens / elapsed, 1) if elapsed else 0.0,
+            "latency_p50": p50,
+            "latency_p99": p99
+        }
+
+# Schedulers by provider name, for metrics
+inference_schedulers: Dict[str, InferenceScheduler] = {}
+
+def inference_stats() -> Dict[str, Dict[str, float]]:
+    return {name: scheduler.stats() for name, scheduler in inference_schedulers.items()}
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import asyncio
+import threading
+from .config import settings
+from .logging import logger
+from .errors import AGNOError, UpstreamError
+from .providers import LLMProvider
+from .inference import InferenceScheduler, inference_schedulers
+
+MODEL_FILE = "interviewer_transformer.pth"
+VOCAB_FILE = "vocab.json"
+
+class LocalTransformerProvider(LLMProvider):
+    """In-process generation with the character-level InterviewTransformer.
+
+    The vocabulary and the fastest exported variant of the weights (see
+    src.agents.export) are loaded once, on first use. Concurrent
+    calls are decoded together by an InferenceScheduler whose steps run in
+    a small thread pool, so decoding never blocks the event loop. Prompts
+    are framed like the training data (``Q: ... A:``) and the answer is
+    decoded causally with a key/value cache, greedily unless a temperature
+    is given. Embeddings are not supported; the model has no embedding
+    space shared with the remote providers.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_dir: Path = settings.MODEL_DIR,
+        max_new_chars: int = settings.LOCAL_MAX_NEW_CHARS,
+        context_chars: int = settings.LOCAL_CONTEXT_CHARS,
+        threads: int = settings.LOCAL_INFERENCE_THREADS,
+        max_batch_size: int = settings.LOCAL_BATCH_MAX_SIZE
+    ):
+        self.model_path = Path(model_dir) / MODEL_FILE
+        self.vocab_path = Path(model_dir) / VOCAB_FILE
+        for path in (self.model_path, self.vocab_path):
+            if not path.exists():
+                raise AGNOError(f"Local model file not found: {path}")
+        self.model = "interviewer-transformer"
+        self.temperature = 0.0
+        self.max_tokens = max_new_chars
+        self.context_chars = context_chars
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="local-llm")
+        self._load_lock = threading.Lock()
+        self._net = None
+        self.variant = None
+        self._scheduler: Optional[InferenceScheduler] = None
+        self._tokenizer = None
+
+    def _load(self):
+        """The fastest exported decoder variant, loaded on first use by whichever worker thread gets there first"""
+        if self._net is not None:
+            return self._net
+        with self._load_lock:
+            if self._net is None:
+                from ..agents.export import load_decoder
+                from ..agents.tokenizer import CharTokenizer
+
+                self._tokenizer = CharTokenizer.load(self.vocab_path)
+                self.variant, self._net = load_decoder(self.model_path.parent)
+                logger.info(f"Loaded local model variant {self.variant} from {self.model_path.parent}")
+        return self._net
+
+    async def _get_scheduler(self) -> InferenceScheduler:
+        if self._scheduler is None:
+            net = await asyncio.get_running_loop().run_in_executor(self._executor, self._load)
+            if self._scheduler is None:
+                self._scheduler = inference_schedulers[self.name] = InferenceScheduler(
+                    net,
+                    self._executor,
+                    max_batch_size=self.max_batch_size,
+                    window=self.context_chars,
+                    pad_id=self._tokenizer.pad_id
+                )
+        return self._scheduler
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        try:
+            scheduler = await self._get_scheduler()
+            generated = await scheduler.submit(
+                self._tokenizer.encode(f"Q: {prompt} A:").tolist(),
+                kwargs.get("max_tokens") or self.max_tokens,
+                temperature=kwargs.get("temperature", self.temperature) or 0.0,
+                stop_ids=(scheduler.pad_id,)
+            )
+        except AGNOError:
+            raise
+        except Exception as e:
+            logger.error(f"Local model error: {str(e)}")
+            raise UpstreamError(f"Local model generation failed: {str(e)}", status_code=500)
+        text = self._tokenizer.decode(generated)
+        # Training samples are "Q: ... A: ..." lines; a new question ends the answer
+        return text.split(" Q:", 1)[0].strip()
+
+    async def get_embeddings(self, text: str) -> list:
+        raise AGNOError("Local model does not provide embeddings")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,60 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import zlib
+from .config import settings
+
+class StripedLock:
+    """Fixed pool of asyncio locks selected by a hash of the key.
+
+    Operations on the same key always take the same lock, while unrelated
+    keys rarely contend, so per-session work is serialized without a global
+    lock or one lock object per session. The pool is rebuilt when used from
+    a different event loop, since asyncio locks bind to the loop they wait on.
+    """
+
+    def __init__(self, stripes: int = settings.CONTEXT_LOCK_STRIPES):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        self._locks: List[asyncio.Lock] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __call__(self, key: str) -> asyncio.Lock:
+        """The lock guarding key, for use as ``async with striped(key):``"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._locks = [asyncio.Lock() for _ in range(self.stripes)]
+            self._loop = loop
+        return self._locks[zlib.crc32(key.encode("utf-8")) % self.stripes]
+
+class KeyedLock:
+    """One asyncio lock per key, for work that holds a key's lock across long awaits.
+
+    Unlike StripedLock, unrelated keys never share a lock, so a slow holder
+    only delays work on its own key. Locks exist only while some task holds
+    or waits for them; the last one out removes the entry.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def __call__(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock of key, as ``async with keyed(key):``"""
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
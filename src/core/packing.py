@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import re
+from .config import settings
+from .tokens import count_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+def _first_sentence(text: str, limit: int) -> str:
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0] if text else ""
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "..."
+
+def _turn_marker(turn: Dict) -> Tuple[str, int]:
+    return turn.get("timestamp", ""), hash(turn.get("response", ""))
+
+class ContextPacker:
+    """Pack session turns into a token budget for prompt construction.
+
+    The most recent turns are rendered verbatim until the budget is used up.
+    Older turns are folded into a per-session running summary that is only
+    extended with turns that newly fell out of the window.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+        summary_budget: int = settings.CONTEXT_SUMMARY_TOKEN_BUDGET,
+        max_sessions: int = settings.CONTEXT_LOCAL_CACHE_SIZE
+    ):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_sessions = max_sessions
+        self._summaries: "OrderedDict[str, Tuple[Tuple[str, int], List[str]]]" = OrderedDict()
+
+    def pack(
+        self,
+        session_id: str,
+        turns: List[Dict],
+        reserved_tokens: int = 0,
+        model: Optional[str] = None
+    ) -> str:
+        """Render as much recent history as fits next to reserved_tokens of prompt"""
+        budget = self.token_budget - reserved_tokens
+        if not turns or budget <= 0:
+            return ""
+
+        recent_budget = budget - min(self.summary_budget, budget // 2)
+        recent: List[str] = []
+        used = 0
+        split = len(turns)
+        for turn in reversed(turns):
+            rendered = self._render_turn(turn)
+            tokens = count_tokens(rendered, model)
+            if recent and used + tokens > recent_budget:
+                break
+            if not recent and tokens > budget:
+                rendered = self._truncate(rendered, budget, model)
+                tokens = count_tokens(rendered, model)
+            recent.append(rendered)
+            used += tokens
+            split -= 1
+        recent.reverse()
+
+        sections = []
+        if split > 0:
+            summary = self._summary(session_id, turns[:split], budget - used, model)
+            if summary:
+                sections.append(f"Ringkasan percakapan sebelumnya:\n{summary}")
+        sections.append("Percakapan terakhir:\n" + "\n".join(recent))
+        return "\n\n".join(sections)
+
+    def forget(self, session_id: str) -> None:
+        self._summaries.pop(session_id, None)
+
+    def _summary(self, session_id: str, older: List[Dict], budget: int, model: Optional[str]) -> str:
+        cached = self._summaries.get(session_id)
+        start = 0
+        lines: List[str] = []
+        if cached is not None:
+            marker, cached_lines = cached
+            # Only turns after the last summarized one need to be folded in
+            for index in range(len(older) - 1, -1, -1):
+                if _turn_marker(older[index]) == marker:
+                    start, lines = index + 1, list(cached_lines)
+                    break
+        lines.extend(self._summarize_turn(turn) for turn in older[start:])
+
+        # Keep the newest summary lines that fit the budget
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            tokens = count_tokens(line, model) + 1
+            if used + tokens > min(self.summary_budget, budget):
+                break
+            kept.append(line)
+            used += tokens
+        kept.reverse()
+
+        self._summaries[session_id] = (_turn_marker(older[-1]), kept)
+        self._summaries.move_to_end(session_id)
+        while len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+        return "\n".join(kept)
+
+    @staticmethod
+    def _render_turn(turn: Dict) -> str:
+        message = (turn.get("input") or {}).get("message", "")
+        response = turn.get("response", "")
+        lines = []
+        if message:
+            lines.append(f"Kandidat: {message}")
+        if response:
+            lines.append(f"Pewawancara: {response}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _summarize_turn(turn: Dict) -> str:
+        message = _first_sentence((turn.get("input") or {}).get("message", ""), 80)
+        response = _first_sentence(turn.get("response", ""), 120)
+        return f"- {message} -> {response}"
+
+    @staticmethod
+    def _truncate(text: str, budget: int, model: Optional[str]) -> str:
+        # Keep the tail: the end of the latest turn matters most for the next question
+        while text and count_tokens(text, model) > budget:
+            text = text[len(text) // 4 or 1:]
+        return text
+
+context_packer = ContextPacker()
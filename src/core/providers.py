@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List
+from typing import AsyncIterator, Callable, Dict, Optional, List, Mapping, Tuple
 import os
+import json
+import asyncio
 import aiohttp
 from .config import settings
 from .logging import logger
-from .errors import AGNOError
+from .errors import AGNOError, RateLimitError, UpstreamError
+from .http import http_pool
 
 class LLMProvider(ABC):
     @abstractmethod
@@ -17,162 +20,368 @@ class LLMProvider(ABC):
         """Get embeddings for the given text"""
         pass
 
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream generated text chunks, by default as a single chunk from generate"""
+        yield await self.generate(prompt, **kwargs)
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        """Get embeddings for several texts, in input order"""
+        return list(await asyncio.gather(*(self.get_embeddings(text) for text in texts)))
+
+    def add_header_listener(self, listener: Callable[[Mapping[str, str]], None]) -> None:
+        """Call listener with the headers of every upstream response (e.g. rate limit headers)"""
+        self.__dict__.setdefault("_header_listeners", []).append(listener)
+
+    def _notify_headers(self, headers: Mapping[str, str]) -> None:
+        for listener in self.__dict__.get("_header_listeners", ()):
+            listener(headers)
+
+    async def _check_response(self, response: aiohttp.ClientResponse, label: str) -> None:
+        """Report response headers to listeners and raise UpstreamError for non-200 responses"""
+        self._notify_headers(response.headers)
+        if response.status == 200:
+            return
+        try:
+            error_data = await response.json(content_type=None)
+            message = error_data.get("error", {}).get("message", "Unknown error")
+        except Exception:
+            message = response.reason or "Unknown error"
+        logger.error(f"{label} API error {response.status}: {message}")
+        if response.status == 429:
+            raise RateLimitError(f"{label} API error: {message}", headers=response.headers)
+        raise UpstreamError(f"{label} API error: {message}", upstream_status=response.status, headers=response.headers)
+
+class ProviderWrapper(LLMProvider):
+    """Provider delegating every call to an inner provider.
+
+    Subclasses override the calls they decorate; other attributes (name,
+    model, embedding_model, ...) are read through from the inner provider.
+    """
+
+    def __init__(self, inner: LLMProvider):
+        self.inner = inner
+
+    def __getattr__(self, attr: str):
+        if attr == "inner":  # not yet set, avoid recursing
+            raise AttributeError(attr)
+        return getattr(self.inner, attr)
+
+    def add_header_listener(self, listener: Callable[[Mapping[str, str]], None]) -> None:
+        self.inner.add_header_listener(listener)
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self.inner.generate(prompt, **kwargs)
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async for chunk in self.inner.generate_stream(prompt, **kwargs):
+            yield chunk
+
+    async def get_embeddings(self, text: str) -> list:
+        return await self.inner.get_embeddings(text)
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        return await self.inner.get_embeddings_batch(texts)
+
+async def _iter_sse_deltas(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI compatible server-sent event stream"""
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        choices = json.loads(payload).get("choices") or []
+        if choices:
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
 class OpenAIProvider(LLMProvider):
+    name = "openai"
+
     def __init__(self, **kwargs):
         self.model = kwargs.get("model", "gpt-3.5-turbo")
         self.temperature = kwargs.get("temperature", 0.7)
         self.max_tokens = kwargs.get("max_tokens", 1000)
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.base_url = "https://api.openai.com/v1"
+        self.embedding_model = kwargs.get("embedding_model", "text-embedding-ada-002")
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
 
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _chat_data(self, prompt: str, **kwargs) -> Dict:
+        messages = []
+        if kwargs.get("system_message"):
+            messages.append({"role": "system", "content": kwargs["system_message"]})
+        messages.append({"role": "user", "content": prompt})
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens)
+        }
+
     async def generate(self, prompt: str, **kwargs) -> str:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
+            session = await http_pool.get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json=self._chat_data(prompt, **kwargs)
+            ) as response:
+                await self._check_response(response, "OpenAI")
                 
-                messages = []
-                if kwargs.get("system_message"):
-                    messages.append({"role": "system", "content": kwargs["system_message"]})
-                messages.append({"role": "user", "content": prompt})
-                
-                data = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status != 200:
-                        error_data = await response.json()
-                        raise AGNOError(f"OpenAI API error: {error_data.get('error', {}).get('message', 'Unknown error')}")
-                    
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
+                result = await response.json()
+                return result["choices"][0]["message"]["content"]
+        except AGNOError:
+            raise
         except Exception as e:
             logger.error(f"OpenAI generation error: {str(e)}")
-            raise AGNOError(f"OpenAI generation failed: {str(e)}")
+            raise UpstreamError(f"OpenAI generation failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
 
-    async def get_embeddings(self, text: str) -> list:
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
+            session = await http_pool.get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json={**self._chat_data(prompt, **kwargs), "stream": True}
+            ) as response:
+                await self._check_response(response, "OpenAI")
                 
-                data = {
-                    "model": "text-embedding-ada-002",
-                    "input": text
-                }
+                async for delta in _iter_sse_deltas(response):
+                    yield delta
+        except AGNOError:
+            raise
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {str(e)}")
+            raise UpstreamError(f"OpenAI streaming failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
+
+    async def get_embeddings(self, text: str) -> list:
+        try:
+            session = await http_pool.get_session()
+            data = {
+                "model": self.embedding_model,
+                "input": text
+            }
+            
+            async with session.post(
+                f"{self.base_url}/embeddings",
+                headers=self._headers(),
+                json=data
+            ) as response:
+                await self._check_response(response, "OpenAI")
                 
-                async with session.post(
-                    f"{self.base_url}/embeddings",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status != 200:
-                        error_data = await response.json()
-                        raise AGNOError(f"OpenAI API error: {error_data.get('error', {}).get('message', 'Unknown error')}")
-                    
-                    result = await response.json()
-                    return result["data"][0]["embedding"]
+                result = await response.json()
+                return result["data"][0]["embedding"]
+        except AGNOError:
+            raise
         except Exception as e:
             logger.error(f"OpenAI embeddings error: {str(e)}")
-            raise AGNOError(f"OpenAI embeddings failed: {str(e)}")
+            raise UpstreamError(f"OpenAI embeddings failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        if not texts:
+            return []
+        try:
+            session = await http_pool.get_session()
+            data = {
+                "model": self.embedding_model,
+                "input": texts
+            }
+            
+            async with session.post(
+                f"{self.base_url}/embeddings",
+                headers=self._headers(),
+                json=data
+            ) as response:
+                await self._check_response(response, "OpenAI")
+                
+                result = await response.json()
+                items = sorted(result["data"], key=lambda item: item["index"])
+                return [item["embedding"] for item in items]
+        except AGNOError:
+            raise
+        except Exception as e:
+            logger.error(f"OpenAI batch embeddings error: {str(e)}")
+            raise UpstreamError(f"OpenAI batch embeddings failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
 
 class GroqProvider(LLMProvider):
+    name = "groq"
+
     def __init__(self, **kwargs):
         if not settings.GROQ_API_KEY:
             raise AGNOError("Groq API key not configured")
         self.api_key = settings.GROQ_API_KEY
         self.base_url = "https://api.groq.com/openai/v1"
         self.model = kwargs.get("model", "llama-3.2-90b-vision-preview")
+        self.temperature = kwargs.get("temperature", 0.7)
+        self.max_tokens = kwargs.get("max_tokens", 1000)
+        self.embedding_model = kwargs.get("embedding_model", "text-embedding-3-small")
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _chat_data(self, prompt: str, **kwargs) -> Dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens)
+        }
 
     async def generate(self, prompt: str, **kwargs) -> str:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
+            session = await http_pool.get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json=self._chat_data(prompt, **kwargs)
+            ) as response:
+                await self._check_response(response, "Groq")
                 
-                data = {
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "max_tokens": kwargs.get("max_tokens", 1000)
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status != 200:
-                        error_data = await response.json()
-                        raise AGNOError(f"Groq API error: {error_data.get('error', {}).get('message', 'Unknown error')}")
-                    
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
+                result = await response.json()
+                return result["choices"][0]["message"]["content"]
+        except AGNOError:
+            raise
         except Exception as e:
             logger.error(f"Groq generation error: {str(e)}")
-            raise AGNOError(f"Groq generation failed: {str(e)}")
+            raise UpstreamError(f"Groq generation failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
 
-    async def get_embeddings(self, text: str) -> list:
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
+            session = await http_pool.get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json={**self._chat_data(prompt, **kwargs), "stream": True}
+            ) as response:
+                await self._check_response(response, "Groq")
                 
-                data = {
-                    "model": "text-embedding-3-small",
-                    "input": text
-                }
+                async for delta in _iter_sse_deltas(response):
+                    yield delta
+        except AGNOError:
+            raise
+        except Exception as e:
+            logger.error(f"Groq streaming error: {str(e)}")
+            raise UpstreamError(f"Groq streaming failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
+
+    async def get_embeddings(self, text: str) -> list:
+        try:
+            session = await http_pool.get_session()
+            data = {
+                "model": self.embedding_model,
+                "input": text
+            }
+            
+            async with session.post(
+                f"{self.base_url}/embeddings",
+                headers=self._headers(),
+                json=data
+            ) as response:
+                await self._check_response(response, "Groq")
                 
-                async with session.post(
-                    f"{self.base_url}/embeddings",
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status != 200:
-                        error_data = await response.json()
-                        raise AGNOError(f"Groq API error: {error_data.get('error', {}).get('message', 'Unknown error')}")
-                    
-                    result = await response.json()
-                    return result["data"][0]["embedding"]
+                result = await response.json()
+                return result["data"][0]["embedding"]
+        except AGNOError:
+            raise
         except Exception as e:
             logger.error(f"Groq embeddings error: {str(e)}")
-            raise AGNOError(f"Groq embeddings failed: {str(e)}")
+            raise UpstreamError(f"Groq embeddings failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        if not texts:
+            return []
+        try:
+            session = await http_pool.get_session()
+            data = {
+                "model": self.embedding_model,
+                "input": texts
+            }
+            
+            async with session.post(
+                f"{self.base_url}/embeddings",
+                headers=self._headers(),
+                json=data
+            ) as response:
+                await self._check_response(response, "Groq")
+                
+                result = await response.json()
+                items = sorted(result["data"], key=lambda item: item["index"])
+                return [item["embedding"] for item in items]
+        except AGNOError:
+            raise
+        except Exception as e:
+            logger.error(f"Groq batch embeddings error: {str(e)}")
+            raise UpstreamError(f"Groq batch embeddings failed: {str(e)}", retryable=isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)))
+
+def _create_router() -> LLMProvider:
+    from .routing import create_router
+    return create_router()
+
+def _create_local() -> LLMProvider:
+    from .local_provider import LocalTransformerProvider
+    return LocalTransformerProvider()
 
 class ProviderFactory:
     _providers = {}
+    # name -> (constructor, whether to apply the call wrappers)
+    _registry: Dict[str, Tuple[Callable[[], LLMProvider], bool]] = {
+        "openai": (OpenAIProvider, True),
+        "groq": (GroqProvider, True),
+        "local": (_create_local, True),
+        "router": (_create_router, False)
+    }
     
+    @classmethod
+    def register(cls, name: str, constructor: Callable[[], LLMProvider], wrap: bool = True) -> None:
+        """Make a provider available by name, e.g. as a routing backend"""
+        cls._registry[name] = (constructor, wrap)
+        cls._providers.pop(name, None)
+
     @classmethod
     def get_provider(cls, provider_name: str = None) -> LLMProvider:
         if not provider_name:
             provider_name = settings.DEFAULT_PROVIDER
             
         if provider_name not in cls._providers:
-            if provider_name == "openai":
-                cls._providers[provider_name] = OpenAIProvider()
-            elif provider_name == "groq":
-                cls._providers[provider_name] = GroqProvider()
-            else:
+            if provider_name not in cls._registry:
                 raise AGNOError(f"Unsupported provider: {provider_name}")
+            constructor, wrap = cls._registry[provider_name]
+            provider = constructor()
+            cls._providers[provider_name] = cls._wrap(provider) if wrap else provider
                 
         return cls._providers[provider_name]
 
+    @staticmethod
+    def _wrap(provider: LLMProvider) -> LLMProvider:
+        """Apply the configured call wrappers around a concrete provider"""
+        name = getattr(provider, "name", type(provider).__name__)
+        if settings.RATE_LIMIT_ENABLED:
+            from .ratelimit import RateLimitedProvider, rate_limited_providers
+            provider = rate_limited_providers[name] = RateLimitedProvider(provider)
+        # Each retry or hedge is admitted by the rate limiter again
+        from .resilience import RetryingProvider, resilient_providers
+        provider = resilient_providers[name] = RetryingProvider(provider)
+        if settings.SINGLEFLIGHT_ENABLED:
+            from .singleflight import SingleFlightProvider, singleflight
+            provider = SingleFlightProvider(provider, singleflight)
+        # Outermost, so cache hits never reach the wrappers below
+        if settings.RESPONSE_CACHE_ENABLED:
+            from .cache import CachingProvider, response_cache
+            provider = CachingProvider(provider, response_cache)
+        return provider
+
 provider_factory = ProviderFactory() 
\ No newline at end of file
@@ -0,0 +1,275 @@
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, TypeVar
+from collections import deque
+import asyncio
+import re
+import time
+from .config import settings
+from .logging import logger
+from .errors import OverloadedError, RateLimitError
+from .providers import LLMProvider, ProviderWrapper
+from .tokens import estimate_tokens
+
+T = TypeVar("T")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in an ``x-ratelimit-reset-*`` header such as ``6m0s``, ``1.5s`` or ``250ms``"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+class TokenBucket:
+    """Continuously refilling budget of ``per_minute`` units.
+
+    Callers reserve units up front and are told how long to wait when the
+    bucket is in debt, so concurrent callers queue in reservation order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount units and return the seconds to wait before using them"""
+        self._refill()
+        # A single request larger than the bucket would otherwise wait forever
+        self.available -= min(amount, self.capacity)
+        return -self.available / self.rate if self.available < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.available = min(self.capacity, self.available + min(amount, self.capacity))
+
+    def adapt(self, limit: Optional[float] = None, remaining: Optional[float] = None, reset: Optional[float] = None) -> None:
+        """Align with the provider's view of the limit from its response headers"""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+        if remaining is not None and remaining < self.available:
+            self.available = float(remaining)
+        if reset and self.available <= 0:
+            # Nothing left until the provider's window resets
+            self.available = min(self.available, -reset * self.rate)
+
+class AIMDLimiter:
+    """Adaptive concurrency limit with a bounded, deadline-aware wait queue.
+
+    The limit grows additively (by 1 per limit's worth of successes) and is
+    multiplied down when the provider signals overload. Callers beyond the
+    limit wait in FIFO order; a full queue or an expired deadline raises
+    OverloadedError instead of piling up more work.
+    """
+
+    def __init__(
+        self,
+        initial: int = settings.CONCURRENCY_INITIAL,
+        min_limit: int = settings.CONCURRENCY_MIN,
+        max_limit: int = settings.CONCURRENCY_MAX,
+        max_queue: int = settings.QUEUE_MAX_DEPTH,
+        backoff: float = 0.5
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.shed = 0
+
+    async def acquire(self, timeout: float) -> None:
+        """Take a concurrency slot, waiting at most timeout seconds in the queue"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise OverloadedError("Too many queued LLM requests")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed += 1
+                raise OverloadedError("Timed out waiting for an LLM request slot")
+            raise
+
+    def release(self, success: Optional[bool] = None) -> None:
+        """Return a slot; success=True grows the limit, success=False (overload) shrinks it"""
+        self.in_flight -= 1
+        if success is True:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        elif success is False:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "shed": self.shed
+        }
+
+class RateLimitedProvider(ProviderWrapper):
+    """Client-side admission control in front of one upstream provider.
+
+    Each call reserves one request and its estimated tokens from per-minute
+    buckets, then takes an AIMD concurrency slot. Buckets follow the
+    provider's ``x-ratelimit-*`` headers; a request limit counted over a
+    longer window (Groq reports requests per day) only contributes its
+    remaining budget and reset, not a per-minute rate. A 429 shrinks the concurrency
+    limit, drains the buckets until the reset, and re-queues the call as long
+    as it still fits within the queue timeout.
+    """
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        requests_per_minute: float = settings.RATE_LIMIT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = settings.RATE_LIMIT_TOKENS_PER_MINUTE,
+        limiter: Optional[AIMDLimiter] = None,
+        queue_timeout: float = settings.QUEUE_TIMEOUT_SECONDS,
+        requests_header_window: Optional[float] = None
+    ):
+        super().__init__(inner)
+        if requests_header_window is None:
+            daily = {name.strip() for name in settings.RATE_LIMIT_DAILY_REQUEST_PROVIDERS.split(",") if name.strip()}
+            requests_header_window = 86400.0 if getattr(inner, "name", None) in daily else 60.0
+        # Seconds over which the provider counts x-ratelimit-limit-requests
+        self.requests_header_window = requests_header_window
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limiter = limiter or AIMDLimiter()
+        self.queue_timeout = queue_timeout
+        self.rate_limited = 0
+        inner.add_header_listener(self._on_headers)
+
+    def _on_headers(self, headers: Mapping[str, str]) -> None:
+        headers = {k.lower(): v for k, v in headers.items()}
+        for kind, bucket, window in (
+            ("requests", self.requests, self.requests_header_window),
+            ("tokens", self.tokens, 60.0)
+        ):
+            try:
+                # A limit over a longer window is not a per-minute rate; keep the configured capacity
+                limit = headers.get(f"x-ratelimit-limit-{kind}") if window == 60.0 else None
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                bucket.adapt(
+                    limit=float(limit) if limit else None,
+                    remaining=float(remaining) if remaining is not None else None,
+                    reset=parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                )
+            except ValueError:
+                logger.warning(f"Unparseable rate limit headers for {kind}: {headers}")
+
+    async def _admit(self, cost: int, deadline: float) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(cost))
+        if time.monotonic() + wait > deadline:
+            self.requests.refund(1)
+            self.tokens.refund(cost)
+            self.limiter.shed += 1
+            raise OverloadedError("LLM rate limit budget exhausted", retry_after=wait)
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            await self.limiter.acquire(max(0.0, deadline - time.monotonic()))
+        except BaseException:
+            # Shed or cancelled before reaching the provider: the reserved budget was never spent
+            self.requests.refund(1)
+            self.tokens.refund(cost)
+            raise
+
+    async def _run(self, cost: int, call: Callable[[], Awaitable[T]]) -> T:
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            await self._admit(cost, deadline)
+            try:
+                result = await call()
+            except RateLimitError as e:
+                self.limiter.release(success=False)
+                self.rate_limited += 1
+                retry_after = e.retry_after or 1.0
+                self.requests.adapt(remaining=0, reset=retry_after)
+                if time.monotonic() + retry_after > deadline:
+                    raise
+                logger.warning(f"Rate limited upstream, re-queueing call for {retry_after:.1f}s")
+                continue
+            except BaseException:
+                self.limiter.release()
+                raise
+            self.limiter.release(success=True)
+            return result
+
+    def _generation_cost(self, prompt: str, kwargs: Dict) -> int:
+        # Providers count max_tokens against the tokens/min budget up front
+        max_tokens = kwargs.get("max_tokens", getattr(self.inner, "max_tokens", 0)) or 0
+        return estimate_tokens(prompt) + estimate_tokens(kwargs.get("system_message") or "") + max_tokens
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self._run(self._generation_cost(prompt, kwargs), lambda: self.inner.generate(prompt, **kwargs))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        # The slot is held for the whole stream; a stream is not re-queued once it has started
+        await self._admit(self._generation_cost(prompt, kwargs), time.monotonic() + self.queue_timeout)
+        success = None
+        try:
+            async for chunk in self.inner.generate_stream(prompt, **kwargs):
+                yield chunk
+            success = True
+        except RateLimitError:
+            success = False
+            self.rate_limited += 1
+            raise
+        finally:
+            self.limiter.release(success)
+
+    async def get_embeddings(self, text: str) -> list:
+        return await self._run(estimate_tokens(text), lambda: self.inner.get_embeddings(text))
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        cost = sum(estimate_tokens(text) for text in texts)
+        return await self._run(cost, lambda: self.inner.get_embeddings_batch(texts))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            **self.limiter.stats(),
+            "requests_available": round(self.requests.available, 1),
+            "tokens_available": round(self.tokens.available, 1),
+            "rate_limited": self.rate_limited
+        }
+
+# Limited providers by name, for metrics
+rate_limited_providers: Dict[str, RateLimitedProvider] = {}
+
+def rate_limit_stats() -> Dict[str, Dict[str, float]]:
+    return {name: provider.stats() for name, provider in rate_limited_providers.items()}
@@ -0,0 +1,251 @@
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Set, TypeVar
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import random
+import time
+from .config import settings
+from .logging import logger
+from .errors import DeadlineExceededError, RateLimitError, UpstreamError
+from .providers import LLMProvider, ProviderWrapper
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() deadline of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("agno_deadline", default=None)
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Bound everything awaited inside to seconds from now, never extending an outer deadline"""
+    current = _deadline.get()
+    deadline = None if seconds is None else time.monotonic() + seconds
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class RetryingProvider(ProviderWrapper):
+    """Per-attempt timeouts, jittered retries and optional hedging bounded by the request deadline.
+
+    Retryable upstream errors (transport failures, timeouts, 408/409/429/5xx)
+    are retried with full-jitter exponential backoff, honouring Retry-After.
+    With hedging enabled, a second attempt is fired once the first has run
+    longer than the rolling p95 latency and the first result wins. When a
+    hedge wins, the original attempt is given a short grace period to finish
+    so the latency the hedge removed can be measured (a lower bound, since
+    stragglers past the grace period are counted at the grace period).
+    """
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        max_attempts: int = settings.RETRY_MAX_ATTEMPTS,
+        attempt_timeout: float = settings.PROVIDER_TIMEOUT_SECONDS,
+        base_delay: float = settings.RETRY_BASE_DELAY_SECONDS,
+        max_delay: float = settings.RETRY_MAX_DELAY_SECONDS,
+        hedge: bool = settings.HEDGE_ENABLED,
+        hedge_quantile: float = settings.HEDGE_QUANTILE,
+        hedge_min_samples: int = settings.HEDGE_MIN_SAMPLES,
+        hedge_grace: float = settings.HEDGE_LOSER_GRACE_SECONDS
+    ):
+        super().__init__(inner)
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_grace = hedge_grace
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.tail_latency_removed = 0.0
+        self._background: Set[asyncio.Task] = set()
+
+    def _attempt_timeout(self) -> float:
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError()
+        return self.attempt_timeout if remaining is None else min(self.attempt_timeout, remaining)
+
+    def _backoff(self, attempt: int, error: UpstreamError) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if isinstance(error, RateLimitError) and error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    async def _call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(fn)
+            except UpstreamError as e:
+                attempt += 1
+                if not e.retryable or attempt >= self.max_attempts:
+                    raise
+                delay = self._backoff(attempt, e)
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise
+                self.retries += 1
+                logger.warning(f"Retrying upstream call in {delay:.2f}s after: {e.message}")
+                await asyncio.sleep(delay)
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError()
+            raise UpstreamError(f"Upstream call timed out after {timeout:.1f}s", retryable=True, status_code=504)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        timeout = self._attempt_timeout()
+        hedge_after = self.latency.quantile(self.hedge_quantile) if len(self.latency) >= self.hedge_min_samples else None
+        if not self.hedge or hedge_after is None or hedge_after >= timeout:
+            return await self._timed(fn, timeout)
+
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self._timed(fn, timeout))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            self.hedges_fired += 1
+            hedge = asyncio.ensure_future(self._timed(fn, timeout - hedge_after))
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                            if primary in pending:
+                                pending.discard(primary)
+                                self._measure_loser(primary, start, time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _measure_loser(self, primary: asyncio.Task, start: float, won_after: float) -> None:
+        """Let the outrun primary finish within the grace period to record the latency saved"""
+        async def measure() -> None:
+            try:
+                await asyncio.wait_for(asyncio.shield(primary), self.hedge_grace)
+                primary_latency = time.monotonic() - start
+            except asyncio.TimeoutError:
+                # Still running after the grace period: count it at the bound
+                primary_latency = won_after + self.hedge_grace
+            except Exception:
+                return
+            finally:
+                primary.cancel()
+            self.tail_latency_removed += max(0.0, primary_latency - won_after)
+
+        task = asyncio.ensure_future(measure())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self._call(lambda: self.inner.generate(prompt, **kwargs))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        # Retried only until the first chunk arrives; partial output cannot be taken back
+        attempt = 0
+        while True:
+            stream = self.inner.generate_stream(prompt, **kwargs)
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), self._attempt_timeout())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                await stream.aclose()
+                error = UpstreamError("Upstream stream timed out before the first chunk", retryable=True, status_code=504)
+            except UpstreamError as e:
+                error = e
+            else:
+                break
+            attempt += 1
+            if not error.retryable or attempt >= self.max_attempts:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, error))
+
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), self._attempt_timeout())
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise UpstreamError("Upstream stream stalled", status_code=504)
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def get_embeddings(self, text: str) -> list:
+        return await self._call(lambda: self.inner.get_embeddings(text))
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        return await self._call(lambda: self.inner.get_embeddings_batch(texts))
+
+    def stats(self) -> Dict[str, float]:
+        p50, p95, p99 = (self.latency.quantile(q) for q in (0.5, 0.95, 0.99))
+        return {
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "tail_latency_removed_seconds": round(self.tail_latency_removed, 3),
+            "latency_p50": p50,
+            "latency_p95": p95,
+            "latency_p99": p99
+        }
+
+# Resilient providers by name, for metrics
+resilient_providers: Dict[str, RetryingProvider] = {}
+
+def resilience_stats() -> Dict[str, Dict[str, float]]:
+    return {name: provider.stats() for name, provider in resilient_providers.items()}
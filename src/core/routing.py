@@ -0,0 +1,256 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+import bisect
+import time
+from .config import settings
+from .logging import logger
+from .errors import AGNOError, OverloadedError, UpstreamError
+from .providers import LLMProvider, provider_factory
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open ended
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker tripped by consecutive failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.CIRCUIT_RESET_TIMEOUT_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may be sent; in half-open state only one probe at a time"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def abandon(self) -> None:
+        """Release a half-open probe whose call ended without a verdict"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class BackendStats:
+    """EWMA latency and error rate plus a latency histogram for one backend"""
+
+    def __init__(self, alpha: float = settings.ROUTER_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.calls += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        else:
+            self.errors += 1
+
+    def score(self) -> float:
+        """Lower is better; backends never measured score 0 so they get tried"""
+        if self.latency is None:
+            return 0.0
+        # An error costs roughly a timeout plus a retry elsewhere
+        return self.latency * (1.0 + settings.ROUTER_ERROR_PENALTY * self.error_rate)
+
+    def to_dict(self) -> Dict:
+        labels = [f"le_{bound:g}" for bound in LATENCY_BUCKETS] + ["inf"]
+        return {
+            "latency_ewma": self.latency,
+            "error_rate": round(self.error_rate, 4),
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_histogram": dict(zip(labels, self.histogram))
+        }
+
+class RoutingProvider(LLMProvider):
+    """Route each call to the healthiest, fastest backend and fail over on upstream errors.
+
+    Backends are ranked by EWMA latency penalized by EWMA error rate; backends
+    whose circuit breaker is open are skipped until their half-open probe
+    succeeds. Fallback backends (such as the local model) are only tried
+    after every primary backend. Embeddings always use the first backend so
+    vectors stay in one embedding space.
+    """
+
+    name = "router"
+
+    def __init__(self, backends: Dict[str, LLMProvider], fallbacks: Optional[Dict[str, LLMProvider]] = None):
+        fallbacks = {name: backend for name, backend in (fallbacks or {}).items() if name not in backends}
+        if not backends and not fallbacks:
+            raise AGNOError("Routing provider needs at least one backend")
+        self.backends = {**backends, **fallbacks}
+        self.fallbacks = list(fallbacks)
+        self.breakers = {name: CircuitBreaker() for name in self.backends}
+        self.backend_stats = {name: BackendStats() for name in self.backends}
+        self.routed = {name: 0 for name in self.backends}
+        self.failovers = 0
+        self.rejected = 0
+        self.embedding_backend = next(iter(self.backends))
+
+    @property
+    def model(self) -> str:
+        return getattr(self.backends[self._preference()[0]], "model", "")
+
+    @property
+    def embedding_model(self) -> str:
+        return getattr(self.backends[self.embedding_backend], "embedding_model", "")
+
+    async def _route(self, names: List[str], fn: Callable[[LLMProvider], Awaitable[T]]) -> T:
+        last_error: Optional[Exception] = None
+        for name in names:
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                continue
+            if last_error is not None:
+                self.failovers += 1
+            self.routed[name] += 1
+            start = time.monotonic()
+            try:
+                result = await fn(self.backends[name])
+            except OverloadedError as e:
+                # Shed by our own admission control, not a sign the upstream is unhealthy
+                breaker.abandon()
+                logger.warning(f"Backend {name} shed the call locally, trying the next one: {e.message}")
+                last_error = e
+                continue
+            except UpstreamError as e:
+                if e.caller_error:
+                    # A bad request says nothing about backend health, and would fail on the others too
+                    breaker.abandon()
+                    raise
+                self.backend_stats[name].record(time.monotonic() - start, ok=False)
+                breaker.record_failure()
+                logger.warning(f"Backend {name} failed, trying the next one: {e.message}")
+                last_error = e
+                continue
+            except BaseException:
+                # Cancellation or a caller error says nothing about backend health
+                breaker.abandon()
+                raise
+            self.backend_stats[name].record(time.monotonic() - start, ok=True)
+            breaker.record_success()
+            return result
+
+        self.rejected += 1
+        if last_error is not None:
+            raise last_error
+        raise OverloadedError("All LLM backends are unavailable", retry_after=settings.CIRCUIT_RESET_TIMEOUT_SECONDS)
+
+    def _preference(self) -> List[str]:
+        """Backends by score, fallbacks and then open circuits last; _route skips those that refuse calls"""
+        return sorted(self.backends, key=lambda name: (
+            name in self.fallbacks,
+            self.breakers[name].state == CircuitBreaker.OPEN,
+            self.backend_stats[name].score()
+        ))
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self._route(self._preference(), lambda backend: backend.generate(prompt, **kwargs))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        # Fail over only until the first chunk; afterwards the stream is committed to its backend
+        async def first_chunk(backend: LLMProvider):
+            stream = backend.generate_stream(prompt, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+
+        stream, chunk = await self._route(self._preference(), first_chunk)
+        try:
+            if chunk is None:
+                return
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def get_embeddings(self, text: str) -> list:
+        return await self._route([self.embedding_backend], lambda backend: backend.get_embeddings(text))
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        return await self._route([self.embedding_backend], lambda backend: backend.get_embeddings_batch(texts))
+
+    def stats(self) -> Dict:
+        return {
+            "failovers": self.failovers,
+            "rejected": self.rejected,
+            "backends": {
+                name: {
+                    "state": self.breakers[name].state,
+                    "trips": self.breakers[name].trips,
+                    "routed": self.routed[name],
+                    "fallback": name in self.fallbacks,
+                    **self.backend_stats[name].to_dict()
+                }
+                for name in self.backends
+            }
+        }
+
+# Routers by name, for metrics
+routers: Dict[str, RoutingProvider] = {}
+
+def _backend_names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+def _get_backends(backend_names: List[str]) -> Dict[str, LLMProvider]:
+    backends: Dict[str, LLMProvider] = {}
+    for name in backend_names:
+        if name == RoutingProvider.name:
+            continue
+        try:
+            backends[name] = provider_factory.get_provider(name)
+        except (AGNOError, ValueError) as e:
+            logger.warning(f"Routing backend {name} unavailable: {str(e)}")
+    return backends
+
+def create_router(backend_names: Optional[List[str]] = None, fallback_names: Optional[List[str]] = None) -> RoutingProvider:
+    """Build a router over the configured backends, skipping those that are not configured"""
+    if backend_names is None:
+        backend_names = _backend_names(settings.ROUTER_BACKENDS)
+    if fallback_names is None:
+        fallback_names = _backend_names(settings.ROUTER_FALLBACK_BACKENDS)
+    router = routers[RoutingProvider.name] = RoutingProvider(
+        _get_backends(backend_names),
+        _get_backends([name for name in fallback_names if name not in backend_names])
+    )
+    return router
+
+def routing_stats() -> Dict[str, Dict]:
+    return {name: router.stats() for name, router in routers.items()}
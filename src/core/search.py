@@ -1,23 +1,190 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Set
+import asyncio
 import numpy as np
 from .config import settings
 from .logging import logger
-from .errors import AGNOError
-from .providers import provider_factory
+from .errors import AGNOError, UpstreamError
+from .providers import provider_factory, LLMProvider
+from .cache import EmbeddingCache, embedding_cache_key
+from .embedding_store import EmbeddingStore
+
+def _check_batch(texts: Sequence[str], embeddings: Sequence) -> None:
+    """Reject a batch result that does not hold exactly one embedding per text"""
+    if len(embeddings) != len(texts):
+        # zip() would silently drop the texts past the end of the shorter list
+        raise UpstreamError(f"Embedding batch returned {len(embeddings)} vectors for {len(texts)} texts")
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embedding requests into batched upstream calls"""
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        window_ms: float = settings.EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size: int = settings.EMBEDDING_BATCH_MAX_SIZE
+    ):
+        self.provider = provider
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Strong references to in-flight batches; the loop only keeps weak ones
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, text: str) -> list:
+        """Queue text for the next batch and wait for its embedding"""
+        loop = asyncio.get_running_loop()
+        self.requests += 1
+        future = self._pending.get(text)
+        if future is None:
+            future = loop.create_future()
+            self._pending[text] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, asyncio.Future]) -> None:
+        texts = list(batch)
+        try:
+            embeddings = await self.provider.get_embeddings_batch(texts)
+            # A short batch would otherwise leave the tail of its waiters unresolved forever
+            _check_batch(texts, embeddings)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, embedding in zip(texts, embeddings):
+            if not batch[text].done():
+                batch[text].set_result(embedding)
+
+def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores along the last axis, best first"""
+    n = scores.shape[-1]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows into a contiguous float32 matrix, leaving zero rows as zeros"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+class EmbeddingIndex:
+    """Pre-normalized float32 document matrix scored with one matrix product per query batch"""
+
+    def __init__(self, documents: Sequence[str], embeddings: Sequence[np.ndarray]):
+        self.documents = list(documents)
+        if not self.documents:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            self.matrix = _normalize_rows(np.stack(embeddings))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, float]]:
+        """Return the top_k documents by cosine similarity to one query"""
+        return self.search_batch(np.asarray(query_embedding)[np.newaxis, :], top_k)[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = 5) -> List[List[Dict[str, float]]]:
+        """Return the top_k documents for each row of a query matrix"""
+        queries = _normalize_rows(np.atleast_2d(query_embeddings))
+        if not self.documents:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self.matrix.T
+        indices = _top_k_indices(scores, top_k)
+        return [
+            [{"document": self.documents[i], "similarity": float(row_scores[i])} for i in row_indices]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
 
 class SemanticSearch:
-    def __init__(self):
-        self.provider = provider_factory.get_provider()
-        self.embeddings_cache: Dict[str, np.ndarray] = {}
+    def __init__(
+        self,
+        provider: Optional[LLMProvider] = None,
+        cache: Optional[EmbeddingCache] = None,
+        store: Optional[EmbeddingStore] = None
+    ):
+        self.provider = provider or provider_factory.get_provider()
+        self.embeddings_cache = cache if cache is not None else EmbeddingCache()
+        if store is None and settings.EMBEDDING_STORE_PATH:
+            store = EmbeddingStore(settings.EMBEDDING_STORE_PATH, readonly=settings.EMBEDDING_STORE_READONLY)
+        self.store = store
+        self.batcher = EmbeddingBatcher(self.provider)
+
+    def _cache_key(self, text: str) -> bytes:
+        return embedding_cache_key(
+            getattr(self.provider, "name", type(self.provider).__name__),
+            getattr(self.provider, "embedding_model", ""),
+            text
+        )
+
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        """Look up an embedding in memory, then in the persistent store"""
+        cached = self.embeddings_cache.get(key)
+        if cached is None and self.store is not None:
+            # Store hits are zero-copy views of shared pages, so they are not duplicated in memory
+            cached = self.store.get(key)
+        return cached
+
+    def _remember(self, key: bytes, embedding: list) -> np.ndarray:
+        if self.store is not None:
+            self.store.put(key, embedding)
+        return self.embeddings_cache.put(key, embedding)
 
     async def get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for text, using cache if available"""
-        if text in self.embeddings_cache:
-            return self.embeddings_cache[text]
-        
-        embedding = await self.provider.get_embeddings(text)
-        self.embeddings_cache[text] = np.array(embedding)
-        return self.embeddings_cache[text]
+        key = self._cache_key(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        embedding = await self.batcher.submit(text)
+        return self._remember(key, embedding)
+
+    async def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Get embeddings for many texts, embedding each uncached distinct text once"""
+        found: Dict[str, np.ndarray] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            cached = self._lookup(self._cache_key(text))
+            if cached is None:
+                missing.append(text)
+            else:
+                found[text] = cached
+
+        for start in range(0, len(missing), self.batcher.max_batch_size):
+            chunk = missing[start:start + self.batcher.max_batch_size]
+            embeddings = await self.provider.get_embeddings_batch(chunk)
+            _check_batch(chunk, embeddings)
+            for text, embedding in zip(chunk, embeddings):
+                found[text] = self._remember(self._cache_key(text), embedding)
+        return [found[text] for text in texts]
 
     async def similarity_search(
         self,
@@ -27,27 +194,128 @@ class SemanticSearch:
     ) -> List[Dict[str, float]]:
         """Perform similarity search on documents"""
         try:
-            query_embedding = await self.get_embedding(query)
-            doc_embeddings = [await self.get_embedding(doc) for doc in documents]
-            
-            # Calculate cosine similarity
-            similarities = []
-            for doc, doc_embedding in zip(documents, doc_embeddings):
-                similarity = np.dot(query_embedding, doc_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(doc_embedding)
-                )
-                similarities.append({"document": doc, "similarity": float(similarity)})
-            
-            # Sort by similarity and return top_k results
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            return similarities[:top_k]
-            
+            query_embedding, *doc_embeddings = await self.get_embeddings([query] + documents)
+            return EmbeddingIndex(documents, doc_embeddings).search(query_embedding, top_k)
+
         except Exception as e:
             logger.error(f"Semantic search error: {str(e)}")
             raise AGNOError(f"Semantic search failed: {str(e)}")
 
+    async def build_index(self, documents: List[str]) -> EmbeddingIndex:
+        """Embed documents and stack them into a reusable EmbeddingIndex"""
+        return EmbeddingIndex(documents, await self.get_embeddings(documents))
+
+    async def batch_similarity_search(
+        self,
+        queries: List[str],
+        documents: List[str],
+        top_k: int = 5
+    ) -> List[List[Dict[str, float]]]:
+        """Perform similarity search for many queries with one matrix-matrix product"""
+        if not queries:
+            return []
+        try:
+            embeddings = await self.get_embeddings(queries + documents)
+            index = EmbeddingIndex(documents, embeddings[len(queries):])
+            return index.search_batch(np.stack(embeddings[:len(queries)]), top_k)
+
+        except Exception as e:
+            logger.error(f"Batch semantic search error: {str(e)}")
+            raise AGNOError(f"Batch semantic search failed: {str(e)}")
+
     def clear_cache(self) -> None:
         """Clear the embeddings cache"""
         self.embeddings_cache.clear()
 
-semantic_search = SemanticSearch() 
\ No newline at end of file
+class _SemanticPartition:
+    """Fixed-capacity ring of normalized prompt embeddings and their answers"""
+
+    __slots__ = ("matrix", "responses", "size", "next_slot")
+
+    def __init__(self, capacity: int, dim: int):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+
+class SemanticResponseCache:
+    """Reuse answers of previously seen prompts whose embeddings are close enough.
+
+    Prompts are partitioned by prompt type and kept in bounded float32 ring
+    matrices, so a lookup is one matrix-vector product. The best similarity of
+    every lookup is recorded in a histogram to help tune the threshold.
+    """
+
+    def __init__(
+        self,
+        search: SemanticSearch,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        histogram_bins: int = 20
+    ):
+        self.search = search
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.histogram_bins = histogram_bins
+        self._partitions: Dict[str, _SemanticPartition] = {}
+        self._histogram = np.zeros(histogram_bins, dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+
+    async def _embed(self, prompt: str) -> np.ndarray:
+        return _normalize_rows(np.asarray(await self.search.get_embedding(prompt))[np.newaxis, :])[0]
+
+    async def lookup(self, prompt: str, prompt_type: str) -> Optional[str]:
+        """Stored answer of the most similar prompt of this type, if within the threshold"""
+        partition = self._partitions.get(prompt_type)
+        if partition is None or partition.size == 0:
+            self.misses += 1
+            return None
+
+        query = await self._embed(prompt)
+        scores = partition.matrix[:partition.size] @ query
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        bin_index = int((min(max(similarity, -1.0), 1.0) + 1.0) / 2.0 * self.histogram_bins)
+        self._histogram[min(bin_index, self.histogram_bins - 1)] += 1
+
+        if similarity >= self.threshold:
+            self.hits += 1
+            return partition.responses[best]
+        self.misses += 1
+        return None
+
+    async def store(self, prompt: str, prompt_type: str, response: str) -> None:
+        """Remember the answer to prompt, overwriting the oldest entry when full"""
+        embedding = await self._embed(prompt)
+        partition = self._partitions.get(prompt_type)
+        if partition is None:
+            partition = self._partitions[prompt_type] = _SemanticPartition(self.max_entries, embedding.shape[0])
+        partition.matrix[partition.next_slot] = embedding
+        partition.responses[partition.next_slot] = response
+        partition.next_slot = (partition.next_slot + 1) % self.max_entries
+        partition.size = min(partition.size + 1, self.max_entries)
+
+    def clear(self) -> None:
+        """Drop all stored answers, keeping the counters"""
+        self._partitions.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate, entries per prompt type and the distribution of best similarities"""
+        lookups = self.hits + self.misses
+        edges = np.linspace(-1.0, 1.0, self.histogram_bins + 1)
+        return {
+            "threshold": self.threshold,
+            "entries": {prompt_type: p.size for prompt_type, p in self._partitions.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "similarity_histogram": {
+                f"{low:.1f}..{high:.1f}": int(count)
+                for low, high, count in zip(edges[:-1], edges[1:], self._histogram)
+                if count
+            }
+        }
+
+semantic_search = SemanticSearch()
+semantic_response_cache = SemanticResponseCache(semantic_search)
@@ -0,0 +1,96 @@
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+import asyncio
+import json
+from .providers import LLMProvider, ProviderWrapper
+
+T = TypeVar("T")
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers using the same key.
+
+    Every caller awaits the shared task through asyncio.shield, so a caller
+    being cancelled (e.g. a client disconnecting) does not cancel the call for
+    the others. The shared task is only cancelled once no caller is left.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn for key, or join the call already in flight for it"""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finish(key, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark the exception retrieved even if every waiter has gone
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls)
+        }
+
+def _options_key(kwargs: Dict) -> str:
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+class SingleFlightProvider(ProviderWrapper):
+    """Coalesce concurrent identical generate and embedding calls into one upstream request.
+
+    Streams are consumed incrementally by a single client and pass through unshared.
+    """
+
+    def __init__(self, inner: LLMProvider, flight: SingleFlight):
+        super().__init__(inner)
+        self.flight = flight
+
+    def _key(self, *parts) -> tuple:
+        return (getattr(self.inner, "name", type(self.inner).__name__), id(self.inner)) + parts
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self.flight.do(
+            self._key("generate", prompt, _options_key(kwargs)),
+            lambda: self.inner.generate(prompt, **kwargs)
+        )
+
+    async def get_embeddings(self, text: str) -> list:
+        return await self.flight.do(
+            self._key("embeddings", text),
+            lambda: self.inner.get_embeddings(text)
+        )
+
+    async def get_embeddings_batch(self, texts: List[str]) -> List[list]:
+        return await self.flight.do(
+            self._key("embeddings_batch", tuple(texts)),
+            lambda: self.inner.get_embeddings_batch(texts)
+        )
+
+singleflight = SingleFlight()
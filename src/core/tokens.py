@@ -0,0 +1,34 @@
+from typing import Optional
+from functools import lru_cache
+from .logging import logger
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency, fall back to the estimate
+    tiktoken = None
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate of roughly four characters per token"""
+    return (len(text) + 3) // 4
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            # Non-OpenAI models (e.g. Groq hosted Llama) are close enough to cl100k_base for budgeting
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Also covers a failed BPE download; the cached None keeps later calls from retrying it
+        logger.warning(f"Tokenizer unavailable for {model}, using estimate: {str(e)}")
+        return None
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens of text for the given model, estimating when no tokenizer is available"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -1,12 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List
+import json
+import math
 from .core.config import settings
 from .core.logging import logger
-from .core.errors import global_exception_handler, AGNOError
+from .core.errors import global_exception_handler, AGNOError, DeadlineExceededError, OverloadedError
 from .core.security import get_current_user, authenticate_user, create_access_token, get_current_active_user
+from .core.http import http_pool
+from .core.context import context_manager
+from .core.cache import response_cache
+from .core.search import semantic_response_cache
+from .core.singleflight import singleflight
+from .core.ratelimit import rate_limit_stats
+from .core.resilience import deadline_scope, resilience_stats
+from .core.routing import routing_stats
+from .core.inference import inference_stats
 from .agents import agent_factory
 from datetime import timedelta
 
@@ -30,6 +42,24 @@ app.add_middleware(
 # Add global exception handler
 app.add_exception_handler(Exception, global_exception_handler)
 
+def _request_timeout(header: Optional[str]) -> float:
+    """Deadline for a request, lowered by a finite positive X-Request-Timeout"""
+    timeout = settings.REQUEST_TIMEOUT_SECONDS
+    try:
+        requested = float(header)
+    except (TypeError, ValueError):
+        return timeout
+    # 0, negatives, nan and inf would expire every call at once or disable the deadline
+    if not math.isfinite(requested) or requested <= 0:
+        return timeout
+    return min(timeout, requested)
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Bound upstream calls made for this request by its deadline"""
+    with deadline_scope(_request_timeout(request.headers.get("X-Request-Timeout"))):
+        return await call_next(request)
+
 # Request/Response Models
 class InterviewRequest(BaseModel):
     session_id: str
@@ -49,6 +79,21 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def metrics():
+    """Runtime metrics used for capacity planning"""
+    return {
+        "http_pool": http_pool.stats(),
+        "sessions": context_manager.stats(),
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_response_cache.stats(),
+        "singleflight": singleflight.stats(),
+        "rate_limits": rate_limit_stats(),
+        "resilience": resilience_stats(),
+        "routing": routing_stats(),
+        "local_inference": inference_stats()
+    }
+
 @app.get(f"{settings.API_V1_STR}/protected")
 async def protected_route(current_user = Depends(get_current_user)):
     """Example protected route"""
@@ -61,6 +106,17 @@ async def interview(request: InterviewRequest):
         agent = agent_factory.get_agent("interviewer")
         response = await agent.process(request.dict())
         return response
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    except DeadlineExceededError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except AGNOError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -73,14 +129,39 @@ async def interview(request: InterviewRequest):
             detail="Internal server error"
         )
 
+@app.post(f"{settings.API_V1_STR}/interview/stream")
+async def interview_stream(request: InterviewRequest):
+    """Interview endpoint streaming the response as server-sent events"""
+    agent = agent_factory.get_agent("interviewer")
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event in agent.process_stream(request.dict()):
+                yield f"event: {event.pop('event')}\ndata: {json.dumps(event)}\n\n"
+        except AGNOError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        except Exception as e:
+            logger.error(f"Interview stream error: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Internal server error'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.on_event("startup")
 async def startup_event():
     """Application startup event"""
+    await http_pool.start()
+    context_manager.start_expiry_task()
     logger.info("Application startup complete")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
+    await context_manager.stop_expiry_task()
+    await http_pool.close()
     logger.info("Application shutdown complete")
 
 @app.post(f"{settings.API_V1_STR}/auth/token")
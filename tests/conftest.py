@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+from src.core.providers import LLMProvider
+
+class FakeEmbeddingProvider(LLMProvider):
+    """Deterministic offline provider recording upstream calls"""
+
+    name = "fake"
+    embedding_model = "fake-embedding"
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.batch_calls = []
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return prompt
+
+    def _embed(self, text: str) -> list:
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(self.dim).tolist()
+
+    async def get_embeddings(self, text: str) -> list:
+        return self._embed(text)
+
+    async def get_embeddings_batch(self, texts):
+        self.batch_calls.append(list(texts))
+        return [self._embed(text) for text in texts]
+
+@pytest.fixture
+def embedding_provider():
+    return FakeEmbeddingProvider()
+
+class CountingLLMProvider(LLMProvider):
+    """Offline provider echoing prompts and recording generate calls"""
+
+    name = "counting"
+    model = "counting-model"
+    temperature = 0.7
+    max_tokens = 100
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls.append((prompt, kwargs))
+        return f"jawaban: {prompt}"
+
+    async def get_embeddings(self, text: str) -> list:
+        return [0.0]
+
+@pytest.fixture
+def llm_provider():
+    return CountingLLMProvider()
@@ -51,4 +51,154 @@ async def test_interviewer_agent():
     # Test clearing context
     await agent.clear_context("test_session")
     context = await agent.get_context("test_session")
-    assert len(context) == 0 
\ No newline at end of file
+    assert len(context) == 0 
+
+class _StreamingProvider:
+    """Stub provider streaming a fixed response in chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def generate(self, prompt, **kwargs):
+        return "".join(self.chunks)
+
+    async def generate_stream(self, prompt, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_stream():
+    """Test streaming interview responses are recorded once complete"""
+    agent = InterviewerAgent()
+    agent.provider = _StreamingProvider(["Halo, ", "selamat ", "datang!"])
+    session_id = "test_stream_session"
+
+    events = [event async for event in agent.process_stream({
+        "session_id": session_id,
+        "message": "Hello"
+    })]
+
+    assert events[0] == {"event": "start", "prompt_type": "greeting"}
+    assert [e["token"] for e in events if e["event"] == "token"] == ["Halo, ", "selamat ", "datang!"]
+    assert events[-1]["event"] == "done"
+    assert events[-1]["response"] == "Halo, selamat datang!"
+
+    context = await agent.get_context(session_id)
+    assert context[-1]["response"] == "Halo, selamat datang!"
+    await agent.clear_context(session_id)
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_semantic_cache(llm_provider):
+    """Test similar greetings are answered from the semantic cache"""
+    from src.core.search import SemanticResponseCache
+
+    class _ExactMatchSearch:
+        async def get_embedding(self, text):
+            return [1.0, 0.0] if "pengalaman" in text else [0.0, 1.0]
+
+    agent = InterviewerAgent()
+    agent.provider = llm_provider
+    agent.semantic_cache = SemanticResponseCache(_ExactMatchSearch(), threshold=0.9)
+
+    first = await agent.process({"session_id": "semantic_a", "message": "Halo, pengalaman saya"})
+    second = await agent.process({"session_id": "semantic_b", "message": "Hai, pengalaman saya"})
+
+    assert second["response"] == first["response"]
+    assert len(llm_provider.calls) == 1
+
+    # Questions carry each session's history, so they are never shared across sessions
+    third = await agent.process({"session_id": "semantic_a", "message": "Pengalaman saya di proyek"})
+    fourth = await agent.process({"session_id": "semantic_b", "message": "Pengalaman saya di proyek"})
+    assert third["prompt_type"] == fourth["prompt_type"] == "question"
+    assert len(llm_provider.calls) == 3
+    for session_id in ("semantic_a", "semantic_b"):
+        await agent.clear_context(session_id)
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_greeting_provider(llm_provider):
+    """Test greetings go to the dedicated greeting provider and later turns to the default one"""
+    agent = InterviewerAgent()
+    agent.provider = llm_provider
+    agent.greeting_provider = type(llm_provider)()
+
+    await agent.process({"session_id": "greeting_provider", "message": "Halo"})
+    await agent.process({"session_id": "greeting_provider", "message": "Saya backend engineer"})
+
+    assert len(agent.greeting_provider.calls) == 1
+    assert len(llm_provider.calls) == 1
+    await agent.clear_context("greeting_provider")
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_serializes_turns_per_session(llm_provider):
+    """Test concurrent turns of one session each see the turns recorded before them"""
+    import asyncio
+
+    class _SlowProvider(type(llm_provider)):
+        async def generate(self, prompt, **kwargs):
+            await asyncio.sleep(0.01)
+            return await super().generate(prompt, **kwargs)
+
+    agent = InterviewerAgent()
+    agent.provider = _SlowProvider()
+    agent.semantic_cache = None
+    session_id = "serialized_turns"
+
+    results = await asyncio.gather(*(
+        agent.process({"session_id": session_id, "message": f"Pesan {i}"}) for i in range(3)
+    ))
+
+    assert [len(result["context"]) for result in results] == [0, 1, 2]
+    assert [result["prompt_type"] for result in results] == ["greeting", "question", "question"]
+    assert len(await agent.get_context(session_id)) == 3
+    await agent.clear_context(session_id)
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_turns_of_other_sessions_overlap(llm_provider):
+    """Test a slow turn does not hold up other sessions, even on the same lock stripe"""
+    import asyncio
+    import time
+    from src.core.locks import StripedLock
+
+    class _SlowProvider(type(llm_provider)):
+        async def generate(self, prompt, **kwargs):
+            await asyncio.sleep(0.2)
+            return await super().generate(prompt, **kwargs)
+
+    agent = InterviewerAgent()
+    agent.provider = _SlowProvider()
+    agent.semantic_cache = None
+    original_locks = agent.context._locks
+    agent.context._locks = StripedLock(stripes=1)
+    try:
+        start = time.monotonic()
+        await asyncio.gather(*(
+            agent.process({"session_id": f"overlap_{i}", "message": "Halo"}) for i in range(3)
+        ))
+        assert time.monotonic() - start < 0.4
+    finally:
+        agent.context._locks = original_locks
+        for i in range(3):
+            await agent.clear_context(f"overlap_{i}")
+
+@pytest.mark.asyncio
+async def test_interviewer_agent_stream_holds_no_lock_while_yielding():
+    """Test a stalled stream consumer does not block the next turn of its session"""
+    import asyncio
+
+    agent = InterviewerAgent()
+    agent.provider = _StreamingProvider(["Halo, ", "apa kabar?"])
+    agent.semantic_cache = None
+    session_id = "stalled_stream"
+
+    stream = agent.process_stream({"session_id": session_id, "message": "Halo"})
+    assert (await stream.__anext__())["event"] == "start"
+    assert (await stream.__anext__())["event"] == "token"
+
+    # The stream is parked mid-response; another turn of the same session still completes
+    other = await asyncio.wait_for(agent.process({"session_id": session_id, "message": "Lagi"}), timeout=1.0)
+    assert other["prompt_type"] == "greeting"
+
+    events = [event async for event in stream]
+    assert events[-1]["response"] == "Halo, apa kabar?"
+    assert len(await agent.get_context(session_id)) == 2
+    await agent.clear_context(session_id)
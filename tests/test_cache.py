@@ -0,0 +1,149 @@
+import time
+import pytest
+import numpy as np
+from src.core.cache import (
+    CachingProvider,
+    EmbeddingCache,
+    ResponseCache,
+    embedding_cache_key,
+    response_cache_key
+)
+from src.core.errors import AGNOError
+
+def test_embedding_cache_key():
+    key = embedding_cache_key("openai", "text-embedding-ada-002", "halo")
+    assert isinstance(key, bytes) and len(key) == 16
+    assert key == embedding_cache_key("openai", "text-embedding-ada-002", "halo")
+    assert key != embedding_cache_key("groq", "text-embedding-ada-002", "halo")
+    assert key != embedding_cache_key("openai", "text-embedding-3-small", "halo")
+
+def test_embedding_cache_lru_byte_budget():
+    entry_bytes = 1536 * 4 + 200
+    cache = EmbeddingCache(max_bytes=entry_bytes * 3, ttl_seconds=0, dtype="float32")
+    keys = [embedding_cache_key("p", "m", str(i)) for i in range(4)]
+
+    for key in keys[:3]:
+        stored = cache.put(key, np.ones(1536))
+        assert stored.dtype == np.float32
+    assert cache.get(keys[0]) is not None  # refresh keys[0]
+
+    cache.put(keys[3], np.ones(1536))
+
+    assert len(cache) == 3
+    assert keys[1] not in cache
+    assert keys[0] in cache
+    assert cache.bytes_used <= cache.max_bytes
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes_used == 0
+
+def test_embedding_cache_ttl_and_float16():
+    cache = EmbeddingCache(max_bytes=1 << 20, ttl_seconds=0.01, dtype="float16")
+    key = embedding_cache_key("p", "m", "text")
+    assert cache.put(key, [0.5, 0.25]).dtype == np.float16
+    time.sleep(0.02)
+
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.bytes_used == 0
+
+def test_embedding_cache_rejects_unknown_dtype():
+    with pytest.raises(AGNOError):
+        EmbeddingCache(dtype="float64")
+
+def test_response_cache_key_covers_request():
+    key = response_cache_key("openai", "gpt", 0, "sistem", "halo")
+    assert key == response_cache_key("openai", "gpt", 0, "sistem", "halo")
+    assert key != response_cache_key("openai", "gpt", 0.7, "sistem", "halo")
+    assert key != response_cache_key("openai", "gpt", 0, "sistem lain", "halo")
+    assert key != response_cache_key("groq", "gpt", 0, "sistem", "halo")
+
+@pytest.mark.asyncio
+async def test_caching_provider_only_caches_deterministic_or_opt_in(llm_provider):
+    provider = CachingProvider(llm_provider, ResponseCache(max_entries=10))
+
+    await provider.generate("halo", system_message="s")
+    await provider.generate("halo", system_message="s")
+    assert len(llm_provider.calls) == 2  # temperature 0.7, not cached
+
+    assert await provider.generate("halo", system_message="s", temperature=0) == "jawaban: halo"
+    assert await provider.generate("halo", system_message="s", temperature=0) == "jawaban: halo"
+    assert len(llm_provider.calls) == 3
+
+    await provider.generate("salam", cache=True)
+    await provider.generate("salam", cache=True)
+    assert len(llm_provider.calls) == 4
+    assert "cache" not in llm_provider.calls[-1][1]
+
+    await provider.generate("halo", system_message="s", temperature=0, cache=False)
+    assert len(llm_provider.calls) == 5
+
+    stats = provider.cache.stats()
+    assert stats["local_hits"] == 2
+    assert stats["hit_rate"] == pytest.approx(0.5)
+    assert provider.model == "counting-model"
+
+@pytest.mark.asyncio
+async def test_caching_provider_stream_hits(llm_provider):
+    provider = CachingProvider(llm_provider, ResponseCache())
+    first = [chunk async for chunk in provider.generate_stream("halo", cache=True)]
+    second = [chunk async for chunk in provider.generate_stream("halo", cache=True)]
+    assert "".join(first) == "".join(second) == "jawaban: halo"
+    assert len(llm_provider.calls) == 1
+
+def test_response_cache_lru_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_response_cache_redis_tier_shared():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    worker_a = ResponseCache(redis_client=client, ttl_seconds=60)
+    worker_b = ResponseCache(redis_client=client, ttl_seconds=60)
+
+    worker_a.put("k", "halo")
+    assert worker_b.get("k") == "halo"
+    assert worker_b.get("k") == "halo"
+    assert worker_b.stats()["redis_hits"] == 1
+    assert worker_b.stats()["local_hits"] == 1
+    assert 0 < client.ttl("agno:response:k") <= 60
+
+@pytest.mark.asyncio
+async def test_caching_provider_redis_calls_run_off_the_event_loop(llm_provider):
+    import threading
+    fakeredis = pytest.importorskip("fakeredis")
+    loop_thread = threading.get_ident()
+    threads = set()
+
+    class RecordingRedis(fakeredis.FakeRedis):
+        def get(self, *args, **kwargs):
+            threads.add(threading.get_ident())
+            return super().get(*args, **kwargs)
+
+        def set(self, *args, **kwargs):
+            threads.add(threading.get_ident())
+            return super().set(*args, **kwargs)
+
+    client = RecordingRedis()
+    worker_a = CachingProvider(llm_provider, ResponseCache(redis_client=client, ttl_seconds=60))
+    worker_b = CachingProvider(llm_provider, ResponseCache(redis_client=client, ttl_seconds=60))
+
+    assert await worker_a.generate("halo", cache=True) == "jawaban: halo"
+    assert await worker_b.generate("halo", cache=True) == "jawaban: halo"
+    assert len(llm_provider.calls) == 1
+    assert worker_b.cache.stats()["redis_hits"] == 1
+    assert threads and loop_thread not in threads
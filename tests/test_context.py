@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import pytest
+from src.core.context import ContextManager, InMemoryContextStore, RedisContextStore
+from src.core.tokens import estimate_tokens
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+@pytest.fixture(params=["memory", "redis"])
+def manager(request, redis_client):
+    if request.param == "memory":
+        return ContextManager(store=InMemoryContextStore())
+    return ContextManager(store=RedisContextStore(client=redis_client, ttl_seconds=60))
+
+def test_add_and_get_context(manager):
+    manager.add_context("s1", {"response": "satu"})
+    manager.add_context("s1", {"response": "dua"})
+
+    turns = manager.get_context("s1")
+    assert [turn["response"] for turn in turns] == ["satu", "dua"]
+    assert all("timestamp" in turn for turn in turns)
+
+    metadata = manager.get_session_metadata("s1")
+    assert metadata["context_count"] == 2
+    assert "s1" in manager.get_all_sessions()
+
+    manager.clear_context("s1")
+    assert manager.get_context("s1") == []
+    assert manager.get_session_metadata("s1") is None
+
+def test_max_length_is_enforced(manager):
+    manager.max_length = 3
+    for i in range(5):
+        manager.add_context("s1", {"index": i})
+    assert [turn["index"] for turn in manager.get_context("s1")] == [2, 3, 4]
+    assert manager.get_session_metadata("s1")["context_count"] == 3
+
+def test_redis_sessions_shared_between_workers(redis_client):
+    worker_a = ContextManager(store=RedisContextStore(client=redis_client, ttl_seconds=60))
+    worker_b = ContextManager(store=RedisContextStore(client=redis_client, ttl_seconds=60))
+
+    worker_a.add_context("s1", {"response": "dari a"})
+    assert [t["response"] for t in worker_b.get_context("s1")] == ["dari a"]
+
+    worker_b.add_context("s1", {"response": "dari b"})
+    # worker_a's local copy is stale and must be invalidated by the version bump
+    assert [t["response"] for t in worker_a.get_context("s1")] == ["dari a", "dari b"]
+
+def test_redis_local_read_through_cache(redis_client):
+    store = RedisContextStore(client=redis_client, ttl_seconds=60)
+    manager = ContextManager(store=store)
+    manager.add_context("s1", {"response": "halo"})
+
+    manager.get_context("s1")
+    manager.get_context("s1")
+    assert store.local_hits == 2
+    assert store.local_misses == 0
+
+def test_redis_sessions_expire_with_ttl(redis_client):
+    manager = ContextManager(store=RedisContextStore(client=redis_client, ttl_seconds=60))
+    manager.add_context("s1", {"response": "halo"})
+    ttl = redis_client.ttl("agno:session:s1:turns")
+    assert 0 < ttl <= 60
+
+def test_running_totals_track_append_and_eviction(manager):
+    manager.max_length = 3
+    for i in range(6):
+        manager.add_context("s1", {"response": "x" * (10 * (i + 1))})
+
+    metadata = manager.get_session_metadata("s1")
+    turns = manager.get_context("s1")
+    expected_bytes = sum(len(json.dumps(turn, ensure_ascii=False).encode("utf-8")) for turn in turns)
+    assert metadata["context_bytes"] == expected_bytes
+    assert metadata["context_tokens"] == sum(
+        estimate_tokens(json.dumps(turn, ensure_ascii=False)) for turn in turns
+    )
+
+def test_expiry_heap_evicts_only_idle_sessions(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.core.context.time.monotonic", lambda: clock[0])
+    store = InMemoryContextStore()
+    manager = ContextManager(store=store)
+
+    manager.add_context("idle", {"response": "a"})
+    manager.add_context("active", {"response": "b"})
+    clock[0] += 50
+    manager.get_context("active")  # refreshes "active", leaving a stale heap entry
+    clock[0] += 60
+
+    assert store.cleanup(max_age_seconds=100) == ["idle"]
+    assert store.cleanup(max_age_seconds=100) == []
+    assert manager.get_all_sessions() == ["active"]
+    assert manager.stats()["live_sessions"] == 1
+    assert manager.stats()["evicted_sessions"] == 1
+
+@pytest.mark.asyncio
+async def test_background_expiry_task():
+    store = InMemoryContextStore()
+    manager = ContextManager(store=store)
+    manager.add_context("s1", {"response": "a"})
+
+    manager.start_expiry_task(interval_seconds=0.01, max_age_seconds=0)
+    await asyncio.sleep(0.05)
+    await manager.stop_expiry_task()
+
+    assert manager.get_all_sessions() == []
+    assert manager.stats()["evicted_sessions"] == 1
+
+@pytest.mark.asyncio
+async def test_atomic_update_merges_latest_turn(manager):
+    await manager.atomic_update("s1", {"response": "awal"})
+    await manager.atomic_append("s1", {"response": "dua", "input": {"message": "hai"}})
+    before = manager.get_session_metadata("s1")["context_bytes"]
+
+    await manager.atomic_update("s1", {"response": "dua diperbarui"})
+    turns = manager.get_context("s1")
+    assert [t["response"] for t in turns] == ["awal", "dua diperbarui"]
+    assert turns[-1]["input"] == {"message": "hai"}
+    assert manager.get_session_metadata("s1")["context_bytes"] == before + len(" diperbarui")
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_do_not_interleave(manager):
+    sessions = [f"s{i}" for i in range(20)]
+    turns_per_session = 100
+
+    async def turn(session_id: str) -> None:
+        # Read-modify-write across an await, as an agent turn does around the LLM call
+        async with manager.lock(session_id):
+            metadata = manager.get_session_metadata(session_id)
+            count = metadata["context_count"] if metadata else 0
+            await asyncio.sleep(0)
+            manager.add_context(session_id, {"n": count})
+        await manager.atomic_update(session_id, {"done": True})
+
+    await asyncio.gather(*(turn(s) for _ in range(turns_per_session) for s in sessions))
+
+    manager.max_length = turns_per_session
+    for session_id in sessions:
+        turns = manager.get_context(session_id)
+        assert [t["n"] for t in turns] == list(range(turns_per_session))
+        # Updates land on whichever turn is latest when the lock is taken
+        assert turns[-1]["done"] is True
+
+@pytest.mark.asyncio
+async def test_redis_calls_run_off_the_event_loop(redis_client):
+    loop_thread = threading.get_ident()
+    threads = set()
+
+    class RecordingRedis(type(redis_client)):
+        def pipeline(self, *args, **kwargs):
+            threads.add(threading.get_ident())
+            return super().pipeline(*args, **kwargs)
+
+    client = RecordingRedis(server=redis_client.connection_pool.connection_kwargs["server"])
+    manager = ContextManager(store=RedisContextStore(client=client, ttl_seconds=60))
+
+    await manager.atomic_append("s1", {"response": "satu"})
+    await manager.atomic_update("s1", {"done": True})
+    assert [t["response"] for t in await manager.get_context_async("s1")] == ["satu"]
+    await manager.clear_context_async("s1")
+
+    assert threads and loop_thread not in threads
+    assert await manager.get_context_async("s1") == []
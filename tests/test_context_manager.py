@@ -1,5 +1,5 @@
 import pytest
-from src.context.context_manager import ContextManager
+from src.context.context_manager import ContextManager, train_dictionary
 import json
 from datetime import datetime
 
@@ -96,4 +96,127 @@ async def test_max_size_limit(context_manager):
     # Verify only max_size contexts are kept
     assert len(retrieved_contexts) == 1000
     assert retrieved_contexts[0]["index"] == 500  # First entry should be 500th
-    assert retrieved_contexts[-1]["index"] == 1499  # Last entry should be 1499th 
\ No newline at end of file
+    assert retrieved_contexts[-1]["index"] == 1499  # Last entry should be 1499th 
+
+@pytest.mark.asyncio
+async def test_entries_stored_as_bytes(context_manager, sample_context):
+    await context_manager.store_context("test_session", sample_context)
+    await context_manager.store_context("test_session", {"a": 1})
+
+    entries = list(context_manager.context["test_session"])
+    assert all(isinstance(entry, bytes) for entry in entries)
+
+    retrieved = await context_manager.retrieve_context("test_session")
+    assert retrieved[1]["a"] == 1
+    assert retrieved[0]["conversation"] == sample_context["conversation"]
+
+def test_trained_dictionary_shrinks_small_entries():
+    samples = [
+        json.dumps({"input": {"message": f"pertanyaan {i}"}, "response": f"jawaban {i}", "prompt_type": "question"})
+        for i in range(50)
+    ]
+    dictionary = train_dictionary(samples, size=1024)
+    assert 0 < len(dictionary) <= 1024
+
+    with_dict = ContextManager(dictionary=dictionary, compression_threshold=0)
+    without_dict = ContextManager(dictionary=b"", compression_threshold=0)
+    entry = {"input": {"message": "pertanyaan baru"}, "response": "jawaban baru", "prompt_type": "question"}
+
+    assert len(with_dict._encode(entry)) < len(without_dict._encode(entry))
+    assert with_dict._decode(with_dict._encode(entry)) == entry
+
+@pytest.mark.asyncio
+async def test_view_context_decodes_lazily(context_manager, monkeypatch):
+    for i in range(10):
+        await context_manager.store_context("s", {"response": f"jawaban {i}", "input": {"message": "x" * 100}})
+
+    decoded = []
+    original = context_manager._decode
+    monkeypatch.setattr(context_manager, "_decode", lambda entry: decoded.append(entry) or original(entry))
+
+    view = await context_manager.view_context("s", limit=4)
+    assert len(view) == 4
+    assert not decoded
+
+    assert view[-1]["response"] == "jawaban 9"
+    assert view[-1]["response"] == "jawaban 9"
+    assert len(decoded) == 1  # memoized
+
+    view[-1]["response"] = "mutated"
+    assert view[-1]["response"] == "jawaban 9"
+
+@pytest.mark.asyncio
+async def test_retrieve_field_skips_full_decode(context_manager, monkeypatch):
+    for i in range(5):
+        await context_manager.store_context("s", {"response": f"jawaban\n{i}", "input": {"message": "y" * 200}})
+
+    monkeypatch.setattr(context_manager, "_decode", lambda entry: pytest.fail("full decode"))
+    assert await context_manager.retrieve_field("s", "response", limit=3) == ["jawaban\n2", "jawaban\n3", "jawaban\n4"]
+    assert await context_manager.retrieve_field("s", "missing") == [None] * 5
+    assert await context_manager.retrieve_field("unknown", "response") == []
+
+@pytest.mark.asyncio
+async def test_memo_invalidated_on_update(context_manager):
+    await context_manager.store_context("s", {"response": "lama"})
+    assert (await context_manager.retrieve_context("s"))[-1]["response"] == "lama"
+
+    await context_manager.update_context("s", {"response": "baru"})
+    assert (await context_manager.retrieve_context("s"))[-1]["response"] == "baru"
+    assert await context_manager.retrieve_field("s", "response") == ["baru"]
+
+@pytest.mark.asyncio
+async def test_lock_serializes_read_modify_write(context_manager):
+    import asyncio
+
+    async def turn(key):
+        # Read, await (as around an LLM call), then write what was read
+        async with context_manager.lock(key):
+            count = len(await context_manager.view_context(key))
+            await asyncio.sleep(0)
+            await context_manager.store_context(key, {"index": count})
+            await asyncio.sleep(0)
+            await context_manager.update_context(key, {"updated": count})
+
+    await asyncio.gather(*(turn(f"s{i % 10}") for i in range(500)))
+    for i in range(10):
+        entries = await context_manager.retrieve_context(f"s{i}")
+        assert [entry["index"] for entry in entries] == list(range(50))
+        assert [entry["updated"] for entry in entries] == list(range(50))
+
+@pytest.mark.asyncio
+async def test_non_string_keys_are_stringified(context_manager):
+    await context_manager.store_context("k", {1: "a", None: "b"})
+    await context_manager.store_context("k", {2: "c" * 200})
+
+    retrieved = await context_manager.retrieve_context("k")
+    assert retrieved[0]["1"] == "a" and retrieved[0]["None"] == "b"
+    assert retrieved[1]["2"] == "c" * 200
+    assert await context_manager.retrieve_field("k", "1") == ["a", None]
+
+@pytest.mark.asyncio
+async def test_non_json_values_are_stored_as_strings(context_manager):
+    moment = datetime(2024, 1, 2, 3, 4, 5)
+    await context_manager.store_context("k", {"at": moment})
+    await context_manager.store_context("k", {"at": moment, "text": "x" * 200})
+    await context_manager.update_context("k", {"seen": {moment}})
+
+    retrieved = await context_manager.retrieve_context("k")
+    assert [entry["at"] for entry in retrieved] == [str(moment)] * 2
+    assert retrieved[-1]["seen"] == str({moment})
+
+@pytest.mark.asyncio
+async def test_memo_is_bounded_per_manager():
+    manager = ContextManager(max_size=3, memo_size=4)
+    for key in ("a", "b", "c"):
+        for i in range(5):
+            await manager.store_context(key, {"index": i})
+        await manager.retrieve_context(key)
+    assert len(manager._memo) == 4
+
+    await manager.update_context("c", {"updated": True})
+    assert len(manager._memo) == 3
+    await manager.store_context("c", {"index": 5})  # evicts the oldest "c" entry
+    assert all(entry in manager.context[key] for (key, _), (entry, _) in manager._memo.items())
+
+    await manager.clear_context("c")
+    assert all(key != "c" for key, _ in manager._memo)
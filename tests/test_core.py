@@ -47,4 +47,21 @@ def test_semantic_search():
     documents = ["test document 1", "test document 2"]
     
     # This is an async function, but we're just testing the structure
-    assert semantic_search is not None 
\ No newline at end of file
+    assert semantic_search is not None 
+
+@pytest.mark.asyncio
+async def test_http_pool_lifecycle():
+    """Test shared HTTP session pool open/close and stats"""
+    from src.core.http import HTTPSessionPool
+
+    pool = HTTPSessionPool(limit=10, limit_per_host=2)
+    assert pool.stats()["open"] == 0
+
+    session = await pool.get_session()
+    assert await pool.get_session() is session
+    stats = pool.stats()
+    assert stats["limit"] == 10
+    assert stats["idle"] == 0 and stats["waiting"] == 0
+
+    await pool.close()
+    assert pool.closed
@@ -0,0 +1,74 @@
+import json
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from torch.utils.data import DataLoader
+from src.agents.dataset import InterviewShardDataset, format_sample, iter_texts
+from src.agents.tokenizer import CharTokenizer
+
+SAMPLES = [
+    {"question": "Apa kabar?", "answer": "Baik."},
+    {"question": "Ceritakan proyek terbesar Anda.", "answer": "Saya membangun layanan wawancara otomatis untuk tim rekrutmen."},
+    {"question": "Kenapa?", "answer": "Karena menarik."},
+    {"question": "Apa tantangan terbesar Anda?", "answer": "Mengelola komunikasi dengan tim di zona waktu berbeda."},
+    {"question": "Bahasa favorit?", "answer": "Python."}
+]
+
+@pytest.fixture
+def shards(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / f"interview_data-{i}.jsonl"
+        path.write_text("".join(json.dumps(sample) + "\n" for sample in SAMPLES[i::2]), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+@pytest.fixture
+def tokenizer(shards):
+    return CharTokenizer.from_texts(iter_texts(shards))
+
+def _rows(batches, tokenizer):
+    """(input, target) text of every row, over the positions the loss counts"""
+    for inputs, targets in batches:
+        for row_in, row_out in zip(inputs, targets):
+            counted = row_out != tokenizer.pad_id
+            yield tokenizer.decode(row_in[counted].numpy()), tokenizer.decode(row_out[counted].numpy())
+
+def _targets_by_input(batches, tokenizer):
+    return dict(_rows(batches, tokenizer))
+
+def test_windows_are_shifted_within_the_same_text(shards, tokenizer):
+    dataset = InterviewShardDataset(shards, tokenizer, window=128, batch_size=2)
+    pairs = _targets_by_input(dataset, tokenizer)
+
+    texts = [format_sample(sample) for sample in SAMPLES]
+    assert sorted(pairs) == sorted(text[:-1] for text in texts)
+    for text in texts:
+        assert pairs[text[:-1]] == text[1:]
+
+def test_long_texts_split_into_overlapping_windows(shards, tokenizer):
+    dataset = InterviewShardDataset(shards, tokenizer, window=16, batch_size=4)
+    text = format_sample(SAMPLES[1])
+    pairs = _targets_by_input(dataset, tokenizer)
+
+    pieces = [text[start:start + 17] for start in range(0, len(text) - 1, 16)]
+    for piece in pieces:
+        assert pairs[piece[:-1]] == piece[1:]
+
+def test_length_buckets_reduce_padding(shards, tokenizer):
+    dataset = InterviewShardDataset(shards, tokenizer, window=128, batch_size=2)
+    for inputs, targets in dataset:
+        assert inputs.shape == targets.shape
+        assert inputs.shape[1] <= 128
+        lengths = (targets != tokenizer.pad_id).sum(dim=1)
+        # Rows of a batch come from the same quarter-window bucket
+        assert int(lengths.max()) - int(lengths.min()) < 32
+        assert int(lengths.max()) == inputs.shape[1]
+
+@pytest.mark.parametrize("num_workers", [2, 3])
+def test_workers_read_disjoint_shares(shards, tokenizer, num_workers):
+    dataset = InterviewShardDataset(shards, tokenizer, window=128, batch_size=2, shuffle_buffer=4)
+    loader = DataLoader(dataset, batch_size=None, num_workers=num_workers)
+    rows = [row_in for row_in, _ in _rows(loader, tokenizer)]
+    assert sorted(rows) == sorted(format_sample(sample)[:-1] for sample in SAMPLES)
@@ -0,0 +1,86 @@
+import pytest
+import numpy as np
+from src.core.cache import EmbeddingCache, embedding_cache_key
+from src.core.embedding_store import EmbeddingStore
+from src.core.errors import AGNOError
+from src.core.search import SemanticSearch
+
+def _key(text):
+    return embedding_cache_key("p", "m", text)
+
+def test_store_roundtrip_and_reopen(tmp_path):
+    store = EmbeddingStore(tmp_path / "store")
+    assert store.put(_key("a"), [1.0, 2.0, 3.0])
+    assert not store.put(_key("a"), [9.0, 9.0, 9.0])
+    assert store.put(_key("b"), np.array([4.0, 5.0, 6.0]))
+
+    view = store.get(_key("b"))
+    assert isinstance(view, np.memmap) and view.dtype == np.float32
+    np.testing.assert_array_equal(view, [4.0, 5.0, 6.0])
+    assert store.get(_key("missing")) is None
+    store.close()
+
+    reopened = EmbeddingStore(tmp_path / "store", readonly=True)
+    assert len(reopened) == 2
+    np.testing.assert_array_equal(reopened.get(_key("a")), [1.0, 2.0, 3.0])
+
+def test_reader_sees_rows_appended_by_owner(tmp_path):
+    owner = EmbeddingStore(tmp_path / "store")
+    owner.put(_key("a"), [1.0, 0.0])
+    reader = EmbeddingStore(tmp_path / "store", readonly=True)
+    assert not reader.put(_key("x"), [0.0, 0.0])
+
+    owner.put(_key("b"), [0.0, 1.0])
+    np.testing.assert_array_equal(reader.get(_key("b")), [0.0, 1.0])
+    assert len(reader) == 2
+
+def test_meta_is_replaced_atomically(tmp_path):
+    store = EmbeddingStore(tmp_path / "store")
+    store.put(_key("a"), [1.0, 2.0])
+
+    assert sorted(p.name for p in (tmp_path / "store").glob("meta*")) == ["meta.json"]
+    assert EmbeddingStore(tmp_path / "store", readonly=True).dim == 2
+
+def test_second_writer_opens_read_only(tmp_path):
+    owner = EmbeddingStore(tmp_path / "store")
+    other = EmbeddingStore(tmp_path / "store")
+    assert not owner.readonly
+    assert other.readonly
+
+def test_dimension_mismatch(tmp_path):
+    store = EmbeddingStore(tmp_path / "store")
+    store.put(_key("a"), [1.0, 2.0])
+    with pytest.raises(AGNOError):
+        store.put(_key("b"), [1.0, 2.0, 3.0])
+
+def test_writer_truncates_rows_left_without_a_key(tmp_path):
+    store = EmbeddingStore(tmp_path / "store")
+    store.put(_key("a"), [1.0, 1.0])
+    store.close()
+    # Crash between the vector write and the key write, plus a torn key
+    with open(tmp_path / "store" / "vectors.f32", "ab") as f:
+        f.write(np.array([9.0, 9.0], dtype=np.float32).tobytes())
+    with open(tmp_path / "store" / "keys.bin", "ab") as f:
+        f.write(b"torn")
+
+    reopened = EmbeddingStore(tmp_path / "store")
+    assert (tmp_path / "store" / "vectors.f32").stat().st_size == 2 * 4
+    assert (tmp_path / "store" / "keys.bin").stat().st_size == 16
+    reopened.put(_key("b"), [2.0, 2.0])
+    np.testing.assert_array_equal(reopened.get(_key("a")), [1.0, 1.0])
+    np.testing.assert_array_equal(reopened.get(_key("b")), [2.0, 2.0])
+
+@pytest.mark.asyncio
+async def test_search_falls_through_to_store(tmp_path, embedding_provider):
+    provider = embedding_provider
+    store = EmbeddingStore(tmp_path / "store")
+    first = SemanticSearch(provider=provider, store=store)
+    expected = await first.get_embedding("persisted text")
+    store.close()
+
+    provider.batch_calls.clear()
+    restarted = SemanticSearch(provider=provider, cache=EmbeddingCache(), store=EmbeddingStore(tmp_path / "store"))
+    embedding = await restarted.get_embedding("persisted text")
+
+    assert provider.batch_calls == []
+    np.testing.assert_allclose(embedding, expected)
@@ -0,0 +1,66 @@
+import json
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.agents.export import MANIFEST_FILE, export, load_decoder, next_char_agreement
+from src.agents.model4 import InterviewTransformer
+from src.agents.tokenizer import CharTokenizer
+
+TEXTS = ["Q: Apa kabar? A: Baik, terima kasih.", "Q: Ceritakan proyek Anda. A: Saya membangun API."]
+
+@pytest.fixture
+def model_dir(tmp_path):
+    with open("src/models/vocab.json", "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    (tmp_path / "vocab.json").write_text(json.dumps(vocab), encoding="utf-8")
+    torch.manual_seed(0)
+    torch.save(InterviewTransformer(len(vocab["char_to_idx"])).state_dict(), tmp_path / "interviewer_transformer.pth")
+    return tmp_path
+
+def test_export_writes_artifacts_and_manifest(model_dir):
+    variants = export(model_dir, texts=TEXTS)
+
+    assert set(variants) == {"fp32", "fp32_script", "int8_script"}
+    assert variants["fp32_script"]["agreement"] == pytest.approx(1.0)
+    assert variants["int8_script"]["agreement"] > 0.9
+    for info in variants.values():
+        assert (model_dir / info["file"]).exists()
+    assert json.loads((model_dir / MANIFEST_FILE).read_text())["variants"] == variants
+
+def test_load_decoder_picks_fastest_agreeing_variant(model_dir):
+    assert load_decoder(model_dir)[0] == "fp32"  # nothing exported yet
+
+    export(model_dir, texts=TEXTS)
+    manifest = json.loads((model_dir / MANIFEST_FILE).read_text())
+    manifest["variants"]["int8_script"].update(ms_per_token=0.1, agreement=0.5)
+    manifest["variants"]["fp32_script"].update(ms_per_token=0.2, agreement=1.0)
+    manifest["variants"]["fp32"]["ms_per_token"] = 0.3
+    (model_dir / MANIFEST_FILE).write_text(json.dumps(manifest))
+
+    name, decoder = load_decoder(model_dir, min_agreement=0.9)
+    assert name == "fp32_script"
+    logits, cache = decoder.decode(torch.tensor([[5, 6, 7]]))
+    assert logits.shape[:2] == (1, 3) and len(cache) == 3
+
+def test_load_decoder_ignores_stale_exports(model_dir):
+    export(model_dir, texts=TEXTS)
+    assert load_decoder(model_dir, min_agreement=0.0)[0] != "fp32"
+
+    # Retrained weights: the exported variants no longer match them
+    torch.manual_seed(1)
+    vocab_size = CharTokenizer.load(model_dir / "vocab.json").vocab_size
+    torch.save(InterviewTransformer(vocab_size).state_dict(), model_dir / "interviewer_transformer.pth")
+    assert load_decoder(model_dir, min_agreement=0.0)[0] == "fp32"
+
+    export(model_dir, texts=TEXTS)
+    manifest = json.loads((model_dir / MANIFEST_FILE).read_text())
+    manifest["vocab_size"] += 1
+    (model_dir / MANIFEST_FILE).write_text(json.dumps(manifest))
+    assert load_decoder(model_dir, min_agreement=0.0)[0] == "fp32"
+
+def test_next_char_agreement_of_identical_models():
+    tokenizer = CharTokenizer.from_texts(TEXTS)
+    torch.manual_seed(0)
+    model = InterviewTransformer(tokenizer.vocab_size).eval()
+    assert next_char_agreement(model, model.decoder(), TEXTS, tokenizer) == 1.0
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.agents.model4 import InterviewTransformer
+from src.core.inference import InferenceScheduler
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return InterviewTransformer(33).eval()
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        yield pool
+
+@pytest.mark.asyncio
+async def test_batched_results_match_single_generation(model, executor):
+    scheduler = InferenceScheduler(model, executor, max_batch_size=4, max_wait_ms=20)
+    prompts = [[5, 6, 7], [9] * 11, [3, 4], [8, 1, 2, 3, 4, 5], [7, 7]]
+    lengths = [6, 12, 3, 9, 5]
+
+    results = await asyncio.gather(*(scheduler.submit(p, n) for p, n in zip(prompts, lengths)))
+
+    for prompt, length, result in zip(prompts, lengths, results):
+        assert result == model.generate(prompt, length)
+    stats = scheduler.stats()
+    assert stats["completed"] == 5
+    assert 1 < stats["avg_batch_size"] <= 4
+    assert stats["running"] == stats["queued"] == 0
+
+@pytest.mark.asyncio
+async def test_late_request_joins_running_batch(model, executor):
+    scheduler = InferenceScheduler(model, executor, max_batch_size=4, max_wait_ms=1)
+    long_call = asyncio.ensure_future(scheduler.submit([5, 6, 7], 40))
+    while scheduler.steps < 3:
+        await asyncio.sleep(0.001)
+    short = await scheduler.submit([1, 2], 3)
+
+    assert short == model.generate([1, 2], 3)
+    assert not long_call.done()  # the short request left while the long one kept decoding
+    assert await long_call == model.generate([5, 6, 7], 40)
+
+@pytest.mark.asyncio
+async def test_stop_ids_and_cancellation(model, executor):
+    scheduler = InferenceScheduler(model, executor, max_batch_size=2, max_wait_ms=1)
+    first = model.generate([5, 6, 7], 1)[0]
+    assert await scheduler.submit([5, 6, 7], 10, stop_ids=(first,)) == []
+
+    call = asyncio.ensure_future(scheduler.submit([5, 6, 7], 500))
+    await asyncio.sleep(0.01)
+    call.cancel()
+    assert await scheduler.submit([1, 2], 2) == model.generate([1, 2], 2)
+    assert scheduler.stats()["running"] == 0
@@ -0,0 +1,40 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.agents.model4 import InterviewTransformer
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return InterviewTransformer(33).eval()
+
+def test_decode_matches_causal_forward(model):
+    x = torch.randint(1, 33, (2, 20))
+    with torch.no_grad():
+        full = model(x, causal=True)
+        logits, cache = model.decode(x[:, :12])
+        steps = [logits]
+        for t in range(12, 20):
+            logits, cache = model.decode(x[:, t:t + 1], cache)
+            steps.append(logits)
+    assert torch.allclose(torch.cat(steps, dim=1), full, atol=1e-5)
+    assert cache[0][0].shape == (2, model.num_heads, 20, 32)
+
+def test_decode_ignores_left_padding(model):
+    x = torch.randint(1, 33, (1, 10))
+    padded = torch.cat([torch.zeros(1, 4, dtype=torch.long), x], dim=1)
+    with torch.no_grad():
+        expected = model(x, causal=True)
+        logits, cache = model.decode(padded[:, :8], key_padding_mask=padded[:, :8] == 0)
+        last, _ = model.decode(padded[:, 8:], cache, key_padding_mask=padded == 0)
+    assert torch.allclose(torch.cat([logits, last], dim=1)[:, 4:], expected, atol=1e-5)
+
+def test_generate_matches_full_recompute(model):
+    ids = [5, 6, 7, 8]
+    expected = list(ids)
+    with torch.no_grad():
+        for _ in range(12):
+            expected.append(int(model(torch.tensor([expected]), causal=True)[0, -1].argmax()))
+    assert model.generate(ids, 12) == expected[len(ids):]
+    assert len(model.generate(ids, 12, window=6)) == 12
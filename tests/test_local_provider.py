@@ -0,0 +1,46 @@
+import asyncio
+import json
+import pytest
+from src.core.errors import AGNOError
+from src.core.local_provider import LocalTransformerProvider
+
+torch = pytest.importorskip("torch")
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Untrained weights with the shipped vocabulary"""
+    from src.agents.model4 import InterviewTransformer
+
+    with open("src/models/vocab.json", "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    (tmp_path / "vocab.json").write_text(json.dumps(vocab), encoding="utf-8")
+    torch.manual_seed(0)
+    torch.save(InterviewTransformer(len(vocab["char_to_idx"])).state_dict(), tmp_path / "interviewer_transformer.pth")
+    return tmp_path
+
+def test_missing_weights(tmp_path):
+    with pytest.raises(AGNOError):
+        LocalTransformerProvider(model_dir=tmp_path)
+
+@pytest.mark.asyncio
+async def test_generate_batches_off_event_loop(model_dir):
+    provider = LocalTransformerProvider(model_dir=model_dir, max_new_chars=8)
+
+    first, second = await asyncio.gather(provider.generate("Halo"), provider.generate("Halo"))
+    assert isinstance(first, str) and len(first) <= 8
+    assert first == second  # greedy decoding is deterministic
+    net = provider._net
+    await provider.generate("Apa kabar?", max_tokens=4)
+    assert provider._net is net  # loaded once
+
+    stats = provider._scheduler.stats()
+    assert stats["completed"] == 3
+    assert stats["avg_batch_size"] > 1  # the concurrent pair shared decoding steps
+    provider.close()
+
+@pytest.mark.asyncio
+async def test_embeddings_unsupported(model_dir):
+    provider = LocalTransformerProvider(model_dir=model_dir)
+    with pytest.raises(AGNOError):
+        await provider.get_embeddings("halo")
+    provider.close()
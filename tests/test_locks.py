@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from src.core.locks import KeyedLock, StripedLock
+
+@pytest.mark.asyncio
+async def test_same_key_shares_a_lock():
+    locks = StripedLock(stripes=8)
+    assert locks("session-a") is locks("session-a")
+    assert len({id(locks(f"session-{i}")) for i in range(100)}) == 8
+
+@pytest.mark.asyncio
+async def test_striped_lock_serializes_a_key():
+    locks = StripedLock(stripes=4)
+    active = 0
+    overlaps = 0
+
+    async def critical():
+        nonlocal active, overlaps
+        async with locks("s1"):
+            active += 1
+            overlaps += active > 1
+            await asyncio.sleep(0)
+            active -= 1
+
+    await asyncio.gather(*(critical() for _ in range(50)))
+    assert overlaps == 0
+
+def test_pool_is_rebuilt_per_event_loop():
+    locks = StripedLock(stripes=2)
+
+    async def hold():
+        async with locks("s1"):
+            await asyncio.gather(*(asyncio.sleep(0) for _ in range(2)))
+        return locks("s1")
+
+    first = asyncio.run(hold())
+    second = asyncio.run(hold())
+    assert first is not second
+
+def test_stripes_must_be_positive():
+    with pytest.raises(ValueError):
+        StripedLock(stripes=0)
+
+@pytest.mark.asyncio
+async def test_keyed_lock_serializes_a_key_only():
+    locks = KeyedLock()
+    order = []
+
+    async def hold(key, tag):
+        async with locks(key):
+            order.append(f"{tag} in")
+            await asyncio.sleep(0.01)
+            order.append(f"{tag} out")
+
+    await asyncio.gather(hold("a", "a1"), hold("a", "a2"), hold("b", "b1"))
+
+    assert order.index("a1 out") < order.index("a2 in")
+    assert order.index("b1 in") < order.index("a1 out")  # other keys never wait
+    assert len(locks) == 0
+
+@pytest.mark.asyncio
+async def test_keyed_lock_entry_released_on_error():
+    locks = KeyedLock()
+    with pytest.raises(RuntimeError):
+        async with locks("a"):
+            raise RuntimeError("boom")
+    assert len(locks) == 0
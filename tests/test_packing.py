@@ -0,0 +1,67 @@
+from src.core.packing import ContextPacker
+from src.core import tokens
+from src.core.tokens import count_tokens, estimate_tokens
+
+def _turns(n):
+    return [
+        {
+            "input": {"message": f"Pertanyaan {i}. Detail tambahan."},
+            "response": f"Jawaban nomor {i} tentang proyek. " + "kata " * 40,
+            "timestamp": f"2024-01-01T00:00:{i:02d}"
+        }
+        for i in range(n)
+    ]
+
+def test_short_history_is_kept_verbatim():
+    packer = ContextPacker(token_budget=2000, summary_budget=200)
+    packed = packer.pack("s1", _turns(2))
+    assert "Ringkasan" not in packed
+    assert "Pertanyaan 0" in packed and "Pertanyaan 1" in packed
+
+def test_long_history_fits_budget_and_is_summarized():
+    packer = ContextPacker(token_budget=400, summary_budget=100)
+    turns = _turns(30)
+    packed = packer.pack("s1", turns, reserved_tokens=50)
+
+    assert count_tokens(packed) <= 400 - 50 + 10
+    assert "Ringkasan percakapan sebelumnya" in packed
+    assert "Jawaban nomor 29" in packed  # most recent turn always included
+
+def test_summary_is_extended_incrementally():
+    packer = ContextPacker(token_budget=400, summary_budget=150)
+    turns = _turns(20)
+    packer.pack("s1", turns)
+    marker, lines = packer._summaries["s1"]
+
+    packer.pack("s1", turns + _turns(21)[20:])
+    new_marker, new_lines = packer._summaries["s1"]
+    assert new_marker != marker
+    assert new_lines[-1].startswith("- Pertanyaan")
+
+    packer.forget("s1")
+    assert "s1" not in packer._summaries
+
+def test_empty_history():
+    assert ContextPacker().pack("s1", []) == ""
+
+def test_tokenizer_download_failure_falls_back_to_estimate(monkeypatch):
+    calls = []
+
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            raise KeyError(model)
+
+        @staticmethod
+        def get_encoding(name):
+            calls.append(name)
+            raise ConnectionError("offline")
+
+    monkeypatch.setattr(tokens, "tiktoken", OfflineTiktoken)
+    tokens._get_encoding.cache_clear()
+    try:
+        assert count_tokens("halo dunia", model="llama-3.1-8b-instant") == estimate_tokens("halo dunia")
+        assert count_tokens("lagi", model="llama-3.1-8b-instant") == estimate_tokens("lagi")
+        assert calls == ["cl100k_base"]
+    finally:
+        tokens._get_encoding.cache_clear()
@@ -0,0 +1,166 @@
+import asyncio
+import time
+import pytest
+from src.core.errors import OverloadedError, RateLimitError, UpstreamError
+from src.core.providers import LLMProvider
+from src.core.ratelimit import AIMDLimiter, RateLimitedProvider, TokenBucket, parse_reset_duration
+
+class _Response:
+    def __init__(self, status, headers=None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.reason = "Error"
+        self._body = body or {}
+
+    async def json(self, content_type=None):
+        return self._body
+
+class _FlakyProvider(LLMProvider):
+    name = "flaky"
+    max_tokens = 10
+
+    def __init__(self, failures=0, headers=None):
+        self.failures = failures
+        self.headers = headers or {}
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.001)
+            if self.failures:
+                self.failures -= 1
+                await self._check_response(_Response(429, {"retry-after": "0.01"}), "Flaky")
+            self._notify_headers(self.headers)
+            return f"jawaban: {prompt}"
+        finally:
+            self.active -= 1
+
+    async def get_embeddings(self, text):
+        return [0.0]
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("1.5s") == 1.5
+    assert parse_reset_duration("250ms") == 0.25
+    assert parse_reset_duration("2") == 2
+    assert parse_reset_duration(None) is None
+
+def test_token_bucket_reservations(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    now[0] += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+    bucket.adapt(limit=120, remaining=0, reset=5)
+    assert bucket.reserve(1) == pytest.approx(5.5)
+
+@pytest.mark.asyncio
+async def test_check_response_raises_typed_errors():
+    provider = _FlakyProvider()
+    seen = []
+    provider.add_header_listener(seen.append)
+
+    with pytest.raises(RateLimitError) as rate_limited:
+        await provider._check_response(_Response(429, {"Retry-After": "3"}), "Flaky")
+    assert rate_limited.value.retry_after == 3.0
+    assert rate_limited.value.retryable
+
+    with pytest.raises(UpstreamError) as bad_request:
+        await provider._check_response(_Response(400, body={"error": {"message": "bad"}}), "Flaky")
+    assert bad_request.value.upstream_status == 400
+    assert not bad_request.value.retryable
+    assert "bad" in bad_request.value.message
+    assert len(seen) == 2
+
+@pytest.mark.asyncio
+async def test_aimd_limiter_queues_and_sheds():
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=4, max_queue=1)
+    await limiter.acquire(1)
+    await limiter.acquire(1)
+
+    queued = asyncio.ensure_future(limiter.acquire(1))
+    await asyncio.sleep(0)
+    with pytest.raises(OverloadedError):
+        await limiter.acquire(1)  # queue full
+
+    limiter.release(success=True)
+    await queued
+    assert limiter.in_flight == 2
+
+    with pytest.raises(OverloadedError):
+        await limiter.acquire(0.01)  # deadline expires in the queue
+    assert limiter.stats()["shed"] == 2
+
+    limiter.release(success=False)
+    assert limiter.limit < 2
+
+@pytest.mark.asyncio
+async def test_rate_limited_provider_requeues_429_and_adapts():
+    inner = _FlakyProvider(failures=2, headers={"x-ratelimit-limit-requests": "120", "x-ratelimit-remaining-requests": "100"})
+    provider = RateLimitedProvider(inner, requests_per_minute=6000, tokens_per_minute=10**6, queue_timeout=1)
+
+    assert await provider.generate("halo") == "jawaban: halo"
+    assert inner.calls == 3
+    assert provider.rate_limited == 2
+    assert provider.requests.capacity == 120
+    assert provider.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_daily_request_limit_header_keeps_per_minute_capacity():
+    headers = {
+        "x-ratelimit-limit-requests": "14400",
+        "x-ratelimit-remaining-requests": "14000",
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-tokens": "5000"
+    }
+    inner = _FlakyProvider(headers=headers)
+    inner.name = "groq"
+    provider = RateLimitedProvider(inner, requests_per_minute=30, tokens_per_minute=10**6)
+    assert provider.requests_header_window == 86400
+
+    await provider.generate("halo")
+    assert provider.requests.capacity == 30  # not the daily quota
+    assert provider.tokens.capacity == 6000  # tokens are still per minute
+
+    inner.headers = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2m"}
+    await provider.generate("lagi")
+    assert provider.requests.reserve(1) > 60  # an exhausted daily budget still drains the bucket
+
+@pytest.mark.asyncio
+async def test_rate_limited_provider_bounds_concurrency():
+    inner = _FlakyProvider()
+    limiter = AIMDLimiter(initial=3, max_limit=3, max_queue=100)
+    provider = RateLimitedProvider(inner, requests_per_minute=10**6, tokens_per_minute=10**9, limiter=limiter)
+
+    results = await asyncio.gather(*(provider.generate(f"p{i}") for i in range(20)))
+    assert len(results) == 20
+    assert inner.peak <= 3
+
+@pytest.mark.asyncio
+async def test_rate_limited_provider_sheds_when_budget_exhausted():
+    provider = RateLimitedProvider(_FlakyProvider(), requests_per_minute=1, tokens_per_minute=10**6, queue_timeout=0.5)
+    await provider.generate("satu")
+    with pytest.raises(OverloadedError):
+        await provider.generate("dua")
+
+@pytest.mark.asyncio
+async def test_shed_call_refunds_its_reservation():
+    limiter = AIMDLimiter(initial=1, max_limit=1, max_queue=0)
+    provider = RateLimitedProvider(_FlakyProvider(), requests_per_minute=60, tokens_per_minute=1000, limiter=limiter)
+    await limiter.acquire(1)  # the only slot is busy and nothing may queue
+    requests_before, tokens_before = provider.requests.available, provider.tokens.available
+
+    with pytest.raises(OverloadedError):
+        await provider.generate("halo")
+
+    assert provider.requests.available == pytest.approx(requests_before, abs=0.01)
+    assert provider.tokens.available == pytest.approx(tokens_before, abs=0.1)
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from src.core.errors import DeadlineExceededError, UpstreamError
+from src.core.config import settings
+from src.core.resilience import LatencyTracker, RetryingProvider, deadline_scope, remaining_time
+from src.main import _request_timeout
+
+class _ScriptedProvider:
+    """Provider whose successive calls sleep and fail as scripted"""
+
+    name = "scripted"
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        delay, error = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return f"jawaban {self.calls}"
+
+def _provider(inner, **kwargs):
+    options = dict(max_attempts=3, attempt_timeout=1.0, base_delay=0.001, max_delay=0.01, hedge=False)
+    options.update(kwargs)
+    return RetryingProvider(inner, **options)
+
+def test_deadline_scope_never_extends():
+    assert remaining_time() is None
+    with deadline_scope(1.0):
+        with deadline_scope(10.0):
+            assert remaining_time() <= 1.0
+        with deadline_scope(0.5):
+            assert remaining_time() <= 0.5
+    assert remaining_time() is None
+
+def test_latency_quantile():
+    tracker = LatencyTracker(window=100)
+    for i in range(100):
+        tracker.record(i / 100)
+    assert tracker.quantile(0.95) == pytest.approx(0.95)
+
+@pytest.mark.asyncio
+async def test_retries_retryable_errors():
+    inner = _ScriptedProvider([(0, UpstreamError("503", upstream_status=503)), (0, None)])
+    provider = _provider(inner)
+    assert await provider.generate("halo") == "jawaban 2"
+    assert provider.stats()["retries"] == 1
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors():
+    inner = _ScriptedProvider([(0, UpstreamError("400", upstream_status=400))])
+    with pytest.raises(UpstreamError):
+        await _provider(inner).generate("halo")
+    assert inner.calls == 1
+
+@pytest.mark.asyncio
+async def test_attempt_timeout_is_retried():
+    inner = _ScriptedProvider([(0.2, None), (0, None)])
+    provider = _provider(inner, attempt_timeout=0.05)
+    assert await provider.generate("halo") == "jawaban 2"
+    assert provider.stats()["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_request_deadline_bounds_the_call():
+    inner = _ScriptedProvider([(1.0, None)])
+    with deadline_scope(0.05):
+        with pytest.raises(DeadlineExceededError):
+            await _provider(inner).generate("halo")
+
+@pytest.mark.parametrize("header", [None, "", "abc", "0", "-5", "nan", "inf", "-inf", "600"])
+def test_request_timeout_header_falls_back_to_default(header):
+    assert _request_timeout(header) == settings.REQUEST_TIMEOUT_SECONDS
+
+def test_request_timeout_header_lowers_the_deadline():
+    assert _request_timeout("2.5") == 2.5
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_p95_and_wins():
+    inner = _ScriptedProvider([(0.3, None), (0.01, None)])
+    provider = _provider(inner, hedge=True, hedge_min_samples=5, hedge_grace=0.5)
+    for _ in range(5):
+        provider.latency.record(0.02)
+
+    assert await provider.generate("halo") == "jawaban 2"
+    await asyncio.gather(*provider._background)
+
+    stats = provider.stats()
+    assert stats["hedges_fired"] == 1
+    assert stats["hedges_won"] == 1
+    assert 0.2 < stats["tail_latency_removed_seconds"] < 0.35
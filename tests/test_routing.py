@@ -0,0 +1,162 @@
+import time
+import pytest
+from src.core.errors import OverloadedError, UpstreamError
+from src.core.providers import LLMProvider, ProviderFactory
+from src.core.routing import BackendStats, CircuitBreaker, RoutingProvider
+
+class _Backend(LLMProvider):
+    def __init__(self, name, fail=False, overloaded=False):
+        self.name = name
+        self.model = f"{name}-model"
+        self.embedding_model = f"{name}-embedding"
+        self.fail = fail
+        self.overloaded = overloaded
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if self.overloaded:
+            raise OverloadedError()
+        if self.fail:
+            raise UpstreamError(f"{self.name} down", upstream_status=503)
+        return f"{self.name}: {prompt}"
+
+    async def get_embeddings(self, text):
+        return [1.0]
+
+def test_circuit_breaker_half_open_probe(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()          # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.trips == 2  # the failed probe re-opened it
+
+def test_backend_stats_score_penalizes_errors():
+    fast_flaky, slow_ok = BackendStats(alpha=0.5), BackendStats(alpha=0.5)
+    fast_flaky.record(0.1, ok=True)
+    fast_flaky.record(0.0, ok=False)
+    fast_flaky.record(0.0, ok=False)
+    slow_ok.record(0.2, ok=True)
+    assert slow_ok.score() < fast_flaky.score()
+    assert slow_ok.to_dict()["latency_histogram"]["le_0.25"] == 1
+
+@pytest.mark.asyncio
+async def test_router_fails_over_and_trips_breaker():
+    down, up = _Backend("down", fail=True), _Backend("up")
+    router = RoutingProvider({"down": down, "up": up})
+    for breaker in router.breakers.values():
+        breaker.failure_threshold = 2
+
+    assert await router.generate("halo") in ("down: halo", "up: halo")
+    for _ in range(5):
+        assert await router.generate("halo") == "up: halo"
+
+    stats = router.stats()
+    assert stats["backends"]["down"]["state"] == CircuitBreaker.OPEN
+    assert down.calls <= 2
+    assert stats["failovers"] >= 1
+    assert router.model == "up-model"
+
+@pytest.mark.asyncio
+async def test_router_local_shedding_leaves_backend_health_alone():
+    busy, other = _Backend("busy", overloaded=True), _Backend("other")
+    router = RoutingProvider({"busy": busy, "other": other})
+    router.backend_stats["busy"].record(0.1, ok=True)
+    router.backend_stats["other"].record(1.0, ok=True)
+    router.breakers["busy"].failure_threshold = 1
+    before = router.backend_stats["busy"].to_dict()
+
+    for _ in range(3):
+        assert await router.generate("halo") == "other: halo"
+
+    assert busy.calls == 3
+    assert router.breakers["busy"].state == CircuitBreaker.CLOSED
+    assert router.backend_stats["busy"].to_dict() == before
+
+    other.overloaded = True
+    with pytest.raises(OverloadedError):
+        await router.generate("halo")
+
+@pytest.mark.asyncio
+async def test_router_caller_errors_neither_trip_breakers_nor_fail_over():
+    first, second = _Backend("first"), _Backend("second")
+    router = RoutingProvider({"first": first, "second": second})
+    for breaker in router.breakers.values():
+        breaker.failure_threshold = 1
+
+    async def too_long(prompt, **kwargs):
+        first.calls += 1
+        raise UpstreamError("context length exceeded", upstream_status=400)
+    first.generate = too_long
+    router.backend_stats["first"].record(0.1, ok=True)
+    router.backend_stats["second"].record(1.0, ok=True)
+
+    for _ in range(5):
+        with pytest.raises(UpstreamError) as info:
+            await router.generate("x" * 10000)
+        assert info.value.upstream_status == 400
+
+    assert first.calls == 5 and second.calls == 0
+    assert all(breaker.state == CircuitBreaker.CLOSED for breaker in router.breakers.values())
+    assert router.backend_stats["first"].to_dict()["errors"] == 0
+    assert router.stats()["failovers"] == 0
+
+    del first.generate
+    assert await router.generate("halo") == "first: halo"
+
+@pytest.mark.asyncio
+async def test_router_prefers_faster_backend():
+    slow, fast = _Backend("slow"), _Backend("fast")
+    router = RoutingProvider({"slow": slow, "fast": fast})
+    router.backend_stats["slow"].record(2.0, ok=True)
+    router.backend_stats["fast"].record(0.2, ok=True)
+
+    assert await router.generate("halo") == "fast: halo"
+    assert router.stats()["backends"]["fast"]["routed"] == 1
+    assert router.embedding_model == "slow-embedding"
+
+@pytest.mark.asyncio
+async def test_router_rejects_when_all_circuits_open():
+    router = RoutingProvider({"down": _Backend("down", fail=True)})
+    router.breakers["down"].failure_threshold = 1
+    with pytest.raises(UpstreamError):
+        await router.generate("halo")
+    with pytest.raises(OverloadedError):
+        await router.generate("halo")
+
+@pytest.mark.asyncio
+async def test_router_uses_fallback_only_after_primaries():
+    primary, local = _Backend("primary"), _Backend("local")
+    router = RoutingProvider({"primary": primary}, fallbacks={"local": local})
+    # A never-measured fallback would otherwise score best
+    router.backend_stats["primary"].record(5.0, ok=True)
+    assert await router.generate("halo") == "primary: halo"
+
+    primary.fail = True
+    assert await router.generate("halo") == "local: halo"
+    assert router.stats()["backends"]["local"]["fallback"] is True
+    assert router.embedding_backend == "primary"
+
+def test_factory_register():
+    ProviderFactory.register("custom", lambda: _Backend("custom"), wrap=False)
+    try:
+        assert ProviderFactory.get_provider("custom").name == "custom"
+    finally:
+        ProviderFactory._registry.pop("custom")
+        ProviderFactory._providers.pop("custom", None)
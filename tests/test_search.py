@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+import numpy as np
+from src.core.search import SemanticSearch, EmbeddingIndex, SemanticResponseCache
+from src.core.errors import UpstreamError
+
+@pytest.fixture
+def search(embedding_provider):
+    return SemanticSearch(provider=embedding_provider)
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced(search, embedding_provider):
+    texts = ["satu", "dua", "tiga", "dua"]
+    embeddings = await asyncio.gather(*(search.get_embedding(text) for text in texts))
+
+    assert len(embedding_provider.batch_calls) == 1
+    assert sorted(embedding_provider.batch_calls[0]) == ["dua", "satu", "tiga"]
+    np.testing.assert_allclose(embeddings[1], embeddings[3])
+
+@pytest.mark.asyncio
+async def test_short_batch_fails_every_waiter(search, embedding_provider):
+    async def short_batch(texts):
+        return [embedding_provider._embed(texts[0])]
+    embedding_provider.get_embeddings_batch = short_batch
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(search.get_embedding(text) for text in ["satu", "dua"]), return_exceptions=True),
+        timeout=1.0
+    )
+
+    assert all(isinstance(result, UpstreamError) for result in results)
+    assert not search.batcher._tasks
+
+@pytest.mark.asyncio
+async def test_short_batch_fails_bulk_lookup(search, embedding_provider):
+    async def short_batch(texts):
+        return [embedding_provider._embed(text) for text in texts[:-1]]
+    embedding_provider.get_embeddings_batch = short_batch
+
+    with pytest.raises(UpstreamError):
+        await search.get_embeddings(["satu", "dua", "tiga"])
+
+@pytest.mark.asyncio
+async def test_batch_skips_cached_and_duplicate_texts(search, embedding_provider):
+    await search.get_embedding("cached")
+    embedding_provider.batch_calls.clear()
+
+    embeddings = await search.get_embeddings(["cached", "baru", "baru", "lain"])
+
+    assert embedding_provider.batch_calls == [["baru", "lain"]]
+    assert len(embeddings) == 4
+
+@pytest.mark.asyncio
+async def test_similarity_search_single_upstream_call(search, embedding_provider):
+    documents = [f"dokumen {i}" for i in range(50)]
+    results = await search.similarity_search(documents[7], documents, top_k=3)
+
+    assert len(embedding_provider.batch_calls) == 1
+    assert results[0]["document"] == documents[7]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert len(results) == 3
+
+def test_embedding_index_matches_bruteforce():
+    rng = np.random.default_rng(0)
+    documents = [f"doc {i}" for i in range(200)]
+    embeddings = rng.standard_normal((200, 16))
+    queries = rng.standard_normal((5, 16))
+    index = EmbeddingIndex(documents, list(embeddings))
+
+    assert index.matrix.dtype == np.float32 and index.matrix.flags["C_CONTIGUOUS"]
+
+    for query, results in zip(queries, index.search_batch(queries, top_k=10)):
+        expected = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+        expected_order = np.argsort(-expected)[:10]
+        assert [r["document"] for r in results] == [documents[i] for i in expected_order]
+        np.testing.assert_allclose([r["similarity"] for r in results], expected[expected_order], rtol=1e-5)
+
+def test_embedding_index_edge_cases():
+    empty = EmbeddingIndex([], [])
+    assert empty.search(np.ones(4), top_k=3) == []
+
+    index = EmbeddingIndex(["a", "b"], [np.array([1.0, 0.0]), np.zeros(2)])
+    results = index.search(np.array([1.0, 0.0]), top_k=5)
+    assert [r["document"] for r in results] == ["a", "b"]
+    assert results[1]["similarity"] == 0.0
+
+@pytest.mark.asyncio
+async def test_batch_similarity_search(search, embedding_provider):
+    documents = [f"dokumen {i}" for i in range(20)]
+    results = await search.batch_similarity_search(documents[:3], documents, top_k=2)
+
+    assert len(embedding_provider.batch_calls) == 1
+    assert [r[0]["document"] for r in results] == documents[:3]
+
+
+def _bag_of_words(text: str) -> list:
+    vector = np.zeros(64)
+    for word in text.lower().split():
+        vector[sum(map(ord, word)) % 64] += 1
+    return vector.tolist()
+
+@pytest.mark.asyncio
+async def test_semantic_cache_reuses_similar_prompts(search, embedding_provider):
+    embedding_provider._embed = _bag_of_words
+    cache = SemanticResponseCache(search, threshold=0.85, max_entries=4)
+
+    assert await cache.lookup("Ceritakan pengalaman kerja Anda", "question") is None
+    await cache.store("Ceritakan pengalaman kerja Anda", "question", "jawaban")
+
+    assert await cache.lookup("Tolong ceritakan pengalaman kerja Anda", "question") == "jawaban"
+    assert await cache.lookup("Tolong ceritakan pengalaman kerja Anda", "greeting") is None
+    assert await cache.lookup("Apa hobi favorit Anda di akhir pekan", "question") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["entries"] == {"question": 1}
+    assert sum(stats["similarity_histogram"].values()) == 2
+
+@pytest.mark.asyncio
+async def test_semantic_cache_is_bounded(search):
+    cache = SemanticResponseCache(search, threshold=0.999, max_entries=3)
+    for i in range(5):
+        await cache.store(f"prompt {i}", "question", f"jawaban {i}")
+
+    assert cache.stats()["entries"] == {"question": 3}
+    assert await cache.lookup("prompt 0", "question") is None
+    assert await cache.lookup("prompt 4", "question") == "jawaban 4"
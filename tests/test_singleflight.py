@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from src.core.singleflight import SingleFlight, SingleFlightProvider
+
+class _SlowProvider:
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return f"jawaban: {prompt}"
+
+    async def get_embeddings(self, text):
+        self.calls += 1
+        await self.release.wait()
+        return [1.0, 2.0]
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    inner = _SlowProvider()
+    flight = SingleFlight()
+    provider = SingleFlightProvider(inner, flight)
+
+    tasks = [asyncio.ensure_future(provider.generate("halo", system_message="s")) for _ in range(10)]
+    tasks.append(asyncio.ensure_future(provider.generate("lain")))
+    tasks.append(asyncio.ensure_future(provider.get_embeddings("halo")))
+    await asyncio.sleep(0)
+    inner.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results[:10] == ["jawaban: halo"] * 10
+    assert inner.calls == 3
+    assert flight.stats() == {"calls": 3, "coalesced": 9, "in_flight": 0}
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    inner = _SlowProvider()
+    provider = SingleFlightProvider(inner, SingleFlight())
+
+    first = asyncio.ensure_future(provider.generate("halo"))
+    second = asyncio.ensure_future(provider.generate("halo"))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    inner.release.set()
+
+    assert await second == "jawaban: halo"
+    assert first.cancelled()
+    assert inner.calls == 1
+
+@pytest.mark.asyncio
+async def test_last_waiter_cancelling_cancels_upstream():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    upstream_cancelled = asyncio.Event()
+
+    async def upstream():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    caller = asyncio.ensure_future(flight.do("k", upstream))
+    await started.wait()
+    caller.cancel()
+    await asyncio.wait_for(upstream_cancelled.wait(), 1)
+    await asyncio.sleep(0)
+    assert flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    attempts = 0
+
+    async def failing():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert attempts == 1
+
+    with pytest.raises(ValueError):
+        await flight.do("k", failing)
+    assert attempts == 2
@@ -0,0 +1,45 @@
+import json
+import numpy as np
+import pytest
+from src.agents.tokenizer import CharTokenizer
+
+def test_round_trip_with_shipped_vocab():
+    tokenizer = CharTokenizer.load("src/models/vocab.json")
+    with open("src/models/vocab.json", "r", encoding="utf-8") as f:
+        char_to_idx = json.load(f)["char_to_idx"]
+    text = "Q: Ceritakan tentang proyek Anda. A:"
+
+    assert tokenizer.vocab_size == len(char_to_idx)
+    assert tokenizer.encode(text).tolist() == [char_to_idx.get(char, 0) for char in text]
+    known = "".join(char for char in text if char in char_to_idx)
+    assert tokenizer.decode(tokenizer.encode(known)) == known
+
+def test_unknown_characters_encode_as_padding():
+    tokenizer = CharTokenizer.from_texts(["abc"])
+    assert tokenizer.encode("a€z😀c").tolist() == [1, 0, 0, 0, 3]
+    assert tokenizer.decode([1, 0, 3]) == "ac"
+
+def test_single_padding_token(tmp_path):
+    tokenizer = CharTokenizer.from_texts(["halo dunia", "<PAD>"])
+    assert tokenizer.char_to_idx["<PAD>"] == 0
+    assert sorted(tokenizer.char_to_idx.values()) == list(range(tokenizer.vocab_size))
+
+    tokenizer.save(tmp_path / "vocab.json")
+    assert CharTokenizer.load(tmp_path / "vocab.json").char_to_idx == tokenizer.char_to_idx
+
+def test_encode_batch_padding_and_truncation():
+    tokenizer = CharTokenizer.from_texts(["abcdef"])
+    texts = ["abc", "", "abcdef"]
+
+    np.testing.assert_array_equal(tokenizer.encode_batch(texts), [[1, 2, 3, 0, 0, 0], [0] * 6, [1, 2, 3, 4, 5, 6]])
+    np.testing.assert_array_equal(tokenizer.encode_batch(texts, max_length=4), [[1, 2, 3, 0], [0] * 4, [1, 2, 3, 4]])
+    np.testing.assert_array_equal(
+        tokenizer.encode_batch(texts, max_length=4, pad_left=True), [[0, 1, 2, 3], [0] * 4, [3, 4, 5, 6]]
+    )
+    assert tokenizer.decode_batch(tokenizer.encode_batch(texts)) == texts
+
+def test_load_rejects_inconsistent_vocab(tmp_path):
+    path = tmp_path / "vocab.json"
+    path.write_text(json.dumps({"char_to_idx": {" ": 0, "<PAD>": 1, "a": 2}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        CharTokenizer.load(path)